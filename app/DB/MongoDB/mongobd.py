@@ -0,0 +1,308 @@
+import json
+import base64
+import binascii
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ASCENDING, DESCENDING
+from motor.motor_asyncio import AsyncIOMotorClient
+from langchain_core.messages import BaseMessage, message_to_dict, messages_from_dict
+from ...core.config import Settings
+from ...core.metrics import span
+
+
+SESSION_PROJECTION = {
+    "_id": 1,
+    "session_id": 1,
+    "title": 1,
+    "Type": 1,
+    "created_at": 1,
+    "updated_at": 1,
+}
+
+
+def create_mongo_client(connection_string: str):
+    """
+    Shared async client with a tuned connection pool
+
+    `mongomock://` URLs return an in-memory stand-in for tests and local
+    runs (requires `pip install mongomock-motor`).
+    """
+    if connection_string.startswith("mongomock://"):
+        from mongomock_motor import AsyncMongoMockClient
+        return AsyncMongoMockClient()
+
+    return AsyncIOMotorClient(
+        connection_string,
+        maxPoolSize=Settings.MONGODB_MAX_POOL_SIZE,
+        minPoolSize=Settings.MONGODB_MIN_POOL_SIZE,
+        maxIdleTimeMS=60_000,
+        serverSelectionTimeoutMS=5_000,
+        connectTimeoutMS=5_000,
+        retryWrites=True,
+    )
+
+
+def encode_session_cursor(session: Dict[str, Any]) -> str:
+    raw = json.dumps([session["updated_at"].isoformat(), str(session["_id"])])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_session_cursor(cursor: str) -> Tuple[datetime, ObjectId]:
+    """Inverse of encode_session_cursor; raises ValueError for a malformed cursor"""
+    try:
+        updated_at, session_oid = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(updated_at), ObjectId(session_oid)
+    except (binascii.Error, ValueError, TypeError, InvalidId) as e:
+        raise ValueError(f"cursor is not a valid session cursor: {e}") from e
+
+
+class MongoDBSessionManager:
+    """Chat sessions and message history stored in MongoDB (fully async)"""
+
+    def __init__(
+        self,
+        connection_string: str = Settings.MONGODB_URL,
+        database_name: str = Settings.MONGODB_DB_NAME,
+        client=None,
+    ):
+        self.connection_string = connection_string
+        self.database_name = database_name
+        self.client = client or create_mongo_client(connection_string)
+        self.db = self.client[database_name]
+        self.sessions = self.db["sessions"]
+        # Same collection/field layout as MongoDBChatMessageHistory
+        self.messages = self.db["message_store"]
+        self.summaries = self.db["session_summaries"]
+
+    async def ensure_indexes(self):
+        """Create indexes; call once at startup"""
+        # Covers windowed loading and cursor pagination newest-first
+        await self.messages.create_index([("SessionId", ASCENDING), ("_id", DESCENDING)])
+        # Covers session listing with keyset pagination per user and type
+        await self.sessions.create_index([
+            ("user_id", ASCENDING),
+            ("Type", ASCENDING),
+            ("updated_at", DESCENDING),
+            ("_id", DESCENDING),
+        ])
+        await self.sessions.create_index([("session_id", ASCENDING)], unique=True)
+        await self.summaries.create_index([("session_id", ASCENDING)], unique=True)
+
+    def close(self):
+        self.client.close()
+
+    async def add_messages(self, session_id: str, messages: List[BaseMessage]):
+        """Append messages in the MongoDBChatMessageHistory document format"""
+        with span("mongo.add_messages"):
+            await self.messages.insert_many([
+                {"SessionId": session_id, "History": json.dumps(message_to_dict(message))}
+                for message in messages
+            ])
+        await self.touch_session(session_id)
+
+    @staticmethod
+    def _to_message(doc: Dict[str, Any]) -> BaseMessage:
+        return messages_from_dict([json.loads(doc["History"])])[0]
+
+    @staticmethod
+    def estimate_tokens(message: BaseMessage) -> int:
+        content = message.content if isinstance(message.content, str) else str(message.content)
+        return len(content) // 4 + 4
+
+    async def get_recent_messages(
+        self,
+        session_id: str,
+        limit: int = Settings.CHAT_HISTORY_WINDOW,
+        max_tokens: Optional[int] = None,
+        after: Optional[str] = None,
+    ) -> List[BaseMessage]:
+        """
+        Load only the last `limit` messages (optionally capped by tokens)
+
+        With `after`, only messages newer than that message id are read
+        (e.g. the ones a stored summary does not cover yet).
+
+        Reads newest-first through the (SessionId, _id) index with a
+        projection, so the cost does not grow with session length.
+
+        Returns:
+            Messages in chronological order
+        """
+        query: Dict[str, Any] = {"SessionId": session_id}
+        if after:
+            query["_id"] = {"$gt": ObjectId(after)}
+
+        cursor = self.messages.find(
+            query,
+            projection={"History": 1, "_id": 0},
+            sort=[("_id", DESCENDING)],
+            limit=limit,
+        )
+
+        window: List[BaseMessage] = []
+        tokens = 0
+        with span("mongo.read_history"):
+            async for doc in cursor:
+                message = self._to_message(doc)
+                tokens += self.estimate_tokens(message)
+                if max_tokens is not None and window and tokens > max_tokens:
+                    break
+                window.append(message)
+
+        window.reverse()
+        return window
+
+    async def get_messages_page(
+        self,
+        session_id: str,
+        before: Optional[str] = None,
+        page_size: int = 50,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        One page of history older than the `before` message id
+
+        Returns:
+            (messages in chronological order with their ids,
+             cursor for the next older page or None when exhausted)
+        """
+        query: Dict[str, Any] = {"SessionId": session_id}
+        if before:
+            query["_id"] = {"$lt": ObjectId(before)}
+
+        docs = await self.messages.find(
+            query,
+            projection={"History": 1},
+            sort=[("_id", DESCENDING)],
+            limit=page_size + 1,
+        ).to_list(length=page_size + 1)
+        has_more = len(docs) > page_size
+        docs = docs[:page_size]
+
+        page = []
+        for doc in reversed(docs):
+            message = self._to_message(doc)
+            page.append({
+                "id": str(doc["_id"]),
+                "type": message.type,
+                "content": message.content,
+            })
+
+        next_before = str(docs[-1]["_id"]) if has_more else None
+        return page, next_before
+
+    async def get_messages_after(
+        self,
+        session_id: str,
+        after: Optional[str] = None,
+        limit: int = 0,
+    ) -> List[Tuple[str, BaseMessage]]:
+        """Messages newer than the `after` message id, oldest first, with ids (0 = no limit)"""
+        query: Dict[str, Any] = {"SessionId": session_id}
+        if after:
+            query["_id"] = {"$gt": ObjectId(after)}
+
+        return [
+            (str(doc["_id"]), self._to_message(doc))
+            async for doc in self.messages.find(
+                query,
+                projection={"History": 1},
+                sort=[("_id", ASCENDING)],
+                limit=limit,
+            )
+        ]
+
+    async def get_summary(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Stored rolling summary: {"summary", "covered_until"} or None"""
+        return await self.summaries.find_one(
+            {"session_id": session_id},
+            projection={"_id": 0, "summary": 1, "covered_until": 1},
+        )
+
+    async def save_summary(self, session_id: str, summary: str, covered_until: str):
+        with span("mongo.save_summary"):
+            await self.summaries.update_one(
+                {"session_id": session_id},
+                {"$set": {
+                    "summary": summary,
+                    "covered_until": covered_until,
+                    "updated_at": datetime.now(timezone.utc),
+                }},
+                upsert=True,
+            )
+
+    async def create_session(self, user_id: str, session_id: str, title: str, Type: str):
+        now = datetime.now(timezone.utc)
+        with span("mongo.create_session"):
+            await self.sessions.update_one(
+                {"session_id": session_id},
+                {
+                    "$set": {"title": title, "updated_at": now},
+                    "$setOnInsert": {
+                        "user_id": user_id,
+                        "session_id": session_id,
+                        "Type": Type,
+                        "created_at": now,
+                    },
+                },
+                upsert=True,
+            )
+        return {"session_id": session_id, "title": title}
+
+    async def touch_session(self, session_id: str) -> bool:
+        """Set updated_at to now, so the session sorts first in get_session"""
+        with span("mongo.touch_session"):
+            result = await self.sessions.update_one(
+                {"session_id": session_id},
+                {"$set": {"updated_at": datetime.now(timezone.utc)}},
+            )
+        return result.matched_count > 0
+
+    async def get_session(
+        self,
+        user_id: str,
+        Type: str,
+        cursor: Optional[str] = None,
+        limit: int = 50,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        One page of a user's sessions, most recently updated first
+
+        Keyset pagination on (updated_at, _id) through the
+        (user_id, Type, updated_at, _id) index, so deep pages never skip
+        over earlier results.
+
+        Returns:
+            (sessions, cursor for the next page or None when exhausted)
+        """
+        query: Dict[str, Any] = {"user_id": user_id, "Type": Type}
+        if cursor:
+            updated_at, session_oid = decode_session_cursor(cursor)
+            query["$or"] = [
+                {"updated_at": {"$lt": updated_at}},
+                {"updated_at": updated_at, "_id": {"$lt": session_oid}},
+            ]
+
+        docs = await self.sessions.find(
+            query,
+            projection=SESSION_PROJECTION,
+            sort=[("updated_at", DESCENDING), ("_id", DESCENDING)],
+            limit=limit + 1,
+        ).to_list(length=limit + 1)
+        has_more = len(docs) > limit
+        docs = docs[:limit]
+
+        next_cursor = encode_session_cursor(docs[-1]) if has_more else None
+        for doc in docs:
+            doc.pop("_id", None)
+        return docs, next_cursor
+
+    async def delete_session(self, session_id: str, user_id: str) -> Optional[Dict[str, Any]]:
+        with span("mongo.delete_session"):
+            result = await self.sessions.delete_one({"session_id": session_id, "user_id": user_id})
+            if not result.deleted_count:
+                return None
+            deleted = await self.messages.delete_many({"SessionId": session_id})
+            await self.summaries.delete_one({"session_id": session_id})
+        return {"session_id": session_id, "deleted_messages": deleted.deleted_count}
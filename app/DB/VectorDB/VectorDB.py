@@ -1,24 +1,444 @@
 
+import time
+import asyncio
+import hashlib
+import logging
 import chromadb
-from chromadb.config import Settings
+from chromadb.config import Settings as ChromaSettings
 #from chromadb.utils.embedding_functions import OpenAIEmbeddingFunction
-from typing import Dict,Any,List
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from collections import deque
+from typing import Dict,Any,List,AsyncIterable,Callable,Iterable,Optional,Union
+from ...core.config import Settings
+from .bm25 import BM25Index
+from .embeddings import CachedEmbedder
+
+
+logger = logging.getLogger(__name__)
+
 
 class VectorStore:
     """Manages ChromaDB vector store for product knowledge base"""
     
-    def __init__(self, persist_directory: str = "./chroma_db"):
+    def __init__(
+        self,
+        persist_directory: str = "./chroma_db",
+        embedder=None,
+        query_cache_size: int = 4096
+    ):
         self.client = chromadb.PersistentClient(
             path=persist_directory,
-            settings=Settings(anonymized_telemetry=False)
+            settings=ChromaSettings(anonymized_telemetry=False)
         )
         
         self.collection = self.client.get_or_create_collection(
-            name="Firecomm knowledge base",
+            name="firecomm_knowledge_base",
             embedding_function=None,
             metadata={"hnsw:space": "cosine"}
         )
 
-        
+        # Retrieval: memoized query embeddings + lexical index over the same chunks
+        self.query_embedder = CachedEmbedder(embedder, query_cache_size) if embedder else None
+        self.lexical_index = BM25Index()
+        self.lexical_ready = False
+        self._query_latencies: deque = deque(maxlen=1000)
+        self._budget_misses = 0
+        self._vector_failures = 0
+
+    def get_collection(self, name: str):
+        """Open (or create) an auxiliary cosine collection on the same client"""
+        return self.client.get_or_create_collection(
+            name=name,
+            embedding_function=None,
+            metadata={"hnsw:space": "cosine"}
+        )
+
+
+    @staticmethod
+    def chunk_id(text: str) -> str:
+        """Content hash used as the chunk id, so identical chunks dedupe"""
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    async def ingest_documents(
+        self,
+        documents: Union[Iterable[Dict[str, Any]], AsyncIterable[Dict[str, Any]]],
+        embedder,
+        chunk_size: int = 1000,
+        chunk_overlap: int = 150,
+        embed_batch_size: int = 64,
+        write_batch_size: int = 1024,
+        max_concurrency: int = 4,
+        progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Chunk, dedupe, embed and write documents into the knowledge base
+
+        Documents are consumed incrementally, so a generator (e.g. PDF pages)
+        is never fully materialized. Chunks whose content hash is already in
+        the collection are skipped, which makes re-running over an unchanged
+        corpus close to free.
+
+        Args:
+            documents: Dicts with "text" and optional "metadata"
+            embedder: Object with `async embed(texts) -> vectors`
+            chunk_size: Target characters per chunk
+            chunk_overlap: Characters shared between neighbouring chunks
+            embed_batch_size: Chunks per embedding request
+            write_batch_size: Chunks per Chroma upsert
+            max_concurrency: Embedding requests in flight
+            progress: Called with a stats snapshot after every write
+
+        Returns:
+            Ingestion stats (documents, chunks, skipped, written, throughput)
+        """
+        splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap
+        )
+        write_batch_size = min(write_batch_size, self.client.get_max_batch_size())
+        semaphore = asyncio.Semaphore(max_concurrency)
+        write_lock = asyncio.Lock()
+        tasks = set()
+        failures: List[BaseException] = []
+        seen = set()
+        pending: List[Dict[str, Any]] = []
+        to_write: List[Dict[str, Any]] = []
+        start = time.perf_counter()
+        stats = {"documents": 0, "chunks": 0, "skipped": 0, "embedded": 0, "written": 0}
+
+        def snapshot() -> Dict[str, Any]:
+            elapsed = time.perf_counter() - start
+            return {
+                **stats,
+                "elapsed": elapsed,
+                "chunks_per_second": stats["chunks"] / elapsed if elapsed else 0.0,
+            }
+
+        async def flush_writes(force: bool = False):
+            async with write_lock:
+                while to_write and (force or len(to_write) >= write_batch_size):
+                    batch = to_write[:write_batch_size]
+                    del to_write[:write_batch_size]
+                    await asyncio.to_thread(
+                        self.collection.upsert,
+                        ids=[c["id"] for c in batch],
+                        embeddings=[c["embedding"] for c in batch],
+                        documents=[c["text"] for c in batch],
+                        metadatas=[c["metadata"] for c in batch],
+                    )
+                    stats["written"] += len(batch)
+                    if self.lexical_ready:
+                        self.lexical_index.add(
+                            [c["id"] for c in batch],
+                            [c["text"] for c in batch],
+                            [c["metadata"] for c in batch],
+                        )
+                    if progress:
+                        progress(snapshot())
+
+        async def embed_batch(batch: List[Dict[str, Any]]):
+            try:
+                existing = await asyncio.to_thread(
+                    self.collection.get, ids=[c["id"] for c in batch], include=[]
+                )
+                known = set(existing["ids"])
+                fresh = [c for c in batch if c["id"] not in known]
+                stats["skipped"] += len(batch) - len(fresh)
+                if not fresh:
+                    return
+
+                vectors = await embedder.embed([c["text"] for c in fresh])
+                for chunk, vector in zip(fresh, vectors):
+                    chunk["embedding"] = vector
+                stats["embedded"] += len(fresh)
+                to_write.extend(fresh)
+                await flush_writes()
+            finally:
+                semaphore.release()
+
+        def finished(task: asyncio.Task):
+            tasks.discard(task)
+            # Keep the error: the task is gone from `tasks` before the final gather
+            if not task.cancelled() and task.exception() is not None:
+                failures.append(task.exception())
+
+        async def dispatch(batch: List[Dict[str, Any]]):
+            if failures:
+                raise failures[0]
+            # Acquire before spawning so a slow upstream backpressures the reader
+            await semaphore.acquire()
+            task = asyncio.create_task(embed_batch(batch))
+            tasks.add(task)
+            task.add_done_callback(finished)
+
+        async def consume(document: Dict[str, Any]):
+            stats["documents"] += 1
+            metadata = document.get("metadata") or {}
+            for chunk_index, text in enumerate(splitter.split_text(document["text"])):
+                chunk_id = self.chunk_id(text)
+                stats["chunks"] += 1
+                if chunk_id in seen:
+                    stats["skipped"] += 1
+                    continue
+                seen.add(chunk_id)
+                # Chroma rejects empty metadata dicts, so every chunk carries its index
+                pending.append({
+                    "id": chunk_id,
+                    "text": text,
+                    "metadata": {**metadata, "chunk_index": chunk_index},
+                })
+                if len(pending) >= embed_batch_size:
+                    await dispatch(pending[:])
+                    pending.clear()
+
+        try:
+            if hasattr(documents, "__aiter__"):
+                async for document in documents:
+                    await consume(document)
+            else:
+                for document in documents:
+                    await consume(document)
+
+            if pending:
+                await dispatch(pending[:])
+                pending.clear()
+
+            if tasks:
+                await asyncio.gather(*tasks)
+            if failures:
+                raise failures[0]
+            await flush_writes(force=True)
+
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
+        report = snapshot()
+        logger.info(
+            f"📚 Ingested {report['documents']} docs: {report['chunks']} chunks, "
+            f"{report['skipped']} skipped, {report['written']} written "
+            f"({report['chunks_per_second']:.1f} chunks/s)"
+        )
+        return report
+
+    def build_lexical_index(self, page_size: int = 1000):
+        """Load every chunk of the collection into the in-process BM25 index"""
+        index = BM25Index()
+        offset = 0
+        while True:
+            page = self.collection.get(
+                limit=page_size,
+                offset=offset,
+                include=["documents", "metadatas"]
+            )
+            if not page["ids"]:
+                break
+            index.add(page["ids"], page["documents"], page["metadatas"])
+            offset += len(page["ids"])
+
+        self.lexical_index = index
+        self.lexical_ready = True
+        logger.info(f"🔎 Lexical index built over {len(index)} chunks")
+
+    async def query(
+        self,
+        text: str,
+        top_k: int = 5,
+        where: Optional[Dict[str, Any]] = None,
+        budget: Optional[float] = None,
+        embedding: Optional[List[float]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Hybrid retrieval for grounding a single chat turn
+
+        Args:
+            text: User query
+            top_k: Number of chunks to return
+            where: Chroma metadata filter (equality / $and / $in)
+            budget: Search budget in seconds, counted once the query is
+                embedded (defaults to Settings.RETRIEVAL_BUDGET)
+            embedding: Query embedding the caller already computed
+
+        Returns:
+            Chunks ordered by fused score, with document, metadata and ranks
+        """
+        embeddings = [embedding] if embedding is not None else None
+        return (await self.query_batch([text], top_k, where, budget, embeddings=embeddings))[0]
+
+    async def query_batch(
+        self,
+        texts: List[str],
+        top_k: int = 5,
+        where: Optional[Dict[str, Any]] = None,
+        budget: Optional[float] = None,
+        rrf_k: int = 60,
+        embeddings: Optional[List[List[float]]] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Hybrid retrieval for several queries at once
+
+        Vector and BM25 results are combined with reciprocal rank fusion.
+        Query embeddings are taken from `embeddings` when given, otherwise
+        from an LRU in front of the embedder, bounded by
+        Settings.RETRIEVAL_EMBED_TIMEOUT. A miss that cannot be embedded in
+        time falls back to lexical results and keeps embedding in the
+        background so the next identical query is fully hybrid. Once the
+        queries are embedded, the vector search and BM25 (already running
+        on a worker thread, off the event loop) share `budget`. If
+        embedding or the vector query fails outright (rate limit, network),
+        the lexical results are returned alone. Lexical results that miss
+        the budget are dropped.
+        """
+        start = time.perf_counter()
+        budget = Settings.RETRIEVAL_BUDGET if budget is None else budget
+        candidate_k = top_k * 3
+
+        lexical_task = None
+        if self.lexical_ready:
+            lexical_task = asyncio.ensure_future(
+                asyncio.to_thread(self._lexical_search, texts, candidate_k, where)
+            )
+            lexical_task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        if embeddings is None:
+            embeddings = await self._embed_queries(texts)
+        # The search budget starts once the queries are embedded
+        deadline = time.perf_counter() + budget
+        vector = await self._vector_search(texts, embeddings, candidate_k, where, deadline)
+        lexical = await self._await_lexical(lexical_task, texts, deadline)
+
+        results = []
+        for i in range(len(texts)):
+            fused: Dict[str, Dict[str, Any]] = {}
+            for rank, (doc_id, document, metadata) in enumerate(vector[i]):
+                fused[doc_id] = {
+                    "id": doc_id,
+                    "document": document,
+                    "metadata": metadata,
+                    "score": 1.0 / (rrf_k + rank + 1),
+                    "vector_rank": rank + 1,
+                }
+            for rank, (doc_id, _) in enumerate(lexical[i]):
+                entry = fused.get(doc_id)
+                if entry is None:
+                    try:
+                        document, metadata = self.lexical_index.get(doc_id)
+                    except KeyError:
+                        # Replaced by a concurrent ingest since the search ran
+                        continue
+                    entry = fused[doc_id] = {
+                        "id": doc_id,
+                        "document": document,
+                        "metadata": metadata,
+                        "score": 0.0,
+                    }
+                entry["score"] += 1.0 / (rrf_k + rank + 1)
+                entry["lexical_rank"] = rank + 1
+            results.append(sorted(fused.values(), key=lambda e: e["score"], reverse=True)[:top_k])
+
+        elapsed = time.perf_counter() - start
+        self._query_latencies.append(elapsed)
+        return results
+
+    def _lexical_search(
+        self,
+        texts: List[str],
+        n_results: int,
+        where: Optional[Dict[str, Any]],
+    ) -> List[List[tuple]]:
+        index = self.lexical_index
+        return [index.search(text, n_results, where) for text in texts]
+
+    async def _await_lexical(
+        self,
+        lexical_task: Optional[asyncio.Future],
+        texts: List[str],
+        deadline: float,
+    ) -> List[List[tuple]]:
+        empty = [[] for _ in texts]
+        if lexical_task is None:
+            return empty
+        try:
+            # The thread cannot be interrupted; shield so it just finishes unobserved
+            return await asyncio.wait_for(
+                asyncio.shield(lexical_task),
+                max(0.0, deadline - time.perf_counter())
+            )
+        except asyncio.TimeoutError:
+            self._budget_misses += 1
+            return empty
+
+    async def _embed_queries(self, texts: List[str]) -> Optional[List[List[float]]]:
+        if self.query_embedder is None:
+            return None
+
+        embed_task = asyncio.ensure_future(self.query_embedder.embed(texts))
+        embed_task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        try:
+            return await asyncio.wait_for(
+                asyncio.shield(embed_task),
+                Settings.RETRIEVAL_EMBED_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            # The embedding keeps running to warm the cache for next time
+            self._budget_misses += 1
+            return None
+        except Exception as e:
+            self._vector_failures += 1
+            logger.warning(f"Query embedding failed, using lexical results only: {e}")
+            return None
+
+    async def _vector_search(
+        self,
+        texts: List[str],
+        vectors: Optional[List[List[float]]],
+        n_results: int,
+        where: Optional[Dict[str, Any]],
+        deadline: float,
+    ) -> List[List[tuple]]:
+        empty = [[] for _ in texts]
+        if vectors is None:
+            return empty
+
+        try:
+            result = await asyncio.wait_for(
+                asyncio.to_thread(
+                    self.collection.query,
+                    query_embeddings=vectors,
+                    n_results=n_results,
+                    where=where or None,
+                    include=["documents", "metadatas"],
+                ),
+                max(0.0, deadline - time.perf_counter())
+            )
+        except asyncio.TimeoutError:
+            self._budget_misses += 1
+            return empty
+        except Exception as e:
+            self._vector_failures += 1
+            logger.warning(f"Vector retrieval failed, using lexical results only: {e}")
+            return empty
+
+        return [
+            list(zip(result["ids"][i], result["documents"][i], result["metadatas"][i]))
+            for i in range(len(texts))
+        ]
+
+    def retrieval_stats(self) -> Dict[str, Any]:
+        latencies = sorted(self._query_latencies)
+
+        def percentile(p: float) -> float:
+            if not latencies:
+                return 0.0
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))]
 
-        
\ No newline at end of file
+        return {
+            "queries": len(latencies),
+            "p50": percentile(0.50),
+            "p95": percentile(0.95),
+            "p99": percentile(0.99),
+            "budget_misses": self._budget_misses,
+            "vector_failures": self._vector_failures,
+            "lexical_chunks": len(self.lexical_index),
+            "query_embedding_cache": self.query_embedder.stats() if self.query_embedder else None,
+        }
@@ -0,0 +1,145 @@
+import re
+import math
+import heapq
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:\.[0-9]+)?")
+
+# Too common to rank anything; their postings are the bulk of the scoring cost
+STOPWORDS = frozenset({
+    "a", "an", "and", "are", "as", "at", "be", "but", "by", "can", "do", "does",
+    "for", "from", "has", "have", "how", "i", "if", "in", "is", "it", "its",
+    "me", "my", "of", "on", "or", "should", "so", "that", "the", "their",
+    "there", "this", "to", "was", "we", "what", "when", "where", "which",
+    "who", "why", "will", "with", "you", "your",
+})
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in _TOKEN_RE.findall(text.lower()) if token not in STOPWORDS]
+
+
+def matches_filter(metadata: Dict[str, Any], where: Optional[Dict[str, Any]]) -> bool:
+    """Evaluate the equality / $and subset of Chroma `where` filters"""
+    if not where:
+        return True
+    for key, expected in where.items():
+        if key == "$and":
+            if not all(matches_filter(metadata, clause) for clause in expected):
+                return False
+        elif isinstance(expected, dict):
+            if "$eq" in expected and metadata.get(key) != expected["$eq"]:
+                return False
+            if "$in" in expected and metadata.get(key) not in expected["$in"]:
+                return False
+        elif metadata.get(key) != expected:
+            return False
+    return True
+
+
+class BM25Index:
+    """
+    In-process BM25 index over the knowledge base chunks
+
+    Kept alongside the Chroma collection so lexical matches (part numbers,
+    model names) can be fused with vector results without another round
+    trip.
+
+    Stopwords are never indexed, and at query time terms found in more
+    than `max_df_ratio` of the chunks are skipped: they add little to the
+    ranking but walking their postings dominates the search time.
+    `search()` may run on a worker thread while `add()` runs on the loop.
+    """
+
+    def __init__(
+        self,
+        k1: float = 1.5,
+        b: float = 0.75,
+        max_df_ratio: float = 0.3,
+        min_df_cutoff_docs: int = 100,
+    ):
+        self.k1 = k1
+        self.b = b
+        self.max_df_ratio = max_df_ratio
+        # Small corpora are cheap to score in full and have noisy frequencies
+        self.min_df_cutoff_docs = min_df_cutoff_docs
+        self._postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self._lengths: Dict[str, int] = {}
+        self._documents: Dict[str, str] = {}
+        self._metadatas: Dict[str, Dict[str, Any]] = {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def add(
+        self,
+        ids: Iterable[str],
+        documents: Iterable[str],
+        metadatas: Optional[Iterable[Dict[str, Any]]] = None,
+    ):
+        metadatas = metadatas if metadatas is not None else [{} for _ in ids]
+        for doc_id, text, metadata in zip(ids, documents, metadatas):
+            if doc_id in self._lengths:
+                self.remove([doc_id])
+            terms = Counter(tokenize(text))
+            for term, freq in terms.items():
+                self._postings[term][doc_id] = freq
+            length = sum(terms.values())
+            self._lengths[doc_id] = length
+            self._total_length += length
+            self._documents[doc_id] = text
+            self._metadatas[doc_id] = metadata or {}
+
+    def remove(self, ids: Iterable[str]):
+        for doc_id in ids:
+            length = self._lengths.pop(doc_id, None)
+            if length is None:
+                continue
+            self._total_length -= length
+            for term in set(tokenize(self._documents.pop(doc_id))):
+                postings = self._postings.get(term)
+                if postings is not None:
+                    postings.pop(doc_id, None)
+                    if not postings:
+                        del self._postings[term]
+            self._metadatas.pop(doc_id, None)
+
+    def search(
+        self,
+        query: str,
+        top_k: int = 5,
+        where: Optional[Dict[str, Any]] = None,
+    ) -> List[Tuple[str, float]]:
+        """Return (id, score) pairs for the best lexical matches"""
+        n = len(self._lengths)
+        if not n:
+            return []
+
+        avg_length = max(1, self._total_length) / n
+        max_df = self.max_df_ratio * n if n >= self.min_df_cutoff_docs else n
+        scores: Dict[str, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings or len(postings) > max_df:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            # Snapshot: add()/remove() may change the postings while this runs
+            for doc_id, freq in list(postings.items()):
+                length = self._lengths.get(doc_id)
+                if length is None:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * length / avg_length)
+                scores[doc_id] += idf * freq * (self.k1 + 1) / (freq + norm)
+
+        if where:
+            scores = {
+                doc_id: score for doc_id, score in scores.items()
+                if matches_filter(self._metadatas.get(doc_id, {}), where)
+            }
+        return heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+
+    def get(self, doc_id: str) -> Tuple[str, Dict[str, Any]]:
+        return self._documents[doc_id], self._metadatas[doc_id]
@@ -0,0 +1,86 @@
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+from openai import AsyncOpenAI
+from ...core.config import Settings
+
+
+class OpenAIEmbedder:
+    """Async embedding client shared by the vector store consumers"""
+
+    def __init__(self, model: str = Settings.EMBEDDING_MODEL):
+        self.client = AsyncOpenAI(api_key=Settings.OPENAI_API_KEY)
+        self.model = model
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        """Embed a batch of texts in one upstream request"""
+        if not texts:
+            return []
+        response = await self.client.embeddings.create(model=self.model, input=texts)
+        return [item.embedding for item in sorted(response.data, key=lambda d: d.index)]
+
+    async def embed_query(self, text: str) -> List[float]:
+        return (await self.embed([text]))[0]
+
+
+class CachedEmbedder:
+    """
+    LRU memoization in front of an embedder
+
+    Repeated queries (follow-ups, FAQ phrasing, batch pre-fetch) skip the
+    upstream embedding round trip entirely.
+    """
+
+    def __init__(self, embedder, max_size: int = 4096):
+        self.embedder = embedder
+        self.max_size = max_size
+        self._cache: "OrderedDict[str, List[float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(text: str) -> str:
+        return " ".join(text.split())
+
+    def get_cached(self, text: str) -> Optional[List[float]]:
+        key = self._key(text)
+        vector = self._cache.get(key)
+        if vector is not None:
+            self._cache.move_to_end(key)
+        return vector
+
+    def _put(self, text: str, vector: List[float]):
+        key = self._key(text)
+        self._cache[key] = vector
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts, sending only cache misses upstream in one batch"""
+        vectors: List[Optional[List[float]]] = [self.get_cached(text) for text in texts]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            # Dedupe identical misses within the batch
+            unique = list(dict.fromkeys(self._key(texts[i]) for i in missing))
+            fresh = dict(zip(unique, await self.embedder.embed(unique)))
+            for i in missing:
+                vectors[i] = fresh[self._key(texts[i])]
+            for key, vector in fresh.items():
+                self._put(key, vector)
+
+        return vectors
+
+    async def embed_query(self, text: str) -> List[float]:
+        return (await self.embed([text]))[0]
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": len(self._cache),
+        }
@@ -0,0 +1,337 @@
+import time
+import heapq
+import asyncio
+import itertools
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Any, Dict, List, Optional
+from .config import Settings
+from .metrics import metrics
+
+
+admission_wait = metrics.histogram(
+    "firecomm_admission_wait_seconds", "Time spent queued for an upstream slot"
+)
+admission_rejections = metrics.counter(
+    "firecomm_admission_rejections_total", "Requests turned away by upstream and reason"
+)
+
+
+class Priority(IntEnum):
+    """Admission classes; lower values are served first"""
+
+    VOICE = 0
+    TEXT = 1
+    BACKGROUND = 2
+
+
+DEFAULT_DEADLINES = {
+    Priority.VOICE: Settings.ADMISSION_DEADLINE_VOICE,
+    Priority.TEXT: Settings.ADMISSION_DEADLINE_TEXT,
+    Priority.BACKGROUND: Settings.ADMISSION_DEADLINE_BACKGROUND,
+}
+
+# Priority of the work running in the current task (set once per turn/job)
+_request_priority: ContextVar[Priority] = ContextVar("request_priority", default=Priority.TEXT)
+
+
+def set_request_priority(priority: Priority):
+    """Tag the current task (and tasks it creates) with an admission class"""
+    _request_priority.set(priority)
+
+
+def get_request_priority() -> Priority:
+    return _request_priority.get()
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request cannot be admitted before its deadline"""
+
+    def __init__(self, upstream: str, retry_after: float, reason: str):
+        self.upstream = upstream
+        self.retry_after = retry_after
+        self.reason = reason
+        super().__init__(
+            f"{upstream} is overloaded ({reason}); retry after {retry_after:.1f}s"
+        )
+
+
+class TokenBucket:
+    """Request-rate limiter; a rate of 0 disables it"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_take(self) -> float:
+        """Take a token; returns 0 on success or the seconds until one is available"""
+        if self.rate <= 0:
+            return 0.0
+        self._refill(time.monotonic())
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def wait_time(self, tokens_needed: int) -> float:
+        """Seconds until `tokens_needed` tokens will have accrued"""
+        if self.rate <= 0:
+            return 0.0
+        self._refill(time.monotonic())
+        return max(0.0, (tokens_needed - self.tokens) / self.rate)
+
+
+class UpstreamGate:
+    """
+    Concurrency limit + token bucket + priority queue for one upstream
+
+    Waiters are served strictly by priority, then arrival. A request is
+    rejected immediately (with a retry hint) when the queue is full or
+    its estimated wait exceeds its deadline, and again if the deadline
+    passes while queued, instead of piling up until the upstream 429s.
+    A full queue sheds its newest lower-priority waiter before turning
+    away a higher-priority request.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrency: int,
+        rate: float = 0.0,
+        burst: int = 1,
+        max_queue: int = Settings.ADMISSION_MAX_QUEUE,
+    ):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be >= 1")
+
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.bucket = TokenBucket(rate, burst)
+        self._waiters: List = []
+        self._sequence = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+        self.in_flight = 0
+        self.waiting: Dict[Priority, int] = {priority: 0 for priority in Priority}
+        self.admitted = 0
+        self.rejected: Dict[str, int] = {"queue_full": 0, "deadline": 0, "timeout": 0, "shed": 0}
+        self.total_wait_time = 0.0
+        self.max_wait_time = 0.0
+        # Moving average of how long a slot is held, for wait estimates
+        self.avg_hold_time = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(self.waiting.values())
+
+    def estimate_wait(self, priority: Priority) -> float:
+        """Expected queueing time for a new request of this priority"""
+        ahead = sum(count for p, count in self.waiting.items() if p <= priority)
+        if self.in_flight + ahead < self.max_concurrency:
+            return self.bucket.wait_time(ahead + 1)
+        turns = (self.in_flight + ahead - self.max_concurrency) // self.max_concurrency + 1
+        return max(turns * self.avg_hold_time, self.bucket.wait_time(ahead + 1))
+
+    def _reject(self, reason: str, retry_after: float):
+        self.rejected[reason] += 1
+        admission_rejections.inc(upstream=self.name, reason=reason)
+        raise AdmissionRejected(self.name, max(retry_after, 0.1), reason)
+
+    async def acquire(self, priority: Priority, deadline: float) -> float:
+        """
+        Wait for a slot
+
+        Returns:
+            Seconds spent queued
+
+        Raises:
+            AdmissionRejected: queue full, or the deadline cannot be met
+        """
+        wait_start = time.perf_counter()
+        if not self._waiters and self.in_flight < self.max_concurrency:
+            if self.bucket.try_take() == 0:
+                self._admit(0.0)
+                return 0.0
+
+        if self.queue_depth >= self.max_queue and not self._shed_lower(priority):
+            self._reject("queue_full", self.estimate_wait(priority))
+        estimate = self.estimate_wait(priority)
+        if estimate > deadline:
+            self._reject("deadline", estimate)
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+        self.waiting[priority] += 1
+        self._dispatch()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), deadline)
+        except asyncio.TimeoutError:
+            if not future.done():
+                future.cancel()
+                self._reject("timeout", self.estimate_wait(priority))
+            if future.exception() is not None:
+                # Shed right at the deadline
+                raise future.exception()
+            # Granted right at the deadline; keep the slot
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled() and future.exception() is None:
+                # Slot was granted as we were cancelled; hand it back (a shed
+                # waiter's future holds AdmissionRejected and never had one)
+                self.release(0.0)
+            future.cancel()
+            raise
+        finally:
+            self.waiting[priority] -= 1
+
+        wait_time = time.perf_counter() - wait_start
+        self._record_wait(wait_time)
+        return wait_time
+
+    def _shed_lower(self, priority: Priority) -> bool:
+        """Reject the newest queued request of a lower class to make room"""
+        live = [entry for entry in self._waiters if not entry[2].done()]
+        if not live:
+            return False
+        victim_priority, _, future = max(live, key=lambda entry: (entry[0], entry[1]))
+        if victim_priority <= priority:
+            return False
+        self.rejected["shed"] += 1
+        admission_rejections.inc(upstream=self.name, reason="shed")
+        future.set_exception(AdmissionRejected(
+            self.name, max(self.estimate_wait(victim_priority), 0.1), "shed"
+        ))
+        return True
+
+    def _admit(self, wait_time: float):
+        self.in_flight += 1
+        self._record_wait(wait_time)
+
+    def _record_wait(self, wait_time: float):
+        self.admitted += 1
+        self.total_wait_time += wait_time
+        self.max_wait_time = max(self.max_wait_time, wait_time)
+        admission_wait.observe(wait_time, upstream=self.name)
+
+    def _dispatch(self):
+        """Grant free slots to the highest-priority live waiters"""
+        self._timer = None
+        while self._waiters and self.in_flight < self.max_concurrency:
+            _, _, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            delay = self.bucket.try_take()
+            if delay > 0:
+                if self._timer is None:
+                    self._timer = asyncio.get_running_loop().call_later(delay, self._dispatch)
+                return
+            heapq.heappop(self._waiters)
+            self.in_flight += 1
+            future.set_result(None)
+
+    def release(self, hold_time: float):
+        self.in_flight -= 1
+        if hold_time:
+            self.avg_hold_time = (
+                hold_time if not self.avg_hold_time
+                else 0.9 * self.avg_hold_time + 0.1 * hold_time
+            )
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, priority: Optional[Priority] = None, deadline: Optional[float] = None):
+        """Hold one admitted slot for the duration of the block"""
+        priority = get_request_priority() if priority is None else priority
+        deadline = DEFAULT_DEADLINES[priority] if deadline is None else deadline
+        wait_time = await self.acquire(priority, deadline)
+        start = time.perf_counter()
+        try:
+            yield wait_time
+        finally:
+            self.release(time.perf_counter() - start)
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of queue depth, wait times and rejections"""
+        return {
+            "name": self.name,
+            "max_concurrency": self.max_concurrency,
+            "rate_per_second": self.bucket.rate,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "queue_depth_by_priority": {p.name.lower(): n for p, n in self.waiting.items()},
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+            "avg_wait_time": self.total_wait_time / self.admitted if self.admitted else 0.0,
+            "max_wait_time": self.max_wait_time,
+            "avg_hold_time": self.avg_hold_time,
+        }
+
+
+class AdmissionController:
+    """Registry of upstream gates shared by every handler in the process"""
+
+    def __init__(self):
+        self.gates: Dict[str, UpstreamGate] = {}
+
+    def register(self, gate: UpstreamGate) -> UpstreamGate:
+        self.gates[gate.name] = gate
+        return gate
+
+    def gate(self, name: str) -> UpstreamGate:
+        return self.gates[name]
+
+    def slot(self, name: str, priority: Optional[Priority] = None, deadline: Optional[float] = None):
+        return self.gates[name].slot(priority, deadline)
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: gate.stats() for name, gate in self.gates.items()}
+
+
+admission = AdmissionController()
+admission.register(UpstreamGate(
+    "llm",
+    Settings.LLM_MAX_CONCURRENCY,
+    Settings.LLM_REQUESTS_PER_SECOND,
+    Settings.LLM_BURST,
+))
+admission.register(UpstreamGate(
+    "stt",
+    Settings.STT_MAX_CONCURRENCY,
+    Settings.STT_REQUESTS_PER_SECOND,
+    Settings.STT_BURST,
+))
+admission.register(UpstreamGate(
+    "tts",
+    Settings.TTS_MAX_CONCURRENCY,
+    Settings.TTS_REQUESTS_PER_SECOND,
+    Settings.TTS_BURST,
+))
+metrics.gauge(
+    "firecomm_admission_in_flight",
+    "Upstream requests currently holding a slot",
+    lambda: [({"upstream": name}, gate.in_flight) for name, gate in admission.gates.items()],
+)
+metrics.gauge(
+    "firecomm_admission_queue_depth",
+    "Requests queued for an upstream slot",
+    lambda: [({"upstream": name}, gate.queue_depth) for name, gate in admission.gates.items()],
+)
+
+
+def admitted_stream(name: str, response_function):
+    """Wrap a streaming generator so the whole stream holds one `name` slot"""
+
+    async def admitted(**kwargs):
+        async with admission.slot(name):
+            async for chunk in response_function(**kwargs):
+                yield chunk
+
+    return admitted
@@ -1,13 +1,123 @@
-from pydantic_seattings import BaseSettings
+from pydantic_settings import BaseSettings
 from typing import Any
 
 
 class settings(BaseSettings):
-    OPENAI_API_KEY: Any 
+    OPENAI_API_KEY: Any
 
-    class confid():
+    # Upstream admission control (rate 0 = no request-rate limit)
+    LLM_MAX_CONCURRENCY: int = 32
+    LLM_REQUESTS_PER_SECOND: float = 0.0
+    LLM_BURST: int = 32
+    STT_MAX_CONCURRENCY: int = 16
+    STT_REQUESTS_PER_SECOND: float = 0.0
+    STT_BURST: int = 16
+    TTS_MAX_CONCURRENCY: int = 16
+    TTS_REQUESTS_PER_SECOND: float = 0.0
+    TTS_BURST: int = 16
+    ADMISSION_MAX_QUEUE: int = 256
+    # Max queueing time per priority class before a request is rejected
+    ADMISSION_DEADLINE_VOICE: float = 2.0
+    ADMISSION_DEADLINE_TEXT: float = 5.0
+    ADMISSION_DEADLINE_BACKGROUND: float = 30.0
+
+    # TTS audio cache; TTS_CACHE_DIR may be shared by workers on one host
+    TTS_CACHE_ENABLED: bool = True
+    TTS_CACHE_MEMORY_BYTES: int = 64 * 1024 * 1024
+    TTS_CACHE_DIR: str = "./tts_cache"
+    TTS_CACHE_DISK_BYTES: int = 1024 * 1024 * 1024
+    TTS_CACHE_MAX_ENTRY_BYTES: int = 1024 * 1024
+    TTS_CACHE_PREWARM_FILE: str = ""
+
+    # Per-connection cap on a single streamed voice recording
+    VOICE_MAX_UPLOAD_BYTES: int = 10 * 1024 * 1024
+
+    # Speech-to-text backend: "openai", "local" (faster-whisper) or "fake"
+    STT_BACKEND: str = "openai"
+    STT_TIMEOUT: float = 30.0
+    STT_MAX_RETRIES: int = 3
+    STT_MAX_CONNECTIONS: int = 50
+    STT_LOCAL_MODEL: str = "base"
+    STT_LOCAL_WORKERS: int = 2
+    STT_LOCAL_EXECUTOR: str = "thread"
+    # Trim / downmix / resample uploads before STT (needs pydub + ffmpeg)
+    STT_PREPROCESS_ENABLED: bool = True
+    STT_PREPROCESS_WORKERS: int = 2
+    STT_SAMPLE_RATE: int = 16000
+    STT_SILENCE_THRESHOLD_DBFS: float = -45.0
+    STT_SILENCE_PADDING_MS: int = 200
+    STT_PREPROCESS_FORMAT: str = "ogg"
+    STT_PREPROCESS_BITRATE: str = "24k"
+
+    # Vector store / embeddings
+    CHROMA_PERSIST_DIR: str = "./chroma_db"
+    EMBEDDING_MODEL: str = "text-embedding-3-small"
+    # Per-turn retrieval: the query embedding gets its own timeout, then the
+    # vector and BM25 searches share the budget
+    RETRIEVAL_EMBED_TIMEOUT: float = 1.0
+    RETRIEVAL_BUDGET: float = 0.05
+
+    # Semantic response cache in front of the LLM
+    SEMANTIC_CACHE_ENABLED: bool = True
+    SEMANTIC_CACHE_THRESHOLD: float = 0.95
+    SEMANTIC_CACHE_TTL: int = 24 * 60 * 60
+    SEMANTIC_CACHE_MAX_ENTRIES: int = 50000
+    # "user": entries are only reused by the same user_id; "tenant": shared
+    # by every user of this deployment (SEMANTIC_CACHE_TENANT must be set)
+    SEMANTIC_CACHE_SCOPE: str = "user"
+    SEMANTIC_CACHE_TENANT: str = ""
+    SEMANTIC_CACHE_MIN_WORDS: int = 4
+
+    # MongoDB sessions / chat history
+    MONGODB_URL: str = "mongodb://localhost:27017"
+    MONGODB_DB_NAME: str = "firecomm"
+    MONGODB_MAX_POOL_SIZE: int = 100
+    MONGODB_MIN_POOL_SIZE: int = 5
+    CHAT_HISTORY_WINDOW: int = 20
+
+    # Rolling summarization of long sessions
+    SUMMARY_MODEL: str = "gpt-4o-mini"
+    SUMMARY_TOKEN_BUDGET: int = 2000
+    SUMMARY_CACHE_SIZE: int = 1024
+    # Messages read per summarization pass; longer backlogs fold in pages
+    SUMMARY_MAX_FETCH: int = 200
+    SUMMARY_DRAIN_TIMEOUT: float = 10.0
+
+    # Background post-turn work (titles, session writes)
+    POST_TURN_QUEUE_SIZE: int = 1000
+    POST_TURN_WORKERS: int = 2
+
+    # Per-connection outbound websocket queue
+    WS_SEND_QUEUE_SIZE: int = 256
+    WS_SEND_TIMEOUT: float = 5.0
+    WS_COALESCE_WINDOW: float = 0.02
+    WS_COALESCE_MAX_CHARS: int = 512
+
+    # Sentence segmentation for TTS (short first chunk, longer ones after)
+    VOICE_SEGMENT_FIRST_MAX_WORDS: int = 8
+    VOICE_SEGMENT_FIRST_COMMA_WORDS: int = 4
+    VOICE_SEGMENT_MAX_WORDS: int = 20
+    VOICE_SEGMENT_COMMA_WORDS: int = 8
+
+    # Pre-emptive TTS is throttled when its recent hit rate drops too low
+    SPECULATION_MIN_HIT_RATE: float = 0.3
+    SPECULATION_WINDOW: int = 20
+    SPECULATION_MIN_SAMPLES: int = 5
+    SPECULATION_PROBE_EVERY: int = 10
+
+    # Serving (see gunicorn.conf.py for the multi-worker launcher)
+    HOST: str = "0.0.0.0"
+    PORT: int = 8000
+    APP_RELOAD: bool = False
+    WARMUP_MAX_BACKOFF: float = 30.0
+
+    # Per-turn tracing and /metrics
+    TRACE_SLOW_TURN_SECONDS: float = 3.0
+    TRACE_SLOW_BUFFER: int = 50
+    LOOP_LAG_INTERVAL: float = 0.25
+
+    class Config:
         env_file = ".env"
 
 
 Settings = settings()
-
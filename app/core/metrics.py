@@ -0,0 +1,295 @@
+import time
+import uuid
+import asyncio
+import logging
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+from .config import Settings
+
+
+logger = logging.getLogger(__name__)
+
+
+# Seconds; spans from sub-millisecond cache hits to multi-second LLM replies
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    body = ",".join(f'{k}="{_escape(v)}"' for k, v in pairs)
+    return "{" + body + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = _label_key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in self._values.items():
+            lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+
+class Histogram:
+    """Fixed-bucket histogram; observe() is a bisect and two additions"""
+
+    def __init__(self, name: str, help: str, buckets: Iterable[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self._series: Dict[LabelKey, List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        series = self._series.get(key)
+        if series is None:
+            # Per-bucket counts, then sum and count
+            series = self._series[key] = [0.0] * (len(self.buckets) + 3)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, series in self._series.items():
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(key, ('le', str(bound)))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(key, ('le', '+Inf'))} {series[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {series[-2]}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {series[-1]}")
+        return lines
+
+
+class Gauge:
+    """Value read from a callback at scrape time"""
+
+    def __init__(self, name: str, help: str, collect: Callable[[], Iterable[Tuple[Dict[str, Any], float]]]):
+        self.name = name
+        self.help = help
+        self.collect = collect
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        try:
+            for labels, value in self.collect():
+                if value is not None:
+                    lines.append(f"{self.name}{_format_labels(_label_key(labels))} {value}")
+        except Exception as e:
+            logger.error(f"Error collecting gauge {self.name}: {e}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+
+    def counter(self, name: str, help: str) -> Counter:
+        return self._metrics.setdefault(name, Counter(name, help))
+
+    def histogram(self, name: str, help: str, buckets: Iterable[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._metrics.setdefault(name, Histogram(name, help, buckets))
+
+    def gauge(self, name: str, help: str, collect) -> Gauge:
+        self._metrics[name] = Gauge(name, help, collect)
+        return self._metrics[name]
+
+    def render(self) -> str:
+        """Prometheus text exposition format"""
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+stage_latency = metrics.histogram(
+    "firecomm_stage_latency_seconds", "Duration of each turn stage (span name)"
+)
+turns_total = metrics.counter("firecomm_turns_total", "Completed turns by kind and outcome")
+turn_latency = metrics.histogram("firecomm_turn_latency_seconds", "End-to-end turn duration")
+loop_lag = metrics.histogram(
+    "firecomm_event_loop_lag_seconds", "How late the event loop woke a sleeping task"
+)
+
+
+class Trace:
+    """
+    Spans recorded for one turn
+
+    Spans are flat (name, offset from turn start, duration, attributes)
+    so recording one costs a tuple append; the tree is implied by the
+    offsets.
+    """
+
+    def __init__(
+        self,
+        kind: str,
+        request_id: Optional[str] = None,
+        started: Optional[float] = None,
+        max_spans: int = 256,
+    ):
+        self.trace_id = request_id or str(uuid.uuid4())
+        self.kind = kind
+        self.started = time.perf_counter() if started is None else started
+        self.wall_start = time.time() - (time.perf_counter() - self.started)
+        self.spans: List[Tuple[str, float, float, Dict[str, Any]]] = []
+        self.max_spans = max_spans
+        self.dropped_spans = 0
+        self.duration: Optional[float] = None
+
+    def add_span(self, name: str, start: float, duration: float, attrs: Optional[Dict[str, Any]] = None):
+        stage_latency.observe(duration, stage=name)
+        if self.duration is not None:
+            # Background work that outlived the turn (e.g. summaries)
+            return
+        if len(self.spans) < self.max_spans:
+            self.spans.append((name, start - self.started, duration, attrs or {}))
+        else:
+            self.dropped_spans += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "kind": self.kind,
+            "start": self.wall_start,
+            "duration": self.duration,
+            "dropped_spans": self.dropped_spans,
+            "spans": [
+                {"name": name, "offset": offset, "duration": duration, **({"attrs": attrs} if attrs else {})}
+                for name, offset, duration, attrs in self.spans
+            ],
+        }
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+
+# Slowest recent turns, for finding where the tail latency goes
+slow_traces: Deque[Dict[str, Any]] = deque(maxlen=Settings.TRACE_SLOW_BUFFER)
+
+
+def start_trace(kind: str, request_id: Optional[str] = None, started: Optional[float] = None) -> Trace:
+    """Begin a trace for the current task and the tasks it creates"""
+    trace = Trace(kind, request_id, started)
+    _current_trace.set(trace)
+    return trace
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+def detach_trace():
+    """Stop adding the current task's spans to its trace (tasks it created keep it)"""
+    _current_trace.set(None)
+
+
+def finish_trace(trace: Trace, outcome: str = "ok"):
+    trace.duration = time.perf_counter() - trace.started
+    turn_latency.observe(trace.duration, kind=trace.kind)
+    turns_total.inc(kind=trace.kind, outcome=outcome)
+    if trace.duration >= Settings.TRACE_SLOW_TURN_SECONDS:
+        slow_traces.append({**trace.to_dict(), "outcome": outcome})
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """
+    Time a block as a stage of the current turn
+
+    Always feeds the stage latency histogram; also adds a span to the
+    current trace when there is one.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add_span(name, start, duration, attrs)
+        else:
+            stage_latency.observe(duration, stage=name)
+
+
+def record_span(name: str, start: float, **attrs):
+    """Record a stage that started at `start` (perf_counter) and ends now"""
+    duration = time.perf_counter() - start
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_span(name, start, duration, attrs)
+    else:
+        stage_latency.observe(duration, stage=name)
+
+
+class LoopLagMonitor:
+    """Samples how late the event loop wakes a sleeping task"""
+
+    def __init__(self, interval: float = Settings.LOOP_LAG_INTERVAL, window: int = 10000):
+        self.interval = interval
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        # Recent samples for windowed percentiles (see take_samples)
+        self.samples: Deque[float] = deque(maxlen=window)
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - start - self.interval)
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            self.samples.append(lag)
+            loop_lag.observe(lag)
+
+    def take_samples(self) -> List[float]:
+        """Samples since the previous call, oldest first"""
+        samples = list(self.samples)
+        self.samples.clear()
+        return samples
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+loop_lag_monitor = LoopLagMonitor()
+metrics.gauge(
+    "firecomm_event_loop_lag_last_seconds",
+    "Most recent event loop lag sample",
+    lambda: [({}, loop_lag_monitor.last_lag)],
+)
@@ -0,0 +1,96 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, TypeVar
+from .metrics import metrics
+
+
+T = TypeVar("T")
+
+singleflight_calls = metrics.counter(
+    "firecomm_singleflight_calls_total",
+    "Calls by flight and role (leader = upstream call, coalesced = shared its result)"
+)
+
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Collapse identical concurrent calls into one
+
+    The first caller for a key starts the call as its own task; callers
+    that arrive while it is in flight await that same task instead of
+    issuing another upstream request, and all of them get its result or
+    its exception. Nothing is cached: the key is forgotten as soon as the
+    call finishes.
+
+    A cancelled caller only stops waiting. The shared call keeps running
+    for the remaining callers and is cancelled once nobody is waiting for
+    it, so an abandoned request stops spending upstream time.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[str, _Call] = {}
+        self.leaders = 0
+        self.coalesced = 0
+        self.abandoned = 0
+
+    def in_flight(self, key: str) -> bool:
+        return key in self._calls
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run `fn()` unless a call for `key` is already in flight
+
+        Args:
+            key: Normalized identity of the request (e.g. a content hash)
+            fn: Starts the upstream call; only invoked by the leader
+
+        Returns:
+            Result of the shared call
+        """
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.create_task(fn()))
+            call.task.add_done_callback(lambda task, key=key, call=call: self._finished(key, call))
+            self._calls[key] = call
+            self.leaders += 1
+            singleflight_calls.inc(flight=self.name, role="leader")
+        else:
+            self.coalesced += 1
+            singleflight_calls.inc(flight=self.name, role="coalesced")
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # Every caller gave up; later callers start a fresh call
+                self.abandoned += 1
+                singleflight_calls.inc(flight=self.name, role="abandoned")
+                self._calls.pop(key, None)
+                call.task.cancel()
+
+    def _finished(self, key: str, call: _Call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        if not call.task.cancelled():
+            # Mark the exception retrieved even if every caller has gone
+            call.task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.leaders + self.coalesced
+        return {
+            "in_flight": len(self._calls),
+            "upstream_calls": self.leaders,
+            "coalesced_calls": self.coalesced,
+            "abandoned_calls": self.abandoned,
+            "coalesced_ratio": self.coalesced / total if total else 0.0,
+        }
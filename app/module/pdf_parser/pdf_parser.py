@@ -0,0 +1,203 @@
+import os
+import re
+import json
+import asyncio
+import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+from pypdf import PdfReader
+
+
+logger = logging.getLogger(__name__)
+
+
+def _extract(reader: PdfReader, page_number: int) -> Tuple[int, str]:
+    return page_number, clean_text(reader.pages[page_number].extract_text() or "")
+
+
+def extract_pages(path: str, first: int, stop: int) -> List[Tuple[int, str]]:
+    """
+    Extract and clean pages [first, stop) (runs inside a worker process)
+
+    The reader only lives for this call: pypdf keeps every parsed page
+    on its reader, so a reader kept per worker would grow with the file.
+    """
+    reader = PdfReader(path)
+    return [_extract(reader, page_number) for page_number in range(first, stop)]
+
+
+def clean_text(text: str) -> str:
+    """Normalize extracted page text for chunking"""
+    # Re-join words hyphenated across line breaks
+    text = re.sub(r"(\w)-\n(\w)", r"\1\2", text)
+    lines = []
+    for line in text.splitlines():
+        line = re.sub(r"[ \t]+", " ", line).strip()
+        # Drop bare page numbers / running footers like "12" or "Page 12 of 80"
+        if re.fullmatch(r"(page\s+)?\d+(\s+of\s+\d+)?", line, flags=re.IGNORECASE):
+            continue
+        lines.append(line)
+    text = "\n".join(lines)
+    return re.sub(r"\n{3,}", "\n\n", text).strip()
+
+
+class PDFParser:
+    """
+    Streaming PDF parser for large product manuals
+
+    Pages are extracted on a process pool in runs of `pages_per_task`, with
+    a bounded number of pages in flight, and handed on in page order, so
+    memory stays proportional to `max_in_flight` rather than to the size
+    of the file.
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        max_in_flight: int = 8,
+        pages_per_task: int = 4,
+    ):
+        self.max_workers = max_workers or os.cpu_count() or 2
+        self.max_in_flight = max_in_flight
+        self.pages_per_task = pages_per_task
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    @staticmethod
+    def page_count(path: str) -> int:
+        return len(PdfReader(path).pages)
+
+    def iter_pages(self, path: str, start_page: int = 0) -> Iterator[Tuple[int, str]]:
+        """Extract pages one by one in the current process"""
+        reader = PdfReader(path)
+        for page_number in range(start_page, len(reader.pages)):
+            yield _extract(reader, page_number)
+
+    async def stream_pages(self, path: str, start_page: int = 0) -> AsyncIterator[Tuple[int, str]]:
+        """Extract pages on the process pool, yielding them in page order"""
+        loop = asyncio.get_running_loop()
+        total = await asyncio.to_thread(self.page_count, path)
+        in_flight: deque = deque()
+        next_page = start_page
+
+        try:
+            while next_page < total or in_flight:
+                while next_page < total and len(in_flight) * self.pages_per_task < self.max_in_flight:
+                    stop = min(total, next_page + self.pages_per_task)
+                    in_flight.append(
+                        loop.run_in_executor(self.executor, extract_pages, path, next_page, stop)
+                    )
+                    next_page = stop
+                for page in await in_flight.popleft():
+                    yield page
+        finally:
+            for future in in_flight:
+                future.cancel()
+
+    @staticmethod
+    def _checkpoint_path(path: str, checkpoint_dir: str) -> str:
+        name = re.sub(r"[^\w.-]", "_", os.path.abspath(path))
+        return os.path.join(checkpoint_dir, f"{name}.json")
+
+    @staticmethod
+    def _fingerprint(path: str) -> Dict[str, Any]:
+        stat = os.stat(path)
+        return {"size": stat.st_size, "mtime": stat.st_mtime}
+
+    def load_checkpoint(self, path: str, checkpoint_dir: str) -> int:
+        """Return the first page not yet committed for this (unchanged) file"""
+        try:
+            with open(self._checkpoint_path(path, checkpoint_dir), encoding="utf-8") as f:
+                checkpoint = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return 0
+        if checkpoint.get("fingerprint") != self._fingerprint(path):
+            return 0
+        return checkpoint.get("next_page", 0)
+
+    def save_checkpoint(self, path: str, checkpoint_dir: str, next_page: int):
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        checkpoint_path = self._checkpoint_path(path, checkpoint_dir)
+        tmp_path = f"{checkpoint_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "source": os.path.abspath(path),
+                "fingerprint": self._fingerprint(path),
+                "next_page": next_page,
+            }, f)
+        os.replace(tmp_path, checkpoint_path)
+
+    async def ingest(
+        self,
+        path: str,
+        vector_store,
+        embedder,
+        checkpoint_dir: str = "./ingest_checkpoints",
+        pages_per_commit: int = 32,
+        metadata: Optional[Dict[str, Any]] = None,
+        **ingest_kwargs,
+    ) -> Dict[str, Any]:
+        """
+        Stream a PDF into VectorStore ingestion, resuming from the last commit
+
+        Pages are fed to `vector_store.ingest_documents` in windows of
+        `pages_per_commit`; the checkpoint advances only after every batch
+        of a window has been written, so an interrupted or failed run
+        restarts at that window.
+
+        Returns:
+            Totals across all windows, plus the page range processed
+        """
+        start_page = self.load_checkpoint(path, checkpoint_dir)
+        if start_page:
+            logger.info(f"↩️ Resuming {os.path.basename(path)} from page {start_page + 1}")
+
+        source = os.path.basename(path)
+        base_metadata = {"source": source, **(metadata or {})}
+        totals = {"pages": 0, "documents": 0, "chunks": 0, "skipped": 0, "embedded": 0, "written": 0}
+        pages = self.stream_pages(path, start_page)
+        window_done = asyncio.Event()
+        state = {"last_page": start_page - 1}
+
+        async def window():
+            # Pull up to pages_per_commit pages from the shared page stream
+            count = 0
+            async for page_number, text in pages:
+                state["last_page"] = page_number
+                totals["pages"] += 1
+                count += 1
+                if text:
+                    yield {"text": text, "metadata": {**base_metadata, "page": page_number + 1}}
+                if count >= pages_per_commit:
+                    return
+            window_done.set()
+
+        try:
+            while not window_done.is_set():
+                # Raises if any batch of the window failed, leaving the checkpoint behind it
+                report = await vector_store.ingest_documents(window(), embedder, **ingest_kwargs)
+                for key in ("documents", "chunks", "skipped", "embedded", "written"):
+                    totals[key] += report[key]
+                if report["written"] < report["embedded"]:
+                    raise RuntimeError(
+                        f"{source}: {report['embedded'] - report['written']} chunks of the window "
+                        f"ending at page {state['last_page'] + 1} were not written"
+                    )
+                self.save_checkpoint(path, checkpoint_dir, state["last_page"] + 1)
+        finally:
+            await pages.aclose()
+
+        totals["start_page"] = start_page
+        totals["end_page"] = state["last_page"] + 1
+        return totals
@@ -0,0 +1,39 @@
+import time
+from typing import Optional
+
+
+class AudioIngestBuffer:
+    """
+    Bounded buffer for one streamed voice recording
+
+    Binary websocket frames are appended as they arrive between a
+    `voice_start` and a `voice_end` message, so the clip is held once as
+    raw bytes instead of as JSON text, base64 and decoded bytes.
+    """
+
+    def __init__(self, max_bytes: int, format: str = "webm"):
+        self.max_bytes = max_bytes
+        self.format = format
+        self._data = bytearray()
+        self.frames = 0
+        self.started_at = time.time()
+        self.ended_at: Optional[float] = None
+
+    def append(self, chunk: bytes):
+        """Append a frame, enforcing the per-connection size cap"""
+        if len(self._data) + len(chunk) > self.max_bytes:
+            raise ValueError(
+                f"Audio exceeds maximum upload size of {self.max_bytes} bytes"
+            )
+        self._data += chunk
+        self.frames += 1
+
+    def finish(self) -> bytes:
+        """Close the recording and return its bytes"""
+        self.ended_at = time.time()
+        audio = bytes(self._data)
+        self._data = bytearray()
+        return audio
+
+    def __len__(self) -> int:
+        return len(self._data)
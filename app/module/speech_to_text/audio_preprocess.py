@@ -0,0 +1,200 @@
+import io
+import time
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+from ...core.config import Settings
+
+
+logger = logging.getLogger(__name__)
+
+
+# Container signatures, checked against the first bytes of the upload
+_SIGNATURES = (
+    (b"\x1a\x45\xdf\xa3", 0, "webm"),
+    (b"OggS", 0, "ogg"),
+    (b"fLaC", 0, "flac"),
+    (b"ID3", 0, "mp3"),
+    (b"ftyp", 4, "mp4"),
+)
+
+# Encoder settings for the compact re-encode
+_EXPORT_CODECS = {
+    "ogg": {"codec": "libopus"},
+    "webm": {"codec": "libopus"},
+    "mp3": {},
+    "wav": {},
+    "flac": {},
+}
+
+
+def detect_format(audio_data: bytes) -> Optional[str]:
+    """Detect the container from magic bytes; None when unknown"""
+    if audio_data[:4] == b"RIFF" and audio_data[8:12] == b"WAVE":
+        return "wav"
+    for signature, offset, name in _SIGNATURES:
+        if audio_data[offset:offset + len(signature)] == signature:
+            return name
+    if len(audio_data) > 1 and audio_data[0] == 0xFF and audio_data[1] & 0xE0 == 0xE0:
+        # Bare MPEG audio frame sync
+        return "mp3"
+    return None
+
+
+def _preprocess(
+    audio_data: bytes,
+    source_format: str,
+    sample_rate: int,
+    silence_threshold: float,
+    padding_ms: int,
+    output_format: str,
+    bitrate: str,
+) -> Tuple[bytes, float, float]:
+    """
+    Decode, trim silence, downmix and resample one clip (runs in a worker)
+
+    Returns:
+        (encoded audio, duration before trimming, duration after) in seconds
+    """
+    from pydub import AudioSegment
+    from pydub.silence import detect_leading_silence
+
+    sound = AudioSegment.from_file(io.BytesIO(audio_data), format=source_format)
+    original_duration = len(sound) / 1000
+
+    start = detect_leading_silence(sound, silence_threshold=silence_threshold)
+    end = len(sound) - detect_leading_silence(sound.reverse(), silence_threshold=silence_threshold)
+    if end > start:
+        # Leave some padding so word onsets are not clipped
+        sound = sound[max(0, start - padding_ms):min(len(sound), end + padding_ms)]
+
+    sound = sound.set_channels(1).set_frame_rate(sample_rate)
+
+    out = io.BytesIO()
+    sound.export(
+        out,
+        format=output_format,
+        bitrate=bitrate,
+        **_EXPORT_CODECS.get(output_format, {}),
+    )
+    return out.getvalue(), original_duration, len(sound) / 1000
+
+
+def _warm_worker() -> bool:
+    """Import pydub in a pool process so the first real clip does not pay for it"""
+    try:
+        import pydub  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class AudioPreprocessor:
+    """
+    Pre-STT audio normalization on a process pool
+
+    Detects the real container (clients often mislabel it), trims
+    leading/trailing silence, downmixes to mono, resamples to
+    `sample_rate` and re-encodes compactly. Decoding is CPU bound, so it
+    runs in worker processes and never blocks the event loop. If a clip
+    cannot be decoded the original bytes are passed through unchanged.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = Settings.STT_PREPROCESS_WORKERS,
+        sample_rate: int = Settings.STT_SAMPLE_RATE,
+        silence_threshold: float = Settings.STT_SILENCE_THRESHOLD_DBFS,
+        padding_ms: int = Settings.STT_SILENCE_PADDING_MS,
+        output_format: str = Settings.STT_PREPROCESS_FORMAT,
+        bitrate: str = Settings.STT_PREPROCESS_BITRATE,
+    ):
+        self.max_workers = max_workers
+        self.sample_rate = sample_rate
+        self.silence_threshold = silence_threshold
+        self.padding_ms = padding_ms
+        self.output_format = output_format
+        self.bitrate = bitrate
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+        self.processed = 0
+        self.fallbacks = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.seconds_in = 0.0
+        self.seconds_out = 0.0
+        self.total_time = 0.0
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    async def warm(self):
+        """Start every pool process ahead of the first upload"""
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(
+            loop.run_in_executor(self.executor, _warm_worker) for _ in range(self.max_workers)
+        ))
+
+    async def process(self, audio_data: bytes, format_hint: str = "webm") -> Tuple[bytes, str]:
+        """
+        Normalize a clip for transcription
+
+        Args:
+            audio_data: Uploaded audio bytes
+            format_hint: Format the client claimed, used when detection fails
+
+        Returns:
+            (audio bytes, format) to hand to the STT backend
+        """
+        source_format = detect_format(audio_data) or format_hint
+        start = time.time()
+        loop = asyncio.get_running_loop()
+        try:
+            processed, seconds_in, seconds_out = await loop.run_in_executor(
+                self.executor,
+                _preprocess,
+                audio_data,
+                source_format,
+                self.sample_rate,
+                self.silence_threshold,
+                self.padding_ms,
+                self.output_format,
+                self.bitrate,
+            )
+        except Exception as e:
+            self.fallbacks += 1
+            logger.warning(f"Audio preprocessing failed ({e}); sending original {source_format}")
+            return audio_data, source_format
+
+        elapsed = time.time() - start
+        self.processed += 1
+        self.bytes_in += len(audio_data)
+        self.bytes_out += len(processed)
+        self.seconds_in += seconds_in
+        self.seconds_out += seconds_out
+        self.total_time += elapsed
+        logger.info(
+            f"🎚️ Preprocessed audio: {len(audio_data)} -> {len(processed)} bytes, "
+            f"{seconds_in:.1f}s -> {seconds_out:.1f}s in {elapsed:.3f}s"
+        )
+        return processed, self.output_format
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "processed": self.processed,
+            "fallbacks": self.fallbacks,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "compression_ratio": self.bytes_out / self.bytes_in if self.bytes_in else None,
+            "seconds_trimmed": self.seconds_in - self.seconds_out,
+            "avg_time": self.total_time / self.processed if self.processed else 0.0,
+        }
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
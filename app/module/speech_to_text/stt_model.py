@@ -1,24 +1,217 @@
 import io
-from openai import OpenAI
-from ...config.config import settings
+import random
+import hashlib
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+import httpx
+from openai import AsyncOpenAI, APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
+from ...core.config import Settings
+from ...core.admission import admission
+from ...core.metrics import span
+from ...core.singleflight import SingleFlight
+from .audio_preprocess import AudioPreprocessor
+
+
+logger = logging.getLogger(__name__)
+
+
+RETRYABLE_ERRORS = (APIConnectionError, APITimeoutError, InternalServerError, RateLimitError)
+
+# Re-sent or duplicated uploads of the same clip share one transcription
+stt_flight = SingleFlight("stt")
+
+
+class STTBackend(ABC):
+    """Interface for speech-to-text engines used by STTservice"""
+
+    name = "base"
+
+    @abstractmethod
+    async def transcribe(self, audio_data: bytes, filename: str) -> str:
+        """Return the transcript of one audio clip"""
+
+    async def aclose(self):
+        pass
+
+
+class OpenAISTTBackend(STTBackend):
+    """
+    Whisper API backend on a shared, pooled async client
+
+    Every instance in the process reuses one AsyncOpenAI/httpx client so
+    connections are kept alive across requests.
+    """
+
+    name = "openai"
+    _shared_client: Optional[AsyncOpenAI] = None
+
+    def __init__(
+        self,
+        model: str = "whisper-1",
+        max_retries: int = Settings.STT_MAX_RETRIES,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+    ):
+        self.model = model
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    @classmethod
+    def get_client(cls) -> AsyncOpenAI:
+        if cls._shared_client is None:
+            cls._shared_client = AsyncOpenAI(
+                api_key=Settings.OPENAI_API_KEY,
+                timeout=Settings.STT_TIMEOUT,
+                # Retries are handled here so they get jittered backoff
+                max_retries=0,
+                http_client=httpx.AsyncClient(
+                    timeout=Settings.STT_TIMEOUT,
+                    limits=httpx.Limits(
+                        max_connections=Settings.STT_MAX_CONNECTIONS,
+                        max_keepalive_connections=Settings.STT_MAX_CONNECTIONS,
+                    ),
+                ),
+            )
+        return cls._shared_client
+
+    async def transcribe(self, audio_data: bytes, filename: str) -> str:
+        client = self.get_client()
+        attempt = 0
+        while True:
+            audio_file = io.BytesIO(audio_data)
+            audio_file.name = filename
+            try:
+                async with admission.slot("stt"):
+                    response = await client.audio.transcriptions.create(
+                        model=self.model,
+                        file=audio_file
+                    )
+                return response.text
+            except RETRYABLE_ERRORS as e:
+                if attempt >= self.max_retries:
+                    raise e
+                # Exponential backoff with full jitter
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+                logger.warning(f"STT attempt {attempt + 1} failed ({e}); retrying in {delay:.2f}s")
+                attempt += 1
+                await asyncio.sleep(delay)
+
+    async def aclose(self):
+        if OpenAISTTBackend._shared_client is not None:
+            await OpenAISTTBackend._shared_client.close()
+            OpenAISTTBackend._shared_client = None
+
+
+_local_model = None
+
+
+def _local_transcribe(model_size: str, audio_data: bytes) -> str:
+    """Run faster-whisper in the current worker, loading the model once per worker"""
+    global _local_model
+    if _local_model is None:
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError as e:
+            raise RuntimeError(
+                "Local STT backend requires `pip install faster-whisper`"
+            ) from e
+        _local_model = WhisperModel(model_size, compute_type="int8")
+
+    segments, _ = _local_model.transcribe(io.BytesIO(audio_data))
+    return " ".join(segment.text.strip() for segment in segments)
+
+
+class LocalSTTBackend(STTBackend):
+    """In-process transcription engine run on a thread or process pool"""
+
+    name = "local"
+
+    def __init__(
+        self,
+        model_size: str = Settings.STT_LOCAL_MODEL,
+        max_workers: int = Settings.STT_LOCAL_WORKERS,
+        executor: str = Settings.STT_LOCAL_EXECUTOR,
+    ):
+        self.model_size = model_size
+        if executor == "process":
+            self.executor: Executor = ProcessPoolExecutor(max_workers=max_workers)
+        else:
+            self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="stt")
+
+    async def transcribe(self, audio_data: bytes, filename: str) -> str:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, _local_transcribe, self.model_size, audio_data
+        )
+
+    async def aclose(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class FakeSTTBackend(STTBackend):
+    """Deterministic backend for tests and benchmarks; never calls upstream"""
+
+    name = "fake"
+
+    def __init__(self, transcript: str = "Hello, this is a test.", latency: float = 0.0):
+        self.transcript = transcript
+        self.latency = latency
+        self.calls = 0
+
+    async def transcribe(self, audio_data: bytes, filename: str) -> str:
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self.transcript
+
+
+def create_stt_backend(name: str = Settings.STT_BACKEND) -> STTBackend:
+    if name == "local":
+        return LocalSTTBackend()
+    if name == "fake":
+        return FakeSTTBackend()
+    if name == "openai":
+        return OpenAISTTBackend()
+    raise ValueError(f"Unknown STT backend: {name}")
 
 
 class STTservice:
-    def __init__(self,):
-        self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
+    def __init__(
+        self,
+        backend: Optional[STTBackend] = None,
+        preprocessor: Optional[AudioPreprocessor] = None,
+    ):
+        self.backend = backend or create_stt_backend()
+        self.preprocessor = preprocessor
+        if preprocessor is None and Settings.STT_PREPROCESS_ENABLED:
+            self.preprocessor = AudioPreprocessor()
 
-    async def transcribe_speech(self, audio_data: bytes ) -> str:
+    @staticmethod
+    def make_key(audio_data: bytes, format: str, backend: str) -> str:
+        digest = hashlib.blake2b(audio_data, digest_size=16).hexdigest()
+        return f"{backend}:{format}:{digest}"
+
+    async def transcribe_speech(self, audio_data: bytes, format: str = "webm") -> str:
+        key = self.make_key(audio_data, format, self.backend.name)
+        return await stt_flight.do(key, lambda: self._transcribe(audio_data, format))
+
+    async def _transcribe(self, audio_data: bytes, format: str) -> str:
 
         try:
-            audio_file = io.BytesIO(audio_data)
-            audio_file.name = "audio.webm" 
-            
+            if self.preprocessor:
+                with span("stt.preprocess", bytes_in=len(audio_data)):
+                    audio_data, format = await self.preprocessor.process(audio_data, format)
+            with span("stt.transcribe", backend=self.backend.name, bytes=len(audio_data)):
+                return await self.backend.transcribe(audio_data, f"audio.{format}")
 
-            response = self.client.audio.transcriptions.create(
-                model="whisper-1",
-                file=audio_file
-            )
-            return response.text
-        
         except Exception as e:
-            raise e
\ No newline at end of file
+            raise e
+
+    async def aclose(self):
+        if self.preprocessor:
+            self.preprocessor.close()
+        await self.backend.aclose()
@@ -0,0 +1,20 @@
+import struct
+from typing import Tuple
+
+
+# Binary TTS frame header: sequence (uint32), chunk index (uint32), flags (uint8)
+AUDIO_FRAME_HEADER = struct.Struct("!IIB")
+
+FLAG_LAST_CHUNK = 0x01
+
+
+def encode_audio_frame(sequence: int, chunk_index: int, data: bytes, last: bool = False) -> bytes:
+    """Prefix an audio chunk with its sentence/sequence header"""
+    flags = FLAG_LAST_CHUNK if last else 0
+    return AUDIO_FRAME_HEADER.pack(sequence, chunk_index, flags) + data
+
+
+def decode_audio_frame(frame: bytes) -> Tuple[int, int, bool, bytes]:
+    """Split a binary frame into (sequence, chunk_index, last, data)"""
+    sequence, chunk_index, flags = AUDIO_FRAME_HEADER.unpack_from(frame)
+    return sequence, chunk_index, bool(flags & FLAG_LAST_CHUNK), frame[AUDIO_FRAME_HEADER.size:]
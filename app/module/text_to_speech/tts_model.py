@@ -1,10 +1,45 @@
+import time
 import base64
+import logging
+from typing import AsyncIterator, Iterable, Optional
 from openai import AsyncOpenAI
+from ...core.config import Settings
+from ...core.admission import Priority, admission, set_request_priority
+from ...core.metrics import metrics, record_span, span
+from ...core.singleflight import SingleFlight
+from .tts_cache import TTSCache
+
+
+logger = logging.getLogger(__name__)
+
+
+# Shared by every TTSservice in the process so concurrent callers
+# cannot fan out into unbounded upstream requests
+tts_gate = admission.gate("tts")
+
+# Identical concurrent requests (same text/voice/format) share one call
+tts_flight = SingleFlight("tts")
+
+tts_requests = metrics.counter("firecomm_tts_requests_total", "TTS requests by mode and source (cache/coalesced/upstream)")
+
+
+def create_tts_cache() -> Optional[TTSCache]:
+    """Cache for repeated phrases (greetings, confirmations, disclaimers), or None if disabled"""
+    if not Settings.TTS_CACHE_ENABLED:
+        return None
+    return TTSCache(
+        max_memory_bytes=Settings.TTS_CACHE_MEMORY_BYTES,
+        disk_dir=Settings.TTS_CACHE_DIR or None,
+        max_disk_bytes=Settings.TTS_CACHE_DISK_BYTES,
+        max_entry_bytes=Settings.TTS_CACHE_MAX_ENTRY_BYTES,
+    )
 
 
 class TTSservice:
-    def __init__(self):
+    def __init__(self, model: str = "tts-1", cache: Optional[TTSCache] = None):
         self.client = AsyncOpenAI()
+        self.model = model
+        self.cache = cache
     
     async def generate_speech(
         self, 
@@ -24,20 +59,14 @@ class TTSservice:
             base64-encoded audio string (ready for JSON serialization)
         """
         try:
-            response = await self.client.audio.speech.create(
-                model="tts-1",
-                voice=voice,
-                response_format=format,
-                input=text
-            )
+            audio_bytes = await self.generate_speech_bytes(text, voice, format)
             
             # ✅ ALWAYS return base64-encoded string for JSON serialization
-            audio_bytes = response.content
             audio_base64 = base64.b64encode(audio_bytes).decode('utf-8')
             return audio_base64
             
         except Exception as e:
-            print(f"Error in TTS service: {str(e)}")
+            logger.error(f"Error in TTS service: {str(e)}")
             raise e
     
     async def generate_speech_bytes(
@@ -59,15 +88,135 @@ class TTSservice:
             Raw audio bytes
         """
         try:
-            response = await self.client.audio.speech.create(
-                model="tts-1",
-                voice=voice,
-                response_format=format,
-                input=text
+            cache_key = TTSCache.make_key(text, voice, format, self.model)
+            if self.cache:
+                cached = await self.cache.get(cache_key)
+                if cached is not None:
+                    tts_requests.inc(mode="bytes", source="cache")
+                    return cached
+
+            return await tts_flight.do(
+                cache_key,
+                lambda: self._synthesize(text, voice, format, cache_key)
             )
             
-            return response.content
+        except Exception as e:
+            logger.error(f"Error in TTS service: {str(e)}")
+            raise e
+
+    async def _synthesize(self, text: str, voice: str, format: str, cache_key: str) -> bytes:
+        """One upstream TTS request (the singleflight leader's call)"""
+        tts_requests.inc(mode="bytes", source="upstream")
+        with span("tts.synthesize", chars=len(text)):
+            async with tts_gate.slot():
+                response = await self.client.audio.speech.create(
+                    model=self.model,
+                    voice=voice,
+                    response_format=format,
+                    input=text
+                )
+
+        audio_bytes = response.content
+        if self.cache:
+            await self.cache.put(cache_key, audio_bytes)
+        return audio_bytes
+
+    async def stream_speech(
+        self,
+        text: str,
+        voice: str = "alloy",
+        format: str = "mp3",
+        chunk_size: int = 4096
+    ) -> AsyncIterator[bytes]:
+        """
+        Stream speech audio as raw byte chunks while it is synthesized
+        (Memory stays flat regardless of utterance length)
+        
+        Args:
+            text: Text to convert to speech
+            voice: Voice to use
+            format: Audio format
+            chunk_size: Max bytes per yielded chunk
             
+        Yields:
+            Raw audio byte chunks
+        """
+        try:
+            cache_key = TTSCache.make_key(text, voice, format, self.model)
+            cached = await self.cache.get(cache_key) if self.cache else None
+            source = "cache"
+            if cached is None and tts_flight.in_flight(cache_key):
+                # Same text is already being synthesized (e.g. pre-emptive TTS)
+                source = "coalesced"
+                cached = await tts_flight.do(
+                    cache_key,
+                    lambda: self._synthesize(text, voice, format, cache_key)
+                )
+            if cached is not None:
+                tts_requests.inc(mode="stream", source=source)
+                for i in range(0, len(cached), chunk_size):
+                    yield cached[i:i + chunk_size]
+                return
+
+            # Only short utterances are collected for the cache so long
+            # replies still stream with flat memory
+            collected: Optional[bytearray] = bytearray() if self.cache else None
+
+            tts_requests.inc(mode="stream", source="upstream")
+            start = time.perf_counter()
+            first_byte = True
+            async with tts_gate.slot():
+                async with self.client.audio.speech.with_streaming_response.create(
+                    model=self.model,
+                    voice=voice,
+                    response_format=format,
+                    input=text
+                ) as response:
+                    async for chunk in response.iter_bytes(chunk_size):
+                        if first_byte:
+                            first_byte = False
+                            record_span("tts.first_byte", start, chars=len(text))
+                        if collected is not None:
+                            collected += chunk
+                            if len(collected) > self.cache.max_entry_bytes:
+                                collected = None
+                        yield chunk
+            record_span("tts.stream", start, chars=len(text))
+
+            if collected:
+                await self.cache.put(cache_key, bytes(collected))
+
         except Exception as e:
-            print(f"Error in TTS service: {str(e)}")
-            raise e
\ No newline at end of file
+            logger.error(f"Error in TTS streaming: {str(e)}")
+            raise e
+
+    async def prewarm(
+        self,
+        phrases: Iterable[str],
+        voice: str = "alloy",
+        format: str = "mp3"
+    ) -> int:
+        """
+        Synthesize a phrase list into the cache ahead of traffic
+
+        Returns:
+            Number of phrases now cached
+        """
+        if not self.cache:
+            return 0
+
+        # Never competes with live voice turns for TTS slots
+        set_request_priority(Priority.BACKGROUND)
+        warmed = 0
+        for phrase in phrases:
+            phrase = phrase.strip()
+            if not phrase:
+                continue
+            try:
+                await self.generate_speech_bytes(phrase, voice, format)
+                warmed += 1
+            except Exception as e:
+                logger.warning(f"Error pre-warming TTS cache for '{phrase[:30]}': {e}")
+
+        logger.info(f"🔥 TTS cache pre-warmed with {warmed} phrases")
+        return warmed
@@ -1,18 +1,93 @@
-import base64
 import time
 import asyncio
-from typing import Any, Callable, AsyncGenerator, List, Optional
-from ..speech_to_text.stt_model import STTservice
-from ..text_to_speech.tts_model import TTSservice
+import logging
+from typing import Any, Callable, AsyncGenerator, Dict, List, Optional
+from ..speech_to_text.stt_model import STTservice, stt_flight
+from ..text_to_speech.tts_model import TTSservice, tts_flight, tts_gate
+from .tts_scheduler import OrderedTTSScheduler, is_end
+from .segmenter import SentenceSegmenter
+from .speculation import SpeculationBudget
+
+
+logger = logging.getLogger(__name__)
 
 
 class VoicePipeline:
-    def __init__(self):
-        self.stt_service = STTservice()
-        self.tts_service = TTSservice()
+    """
+    Process-wide owner of the STT/TTS clients
+
+    Holds no per-conversation state; every websocket connection gets its
+    own VoicePipelineSession via create_session().
+    """
+
+    def __init__(
+        self,
+        stt_service: Optional[STTservice] = None,
+        tts_service: Optional[TTSservice] = None,
+    ):
+        self.stt_service = stt_service or STTservice()
+        self.tts_service = tts_service or TTSservice()
+        # Process-wide roll-up of every session's speculation outcomes
+        self.speculation = SpeculationBudget()
+
+    def create_session(self) -> "VoicePipelineSession":
+        """Create a pipeline session for a single connection"""
+        return VoicePipelineSession(
+            self.stt_service,
+            self.tts_service,
+            speculation=SpeculationBudget(parent=self.speculation),
+        )
+
+    def tts_stats(self) -> Dict[str, Any]:
+        """Queue depth and wait time of the shared TTS gate, plus cache and coalescing counters"""
+        stats = tts_gate.stats()
+        if self.tts_service.cache:
+            stats["cache"] = self.tts_service.cache.stats()
+        stats["speculation"] = self.speculation.stats()
+        stats["singleflight"] = tts_flight.stats()
+        return stats
+
+    def stt_stats(self) -> Dict[str, Any]:
+        """Bytes and time saved by audio preprocessing before STT"""
+        preprocessor = self.stt_service.preprocessor
+        return {
+            "preprocess": preprocessor.stats() if preprocessor else None,
+            "singleflight": stt_flight.stats(),
+        }
+
+
+class VoicePipelineSession:
+    """Per-connection voice pipeline holding its own speculative TTS state"""
+
+    def __init__(
+        self,
+        stt_service: STTservice,
+        tts_service: TTSservice,
+        speculation: Optional[SpeculationBudget] = None,
+    ):
+        self.stt_service = stt_service
+        self.tts_service = tts_service
+        self.speculation = speculation or SpeculationBudget()
         
         self.pending_tts_task: Optional[asyncio.Task] = None
         self.last_buffer = ""
+        self._speculative_tts = self.tts_service.generate_speech
+        self._active_scheduler: Optional[OrderedTTSScheduler] = None
+
+    def pending_work(self) -> Dict[str, Any]:
+        """TTS and speculative work that cancelling the current turn would save"""
+        work: Dict[str, Any] = (
+            self._active_scheduler.pending_work() if self._active_scheduler else {}
+        )
+        speculating = self.pending_tts_task is not None and not self.pending_tts_task.done()
+        work["speculative_requests_in_flight"] = 1 if speculating else 0
+        work["speculative_chars"] = len(self.last_buffer) if speculating else 0
+        return work
+
+    def close(self):
+        """Cancel any speculative work left over when the connection closes"""
+        self._discard_speculation()
+        self.last_buffer = ""
         
     async def pipeline(
         self,
@@ -20,11 +95,13 @@ class VoicePipeline:
         response_function: Callable[..., AsyncGenerator[str, None]],
         session_id: str,
         user_id: str,
-        stt_format: str = "wav",
+        stt_format: str = "webm",
         tts_voice: str = "alloy",
         tts_format: str = "mp3",
         enable_parallel_tts: bool = True,
         enable_preemptive_tts: bool = True,
+        tts_window: int = 3,
+        audio_transport: str = "json",
     ):
         """
         Advanced voice pipeline with multiple optimizations
@@ -34,13 +111,46 @@ class VoicePipeline:
             response_function: Async generator function
             session_id: Session identifier
             user_id: User identifier
+            stt_format: Container the client says it sent; the real format
+                is detected from the bytes when possible
             enable_parallel_tts: Generate multiple audio chunks in parallel
             enable_preemptive_tts: Start TTS before sentence completes
+            tts_window: Max TTS requests in flight when parallel TTS is enabled
+            audio_transport: "json" yields base64 `tts_audio` events,
+                "binary" yields raw `tts_audio_chunk` events while synthesizing
         """
+        turn_start = time.time()
+        events: asyncio.Queue = asyncio.Queue()
+        stream_audio = audio_transport == "binary"
+        self._speculative_tts = (
+            self.tts_service.generate_speech_bytes if stream_audio
+            else self.tts_service.generate_speech
+        )
+        scheduler = OrderedTTSScheduler(
+            synthesize=lambda text: self.tts_service.generate_speech(
+                text=text,
+                voice=tts_voice,
+                format=tts_format
+            ),
+            output=events,
+            format=tts_format,
+            window=tts_window if enable_parallel_tts else 1,
+            turn_start=turn_start,
+            stream=(
+                lambda text: self.tts_service.stream_speech(
+                    text=text,
+                    voice=tts_voice,
+                    format=tts_format
+                )
+            ) if stream_audio else None,
+        )
+        producer: Optional[asyncio.Task] = None
+        self._active_scheduler = scheduler
+
         try:
             # Step 1: Speech to Text
             stt_start = time.time()
-            transcript = await self.stt_service.transcribe_speech(audio_data)
+            transcript = await self.stt_service.transcribe_speech(audio_data, format=stt_format)
             stt_latency = time.time() - stt_start
             
             yield {
@@ -50,10 +160,60 @@ class VoicePipeline:
                 "timestamp": time.time()
             }
 
-            buffer = ""
-            sentences_to_generate: List[str] = []
-            
-            # Step 2: Get agent response
+            # Step 2: Stream agent response; sentences are handed to the
+            # scheduler as soon as they are segmented
+            producer = asyncio.create_task(self._produce(
+                transcript=transcript,
+                response_function=response_function,
+                session_id=session_id,
+                user_id=user_id,
+                scheduler=scheduler,
+                events=events,
+                tts_voice=tts_voice,
+                tts_format=tts_format,
+                enable_preemptive_tts=enable_preemptive_tts,
+            ))
+
+            # Step 3: Forward text and in-order audio as they become ready
+            while True:
+                event = await events.get()
+                if is_end(event):
+                    break
+                if isinstance(event, Exception):
+                    raise event
+                yield event
+
+            await producer
+            logger.info(
+                f"✅ Voice turn done: {scheduler.emitted} audio chunks, "
+                f"time to first audio {scheduler.time_to_first_audio}"
+            )
+
+        except Exception as e:
+            logger.error(f"Error in voice pipeline: {str(e)}")
+            raise e
+        finally:
+            if producer and not producer.done():
+                producer.cancel()
+            scheduler.cancel()
+            self._active_scheduler = None
+            self._discard_speculation()
+
+    async def _produce(
+        self,
+        transcript: str,
+        response_function: Callable[..., AsyncGenerator[str, None]],
+        session_id: str,
+        user_id: str,
+        scheduler: OrderedTTSScheduler,
+        events: asyncio.Queue,
+        tts_voice: str,
+        tts_format: str,
+        enable_preemptive_tts: bool,
+    ):
+        """Consume the LLM stream, emit text and submit sentences for TTS"""
+        segmenter = SentenceSegmenter()
+        try:
             async for text_chunk in response_function(
                 session_id=session_id,
                 user_input=transcript,
@@ -63,186 +223,83 @@ class VoicePipeline:
                     continue
                     
                 # Always yield text for display
-                yield {"type": "agent_text", "text": text_chunk}
-                buffer += text_chunk
+                await events.put({"type": "agent_text", "text": text_chunk})
+
+                # Hand completed sentences to the scheduler
+                for text_to_speak in segmenter.feed(text_chunk):
+                    self._submit_sentence(scheduler, text_to_speak)
 
                 # Pre-emptive TTS: Start generating audio speculatively
-                if enable_preemptive_tts and self._should_start_preemptive(buffer):
+                if (
+                    enable_preemptive_tts
+                    and not self.pending_tts_task
+                    and segmenter.should_speculate()
+                    and self.speculation.allow()
+                ):
                     await self._start_preemptive_tts(
-                        buffer, tts_voice, tts_format
+                        segmenter.pending_text, tts_voice, tts_format
                     )
 
-                # Check if we have complete sentences to generate
-                if self._should_generate_audio(buffer):
-                    text_to_speak = buffer.strip()
-                    buffer = ""
-                    
-                    # Cancel pre-emptive task if it was for wrong text
-                    if self.pending_tts_task and text_to_speak != self.last_buffer:
-                        self.pending_tts_task.cancel()
-                        self.pending_tts_task = None
-                    
-                    # Use pre-emptive result if available
-                    if self.pending_tts_task and text_to_speak == self.last_buffer:
-                        try:
-                            audio_base64 = await self.pending_tts_task
-                            yield {
-                                "type": "tts_audio",
-                                "audio": audio_base64,
-                                "format": tts_format,
-                                "timestamp": time.time(),
-                                "preemptive": True
-                            }
-                            self.pending_tts_task = None
-                            continue
-                        except asyncio.CancelledError:
-                            pass
-                    
-                    # Add to parallel generation queue
-                    if enable_parallel_tts:
-                        sentences_to_generate.append(text_to_speak)
-                        
-                        # Generate in parallel when we have multiple sentences
-                        if len(sentences_to_generate) >= 2:
-                            async for audio_result in self._generate_parallel_audio(
-                                sentences_to_generate, tts_voice, tts_format
-                            ):
-                                yield audio_result
-                            sentences_to_generate = []
-                    else:
-                        # Sequential generation
-                        tts_start = time.time()
-                        audio_base64 = await self.tts_service.generate_speech(
-                            text=text_to_speak,
-                            voice=tts_voice,
-                            format=tts_format
-                        )
-                        tts_latency = time.time() - tts_start
-                        
-                        yield {
-                            "type": "tts_audio",
-                            "audio": audio_base64,
-                            "format": tts_format,
-                            "timestamp": time.time(),
-                            "latency": tts_latency
-                        }
-
-            # Generate remaining sentences in parallel
-            if sentences_to_generate:
-                async for audio_result in self._generate_parallel_audio(
-                    sentences_to_generate, tts_voice, tts_format
-                ):
-                    yield audio_result
-            
-            if buffer.strip():
-                tts_start = time.time()
-                audio_base64 = await self.tts_service.generate_speech(
-                    text=buffer.strip(),
-                    voice=tts_voice,
-                    format=tts_format
-                )
-                tts_latency = time.time() - tts_start
-                
-                yield {
-                    "type": "tts_audio",
-                    "audio": audio_base64,
-                    "format": tts_format,
-                    "timestamp": time.time(),
-                    "latency": tts_latency
-                }
+            remainder = segmenter.flush()
+            if remainder:
+                self._submit_sentence(scheduler, remainder)
+
+            await scheduler.close()
 
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
-            print(f"Error in voice pipeline: {str(e)}")
-            raise e
-        finally:
-            if self.pending_tts_task:
-                self.pending_tts_task.cancel()
-                self.pending_tts_task = None
-    
-    async def _generate_parallel_audio(
-        self, 
-        sentences: List[str], 
-        voice: str, 
-        format: str
-    ):
-        """Generate audio for multiple sentences in parallel"""
-        print(f"🚀 Generating {len(sentences)} audio chunks in parallel")
-        
-        tasks = []
-        for sentence in sentences:
-            task = asyncio.create_task(
-                self._generate_with_timing(sentence, voice, format)
-            )
-            tasks.append(task)
-        
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        for i, result in enumerate(results):
-            if isinstance(result, Exception):
-                print(f"Error generating audio for sentence {i}: {result}")
-                continue
-            
-            audio_base64, latency = result
-            yield {
-                "type": "tts_audio",
-                "audio": audio_base64,
-                "format": format,
-                "timestamp": time.time(),
-                "latency": latency,
-                "parallel": True,
-                "batch_size": len(sentences)
-            }
-    
-    async def _generate_with_timing(self, text: str, voice: str, format: str):
-        """Generate audio and track timing"""
-        start = time.time()
-        audio = await self.tts_service.generate_speech(text, voice, format)
-        latency = time.time() - start
-        return audio, latency
+            await events.put(e)
+
+    def _submit_sentence(self, scheduler: OrderedTTSScheduler, text: str):
+        """Hand a sentence to the scheduler, reusing pre-emptive audio if it matches"""
+        if self.pending_tts_task and text == self.last_buffer:
+            self.speculation.record_hit(len(text))
+            scheduler.submit(text, task=self.pending_tts_task)
+            self.pending_tts_task = None
+            return
+
+        # Speculated text is a clean (word boundary) prefix: play its audio
+        # and only synthesize the rest of the sentence
+        prefix = self.last_buffer
+        if (
+            self.pending_tts_task
+            and prefix
+            and text.startswith(prefix)
+            and text[len(prefix)].isspace()
+        ):
+            self.speculation.record_prefix_hit(len(prefix))
+            scheduler.submit(prefix, task=self.pending_tts_task)
+            self.pending_tts_task = None
+            scheduler.submit(text[len(prefix):].strip())
+            return
+
+        # Cancel pre-emptive task if it was for wrong text
+        self._discard_speculation()
+
+        scheduler.submit(text)
+
+    def _discard_speculation(self):
+        """Cancel an unused pre-emptive request and count it as a miss"""
+        if self.pending_tts_task:
+            self.pending_tts_task.cancel()
+            self.pending_tts_task = None
+            self.speculation.record_miss(len(self.last_buffer))
     
     async def _start_preemptive_tts(self, buffer: str, voice: str, format: str):
         """Start generating audio speculatively before sentence completes"""
-        if self.pending_tts_task:
-            self.pending_tts_task.cancel()
+        if self.pending_tts_task and buffer.strip() == self.last_buffer:
+            # Already speculating on exactly this text
+            return
+        self._discard_speculation()
         
         self.last_buffer = buffer.strip()
+        self.speculation.record_start()
         self.pending_tts_task = asyncio.create_task(
-            self.tts_service.generate_speech(
+            self._speculative_tts(
                 text=self.last_buffer,
                 voice=voice,
                 format=format
             )
         )
-        print(f"🔮 Pre-emptive TTS started for: '{self.last_buffer[:30]}...'")
-    
-    def _should_start_preemptive(self, buffer: str) -> bool:
-        """
-        Decide if we should start pre-emptive TTS
-        Start when we have most of a sentence but not quite done
-        """
-        stripped = buffer.rstrip()
-        word_count = len(buffer.split())
-        
-        
-        if 6 <= word_count <= 10 and not self.pending_tts_task:
-            return True
-        
-        if stripped.endswith(",") and word_count >= 5 and not self.pending_tts_task:
-            return True
-        
-        return False
-    
-    def _should_generate_audio(self, buffer: str) -> bool:
-        """Determine if buffer is ready for definite TTS generation"""
-        stripped = buffer.rstrip()
-        
-        if stripped.endswith((".", "!", "?")):
-            return True
-        
-        if stripped.endswith(",") and len(buffer.split()) >= 8:
-            return True
-        
-        if len(buffer.split()) >= 12:
-            return True
-        
-        return False
\ No newline at end of file
+        logger.info(f"🔮 Pre-emptive TTS started for: '{self.last_buffer[:30]}...'")
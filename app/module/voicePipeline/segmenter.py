@@ -0,0 +1,245 @@
+import re
+from typing import List, Optional
+from ...core.config import Settings
+
+
+_TOKEN_RE = re.compile(r"\S+")
+# Chunks without any of these only extend the current word
+_BREAK_RE = re.compile(r"[\s.,!?]")
+
+# Trailing characters that may follow a sentence terminator ("Hi." / (see below.))
+_CLOSERS = "\"')]}”’"
+# What may still follow a sentence's terminator before its boundary is final
+_TERMINATOR_TAIL_RE = re.compile(r"[\s.!?" + re.escape(_CLOSERS) + r"]*\Z")
+
+# Lowercased tokens (without their final ".") that never end a sentence
+ABBREVIATIONS = frozenset({
+    "mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "vs", "e.g", "i.e",
+    "inc", "ltd", "co", "approx", "fig", "dept", "mt", "ft", "u.s",
+})
+# Only abbreviations when a number follows ("No. 5" but "No. It is not.")
+NUMBER_ABBREVIATIONS = frozenset({"no"})
+# "e." may still become "e.g."
+_ABBREVIATION_PREFIXES = frozenset(
+    word[:i] for word in ABBREVIATIONS for i, char in enumerate(word) if char == "."
+)
+
+
+def _strip_openers(core: str) -> str:
+    return core[:-1].lstrip("\"'([{“‘")
+
+
+def _has_words(text: str) -> bool:
+    return any(char.isalnum() for char in text)
+
+
+def _is_terminator_run(token: str) -> bool:
+    """Only terminators and closers, e.g. ".." or '?!"'"""
+    return not token.strip(".!?" + _CLOSERS)
+
+
+def _is_abbreviation(core: str) -> bool:
+    word = _strip_openers(core)
+    if len(word) == 1 and word.isupper() and word != "I":
+        # Initials such as "J. Smith"; "I." is the pronoun ending a sentence
+        return True
+    return word.lower() in ABBREVIATIONS
+
+
+class SentenceSegmenter:
+    """
+    Incremental sentence segmentation for streamed LLM text
+
+    Only the newly appended text is scanned on each `feed()`, so the cost
+    per reply is linear in its length (the old rules re-split the whole
+    buffer on every chunk). Segments end at sentence terminators
+    (abbreviations, initials and decimals excepted), at a comma once a
+    segment has enough words, or when a segment reaches its word cap.
+    A terminator only closes its segment once something other than more
+    terminators follows, so runs split across chunks ("Wait." + "..")
+    stay with their sentence instead of becoming segments of their own.
+
+    The first segment of a reply uses tighter limits so the first audio
+    starts early; later segments are longer so fewer TTS calls are made.
+    """
+
+    def __init__(
+        self,
+        max_words: int = Settings.VOICE_SEGMENT_MAX_WORDS,
+        comma_min_words: int = Settings.VOICE_SEGMENT_COMMA_WORDS,
+        first_max_words: int = Settings.VOICE_SEGMENT_FIRST_MAX_WORDS,
+        first_comma_min_words: int = Settings.VOICE_SEGMENT_FIRST_COMMA_WORDS,
+    ):
+        self.max_words = max_words
+        self.comma_min_words = comma_min_words
+        self.first_max_words = first_max_words
+        self.first_comma_min_words = first_comma_min_words
+        self.reset()
+
+    def reset(self):
+        self._text = ""
+        self._segment_start = 0
+        self._scan_pos = 0
+        self._words = 0
+        self._partial_word = False
+        self._trailing_comma = False
+        self.segments_emitted = 0
+        self._max_words = self.first_max_words
+        self._comma_min_words = self.first_comma_min_words
+
+    def _segment_done(self):
+        self._words = 0
+        self.segments_emitted += 1
+        self._max_words = self.max_words
+        self._comma_min_words = self.comma_min_words
+
+    @property
+    def pending_text(self) -> str:
+        """Text of the segment being built"""
+        return self._text[self._segment_start:].strip()
+
+    @property
+    def word_count(self) -> int:
+        """Words in the segment being built, counting a partial trailing word"""
+        return self._words + (1 if self._partial_word else 0)
+
+    def feed(self, chunk: str) -> List[str]:
+        """
+        Append streamed text
+
+        Returns:
+            Segments completed by this chunk, in order
+        """
+        if not chunk:
+            return []
+
+        if not _BREAK_RE.search(chunk):
+            # Fast path: the chunk only continues (or starts) the trailing word
+            if not self._partial_word:
+                self._scan_pos = len(self._text)
+                self._partial_word = True
+            self._text += chunk
+            self._trailing_comma = False
+            return []
+
+        self._text += chunk
+        segments: List[str] = []
+        text = self._text
+        text_length = len(text)
+        self._partial_word = False
+        self._trailing_comma = False
+
+        for match in _TOKEN_RE.finditer(text, self._scan_pos):
+            token_end = match.end()
+            at_end = token_end == text_length
+            token = match.group()
+
+            if self._words == 0 and _is_terminator_run(token):
+                # Stray punctuation ("Wait. ..") is never a segment of its own
+                if at_end:
+                    self._partial_word = True
+                    self._scan_pos = match.start()
+                    break
+                if segments:
+                    segments[-1] += text[self._segment_start:token_end]
+                self._scan_pos = token_end
+                self._segment_start = token_end
+                continue
+
+            core = token.rstrip(_CLOSERS) or token
+            words = self._words + 1
+            boundary = False
+
+            if core[-1] in "!?":
+                boundary = True
+            elif core[-1] == ".":
+                if _is_abbreviation(core):
+                    boundary = False
+                elif _strip_openers(core).lower() in NUMBER_ABBREVIATIONS:
+                    following = text[token_end:].lstrip()
+                    if not following:
+                        # "No." ends a sentence unless a number comes next
+                        self._partial_word = True
+                        self._scan_pos = match.start()
+                        break
+                    boundary = not following[0].isdigit()
+                elif at_end and len(core) > 1 and (
+                    core[-2].isdigit()
+                    or core[:-1].lower() in _ABBREVIATION_PREFIXES
+                    or len(_strip_openers(core)) == 1
+                ):
+                    # "3." may still become "3.5" and "p." "p.m."; decide on the next chunk
+                    self._partial_word = True
+                    self._scan_pos = match.start()
+                    break
+                else:
+                    boundary = True
+            elif core[-1] == "," and words >= self._comma_min_words:
+                if at_end and len(core) > 1 and core[-2].isdigit():
+                    # "1," may still become "1,000"
+                    self._partial_word = True
+                    self._scan_pos = match.start()
+                    break
+                boundary = True
+            elif at_end and not (core[-1] == "," and not core[-2:-1].isdigit()):
+                # Word may continue in the next chunk (a trailing comma ends it)
+                self._partial_word = True
+                self._trailing_comma = core[-1] == ","
+                self._scan_pos = match.start()
+                break
+            elif words >= self._max_words:
+                boundary = True
+
+            if boundary and core[-1] in ".!?" and _TERMINATOR_TAIL_RE.match(text, token_end):
+                # More terminators or closers may follow ("Wait." + ".."); decide on the next chunk
+                self._partial_word = True
+                self._scan_pos = match.start()
+                break
+
+            self._words = words
+            self._scan_pos = token_end
+            if boundary:
+                segments.append(text[self._segment_start:token_end].strip())
+                self._segment_start = token_end
+                self._segment_done()
+            else:
+                self._trailing_comma = core[-1] == ","
+
+        # Drop emitted text so the buffer only holds the open segment
+        if self._segment_start:
+            self._text = text[self._segment_start:]
+            self._scan_pos -= self._segment_start
+            self._segment_start = 0
+        return segments
+
+    def flush(self) -> Optional[str]:
+        """Return whatever is left at the end of the stream"""
+        remainder = self.pending_text
+        if not _has_words(remainder):
+            remainder = ""
+        self._text = ""
+        self._segment_start = 0
+        self._scan_pos = 0
+        self._partial_word = False
+        self._trailing_comma = False
+        if not remainder:
+            self._words = 0
+            return None
+        self._segment_done()
+        return remainder
+
+    def should_speculate(self) -> bool:
+        """
+        Whether the open segment is close enough to its end to start
+        pre-emptive TTS (the last few words before the cap, or a trailing
+        comma just short of the comma rule)
+
+        Never while the last word may still grow: speculating on
+        "The alar" would synthesize audio that cannot be reused.
+        """
+        if self._partial_word:
+            return False
+        words = self._words
+        if max(1, self._max_words - 6) <= words <= self._max_words - 2:
+            return True
+        return self._trailing_comma and words >= max(1, self._comma_min_words - 3)
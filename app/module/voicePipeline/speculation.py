@@ -0,0 +1,104 @@
+from collections import deque
+from typing import Any, Dict, Optional
+from ...core.config import Settings
+
+
+class SpeculationBudget:
+    """
+    Hit-rate accounting and throttling for pre-emptive TTS
+
+    Every speculative request ends as a hit (its text was the final
+    sentence), a prefix hit (its audio covered the start of the sentence
+    and only the rest was synthesized) or a miss (cancelled and paid for
+    nothing). Once the hit rate over the last `window` outcomes falls
+    below `min_hit_rate`, speculation is skipped except for one probe
+    every `probe_every` opportunities, so it recovers when replies become
+    predictable again. A per-session budget with fewer than `min_samples`
+    outcomes of its own follows its parent's (process-wide) hit rate.
+    """
+
+    def __init__(
+        self,
+        min_hit_rate: float = Settings.SPECULATION_MIN_HIT_RATE,
+        window: int = Settings.SPECULATION_WINDOW,
+        min_samples: int = Settings.SPECULATION_MIN_SAMPLES,
+        probe_every: int = Settings.SPECULATION_PROBE_EVERY,
+        parent: Optional["SpeculationBudget"] = None,
+    ):
+        self.min_hit_rate = min_hit_rate
+        self.min_samples = min_samples
+        self.probe_every = max(1, probe_every)
+        self.parent = parent
+        self._outcomes: deque = deque(maxlen=window)
+        self._skipped_in_row = 0
+
+        self.started = 0
+        self.hits = 0
+        self.prefix_hits = 0
+        self.misses = 0
+        self.throttled = 0
+        self.reused_chars = 0
+        self.wasted_chars = 0
+
+    @property
+    def hit_rate(self) -> Optional[float]:
+        if not self._outcomes:
+            return None
+        return sum(self._outcomes) / len(self._outcomes)
+
+    def allow(self) -> bool:
+        """Whether a new speculative request may start now"""
+        budget = self
+        if len(self._outcomes) < self.min_samples and self.parent is not None:
+            # Too few outcomes in this session yet; judge by the process-wide rate
+            budget = self.parent
+        rate = budget.hit_rate
+        if len(budget._outcomes) < budget.min_samples or rate >= budget.min_hit_rate:
+            self._skipped_in_row = 0
+            return True
+        self._skipped_in_row += 1
+        if self._skipped_in_row >= self.probe_every:
+            self._skipped_in_row = 0
+            return True
+        self.throttled += 1
+        if self.parent:
+            self.parent.throttled += 1
+        return False
+
+    def record_start(self):
+        self.started += 1
+        if self.parent:
+            self.parent.record_start()
+
+    def record_hit(self, chars: int):
+        self.hits += 1
+        self.reused_chars += chars
+        self._outcomes.append(1)
+        if self.parent:
+            self.parent.record_hit(chars)
+
+    def record_prefix_hit(self, chars: int):
+        self.prefix_hits += 1
+        self.reused_chars += chars
+        self._outcomes.append(1)
+        if self.parent:
+            self.parent.record_prefix_hit(chars)
+
+    def record_miss(self, chars: int):
+        self.misses += 1
+        self.wasted_chars += chars
+        self._outcomes.append(0)
+        if self.parent:
+            self.parent.record_miss(chars)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "started": self.started,
+            "hits": self.hits,
+            "prefix_hits": self.prefix_hits,
+            "misses": self.misses,
+            "throttled": self.throttled,
+            "reused_chars": self.reused_chars,
+            "wasted_chars": self.wasted_chars,
+            "recent_hit_rate": self.hit_rate,
+        }
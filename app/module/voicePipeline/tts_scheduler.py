@@ -0,0 +1,218 @@
+import time
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+from ...core.metrics import current_trace, record_span
+
+
+logger = logging.getLogger(__name__)
+
+
+_END = object()
+_CHUNKS_DONE = object()
+
+
+class OrderedTTSScheduler:
+    """
+    Streaming TTS scheduler with in-order emission
+
+    Synthesis for every sentence starts as soon as it is submitted, with at
+    most `window` upstream requests in flight. Finished audio is pushed to
+    `output` strictly in submission order, the moment the head of the
+    queue completes, instead of waiting for a whole batch.
+
+    When `stream` is given, audio is forwarded as `tts_audio_chunk` events
+    while the head sentence is still being synthesized; later sentences
+    buffer their chunks until they reach the head.
+    """
+
+    def __init__(
+        self,
+        synthesize: Callable[[str], Awaitable[Any]],
+        output: asyncio.Queue,
+        format: str = "mp3",
+        window: int = 3,
+        turn_start: Optional[float] = None,
+        stream: Optional[Callable[[str], AsyncIterator[bytes]]] = None,
+    ):
+        self._synthesize = synthesize
+        self._stream = stream
+        self._output = output
+        self._format = format
+        self._window = asyncio.Semaphore(max(1, window))
+        self._order: asyncio.Queue = asyncio.Queue()
+        self._emitter: Optional[asyncio.Task] = None
+        self._tasks = []
+        self._pending: Dict[int, str] = {}
+        self._cancelled = False
+
+        self.turn_start = turn_start or time.time()
+        self.time_to_first_audio: Optional[float] = None
+        self.submitted = 0
+        self.emitted = 0
+        self.failed = 0
+
+    def start(self):
+        if self._emitter is None:
+            self._emitter = asyncio.create_task(self._emit_in_order())
+
+    def submit(self, text: str, task: Optional[asyncio.Task] = None):
+        """
+        Queue a sentence for synthesis
+
+        Args:
+            text: Sentence to speak
+            task: Already running synthesis task for this text (e.g. a
+                pre-emptive request) to reuse instead of starting a new one
+        """
+        self.start()
+        preemptive = task is not None
+        chunks: Optional[asyncio.Queue] = None
+        if task is not None:
+            task = asyncio.create_task(self._await_existing(task))
+        elif self._stream is not None:
+            chunks = asyncio.Queue()
+            task = asyncio.create_task(self._stream_in_window(text, chunks))
+        else:
+            task = asyncio.create_task(self._synthesize_in_window(text))
+
+        self._tasks.append(task)
+        self._pending[self.submitted] = text
+        self._order.put_nowait((self.submitted, text, task, chunks, preemptive))
+        self.submitted += 1
+
+    async def close(self):
+        """Signal that no more sentences will be submitted"""
+        self.start()
+        await self._order.put(_END)
+
+    def pending_work(self) -> Dict[str, int]:
+        """Sentences submitted but not yet delivered (what a cancel would save)"""
+        return {
+            "tts_requests_pending": len(self._pending),
+            "tts_requests_in_flight": sum(1 for task in self._tasks if not task.done()),
+            "tts_chars_pending": sum(len(text) for text in self._pending.values()),
+        }
+
+    def cancel(self):
+        """Cancel all in-flight synthesis and the emitter"""
+        self._cancelled = True
+        for task in self._tasks:
+            task.cancel()
+        if self._emitter:
+            self._emitter.cancel()
+
+    async def _synthesize_in_window(self, text: str):
+        async with self._window:
+            start = time.time()
+            audio = await self._synthesize(text)
+            return audio, time.time() - start
+
+    async def _stream_in_window(self, text: str, chunks: asyncio.Queue):
+        async with self._window:
+            start = time.time()
+            try:
+                async for chunk in self._stream(text):
+                    await chunks.put(chunk)
+            finally:
+                await chunks.put(_CHUNKS_DONE)
+            return None, time.time() - start
+
+    async def _await_existing(self, task: asyncio.Task):
+        start = time.time()
+        audio = await task
+        return audio, time.time() - start
+
+    async def _emit_in_order(self):
+        while True:
+            item = await self._order.get()
+            if item is _END:
+                await self._output.put(_END)
+                return
+
+            sequence, text, task, chunks, preemptive = item
+            self._pending.pop(sequence, None)
+            try:
+                if chunks is not None:
+                    await self._forward_chunks(sequence, chunks)
+                audio, latency = await task
+            except asyncio.CancelledError:
+                # A sentence task cancelled on its own is skipped; when the
+                # whole scheduler is cancelled the emitter must stop too
+                if task.cancelled() and not self._cancelled:
+                    self.failed += 1
+                    continue
+                raise
+            except Exception as e:
+                logger.error(f"Error generating audio for sentence {sequence}: {e}")
+                self.failed += 1
+                continue
+
+            if chunks is not None:
+                self.emitted += 1
+                continue
+
+            if self._stream is not None:
+                # Pre-emptive audio arrives whole; send it as a single chunk
+                await self._output.put(self._chunk_event(sequence, 0, audio, True))
+                self.emitted += 1
+                continue
+
+            event: Dict[str, Any] = {
+                "type": "tts_audio",
+                "audio": audio,
+                "format": self._format,
+                "timestamp": time.time(),
+                "latency": latency,
+                "sequence": sequence,
+            }
+            if preemptive:
+                event["preemptive"] = True
+
+            if self._mark_first_audio():
+                event["time_to_first_audio"] = self.time_to_first_audio
+
+            self.emitted += 1
+            await self._output.put(event)
+
+    async def _forward_chunks(self, sequence: int, chunks: asyncio.Queue):
+        chunk_index = 0
+        while True:
+            chunk = await chunks.get()
+            if chunk is _CHUNKS_DONE:
+                break
+            await self._output.put(self._chunk_event(sequence, chunk_index, chunk, False))
+            chunk_index += 1
+
+        # Empty terminating frame marks the end of this sentence's audio
+        await self._output.put(self._chunk_event(sequence, chunk_index, b"", True))
+
+    def _chunk_event(self, sequence: int, chunk_index: int, data: bytes, last: bool) -> Dict[str, Any]:
+        event = {
+            "type": "tts_audio_chunk",
+            "sequence": sequence,
+            "chunk_index": chunk_index,
+            "data": data,
+            "last": last,
+            "format": self._format,
+        }
+        if data and self._mark_first_audio():
+            event["time_to_first_audio"] = self.time_to_first_audio
+        return event
+
+    def _mark_first_audio(self) -> bool:
+        """Record time to first audio; True only for the first call of the turn"""
+        if self.time_to_first_audio is not None:
+            return False
+        self.time_to_first_audio = time.time() - self.turn_start
+        logger.info(f"⏱️ Time to first audio: {self.time_to_first_audio:.3f}s")
+        trace = current_trace()
+        if trace is not None:
+            # Measured from when the turn's message arrived
+            record_span("turn.first_audio", trace.started)
+        return True
+
+
+def is_end(item: Any) -> bool:
+    """True for the sentinel the scheduler emits after the last sentence"""
+    return item is _END
@@ -1,4 +1,6 @@
 
+import json
+from typing import List
 from langchain_core.messages import HumanMessage, AIMessage
 
 
@@ -15,14 +17,41 @@ from langchain_core.messages import HumanMessage, AIMessage
 
 
 
-async def generate_session_title(self, first_message: str) -> str:
-        """Generate session title"""
-        try:
-            prompt = f"Generate a short, descriptive title (max 6 words) for: '{first_message}'. Return only the title."
-            messages = [HumanMessage(content=prompt)]
-            response = await self.llm.ainvoke(messages)
-            title = response.content.strip().strip('"').strip("'")
-            return title[:100]
-        except Exception as e:
-            print(f"Error generating title: {e}")
-            return first_message[:50] + "..." if len(first_message) > 50 else first_message
\ No newline at end of file
+async def generate_session_title(llm, first_message: str) -> str:
+    """Generate session title"""
+    try:
+        prompt = f"Generate a short, descriptive title (max 6 words) for: '{first_message}'. Return only the title."
+        messages = [HumanMessage(content=prompt)]
+        response = await llm.ainvoke(messages)
+        title = response.content.strip().strip('"').strip("'")
+        return title[:100]
+    except Exception as e:
+        print(f"Error generating title: {e}")
+        return first_message[:50] + "..." if len(first_message) > 50 else first_message
+
+
+async def generate_session_titles(llm, first_messages: List[str]) -> List[str]:
+    """
+    Generate titles for several sessions in one LLM call
+
+    Falls back to one call per session when the reply is not a JSON array
+    with one string per message.
+    """
+    numbered = "\n".join(f"{i + 1}. {message[:300]}" for i, message in enumerate(first_messages))
+    prompt = (
+        "Generate a short, descriptive title (max 6 words) for each of these "
+        f"first messages:\n{numbered}\n"
+        "Return only a JSON array of strings, in the same order."
+    )
+    response = await llm.ainvoke([HumanMessage(content=prompt)])
+    try:
+        titles = json.loads(response.content.strip().strip("`").removeprefix("json"))
+    except ValueError:
+        titles = None
+    if (
+        not isinstance(titles, list)
+        or len(titles) != len(first_messages)
+        or not all(isinstance(title, str) for title in titles)
+    ):
+        return [await generate_session_title(llm, message) for message in first_messages]
+    return [title.strip().strip('"').strip("'")[:100] for title in titles]
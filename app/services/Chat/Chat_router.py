@@ -2,10 +2,21 @@
 import base64
 from fastapi import APIRouter, HTTPException, UploadFile, File, Form, WebSocket, WebSocketDisconnect
 from fastapi.responses import StreamingResponse
-from ...DB.MongoDB.mongobd import MongoDBSessionManager as mongodb
-from typing import Annotated, Optional
-from ...module.voicePipeline.VoicePipeline import VoicePipeline
+from typing import Annotated, Any, Dict, List, Optional
+from ...module.text_to_speech.audio_frames import encode_audio_frame
+from ...module.speech_to_text.audio_buffer import AudioIngestBuffer
+from ...core.config import Settings
+from ...core.admission import AdmissionRejected, Priority, admission, admitted_stream, set_request_priority
+from ...core.metrics import metrics, record_span, slow_traces, span, start_trace
+from .post_turn import PostTurnJob
+from .services import ChatServices
+from .turns import TurnContext, TurnManager
+from .outbound import OutboundSender
+from .Chat_schema import FirecommChatRequestSchema
+from bson import ObjectId
+import asyncio
 import json
+import time
 import uuid 
 import logging
 
@@ -13,26 +24,255 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
-mongodb_init = mongodb()
-voice_pipeline_instance = VoicePipeline()
+# Clients, pools and caches are built by the app lifespan (or on first use)
+services = ChatServices(
+    title_generator=lambda message: roami_reassures_instance.generate_session_title(message),
+    batch_title_generator=lambda messages: roami_reassures_instance.generate_session_titles(messages)
+)
+
+active_connections = 0
+metrics.gauge(
+    "firecomm_ws_connections",
+    "Open /ws connections",
+    lambda: [({}, active_connections)],
+)
+metrics.gauge(
+    "firecomm_post_turn_queue_depth",
+    "Background title/persistence jobs waiting",
+    lambda: [({}, services.post_turn_queue.queue.qsize())] if services.is_built("post_turn_queue") else [],
+)
+metrics.gauge(
+    "firecomm_semantic_cache_hit_rate",
+    "Semantic response cache hit rate since start",
+    lambda: (
+        [({}, services.semantic_cache.stats()["hit_rate"])]
+        if services.is_built("semantic_cache") and services.semantic_cache else []
+    ),
+)
+
+
+async def _retrieve_knowledge(
+    user_input: str,
+    query_embedding: Optional[List[float]] = None
+) -> List[Dict[str, Any]]:
+    """Knowledge base chunks for one turn (hybrid BM25 + vector, latency-budgeted)"""
+    if not services.is_built("vector_store"):
+        # Opening Chroma blocks; turns before the warm-up finishes go without
+        return []
+    try:
+        with span("retrieval.query"):
+            return await services.vector_store.query(user_input, embedding=query_embedding)
+    except Exception as e:
+        logger.error(f"❌ Retrieval error: {e}")
+        return []
+
+
+def _agent_response(load_history: bool = True):
+    """
+    Agent response generator with its per-turn grounding
+
+    Retrieved chunks are passed to the agent as `knowledge`, and the
+    prompt history as `history`: the rolling summary plus the messages it
+    does not cover yet, so prompt size stays bounded as sessions grow.
+    Both are loaded concurrently, before the LLM admission slot is taken.
+    A `query_embedding` already computed for the turn (by the semantic
+    cache lookup) is reused for retrieval.
+    """
+    admitted = admitted_stream("llm", roami_reassures_instance.get_response)
+
+    async def respond(
+        session_id: str,
+        user_input: str,
+        user_id: str,
+        query_embedding: Optional[List[float]] = None
+    ):
+        if load_history:
+            knowledge, history = await asyncio.gather(
+                _retrieve_knowledge(user_input, query_embedding),
+                services.summarizer.build_context(session_id)
+            )
+        else:
+            # A new session has no history to load
+            knowledge, history = await _retrieve_knowledge(user_input, query_embedding), []
+        async for chunk in admitted(
+            session_id=session_id,
+            user_input=user_input,
+            user_id=user_id,
+            knowledge=knowledge,
+            history=history
+        ):
+            yield chunk
+
+    return respond
+
+
+def _response_function(user_id: Optional[str], is_new_session: bool):
+    """Chat response generator, behind the semantic cache when enabled"""
+    # Cache hits skip retrieval and never take an LLM admission slot
+    response_function = _agent_response(load_history=not is_new_session)
+    # Building the cache opens Chroma; turns before the warm-up has done it skip the cache
+    cache = services.semantic_cache if services.is_built("semantic_cache") else None
+    if cache is None or not is_new_session:
+        # Answers that depend on earlier turns are never cached or replayed
+        return response_function
+    scope = cache.scope_for(user_id)
+    if scope is None:
+        return response_function
+    return cache.cached(response_function, scope=scope)
+
+
+async def _run_text_turn(
+    turn: TurnContext,
+    text_input: str,
+    user_id: str,
+    session_id: str,
+    is_new_session: bool
+):
+    """Run one text turn and forward its events"""
+    set_request_priority(Priority.TEXT)
+    logger.info(f"💬 Processing text: {text_input[:50]}...")
+    
+    response_function = turn.track_response(_response_function(user_id, is_new_session))
+    async for text_chunk in response_function(
+        session_id=session_id,
+        user_input=text_input,
+        user_id=user_id
+    ):
+        await turn.send_json({
+            "type": "agent_text",
+            "text": text_chunk
+        })
+    
+    await turn.send_json({"type": "complete"})
+    logger.info("✅ Text response complete")
+    services.summarizer.schedule(session_id)
+    
+    if is_new_session:
+        # Title generation and session persistence run off the critical path
+        services.post_turn_queue.submit(PostTurnJob(
+            send=turn.send_json,
+            user_id=user_id,
+            session_id=session_id,
+            first_message=text_input,
+            Type="Ressures"
+        ))
+    else:
+        # Keeps the session listing ordered by last activity
+        services.post_turn_queue.touch(session_id)
+
+
+async def _run_voice_turn(
+    turn: TurnContext,
+    voice_session,
+    audio_bytes: bytes,
+    user_id: str,
+    session_id: str,
+    is_new_session: bool,
+    audio_transport: str = "json",
+    stt_format: str = "webm"
+):
+    """Run one voice turn through the pipeline and forward its events"""
+    set_request_priority(Priority.VOICE)
+    turn.add_reporter(voice_session.pending_work)
+    
+    async for event in voice_session.pipeline(
+        audio_data=audio_bytes,
+        response_function=turn.track_response(_response_function(user_id, is_new_session)),
+        session_id=session_id,
+        user_id=user_id,
+        stt_format=stt_format,
+        audio_transport=audio_transport
+    ):
+        if event["type"] == "tts_audio_chunk":
+            if "time_to_first_audio" in event:
+                # The binary header has no room for timing; report it as JSON
+                await turn.send_json({
+                    "type": "tts_first_audio",
+                    "sequence": event["sequence"],
+                    "format": event["format"],
+                    "time_to_first_audio": event["time_to_first_audio"]
+                })
+            await turn.send_bytes(encode_audio_frame(
+                event["sequence"],
+                event["chunk_index"],
+                event["data"],
+                event["last"]
+            ))
+        else:
+            await turn.send_json(event)
+    
+    await turn.send_json({"type": "complete"})
+    logger.info("✅ Voice response complete")
+    services.summarizer.schedule(session_id)
+    
+    title = "Voice Chat"
+    
+    if is_new_session:
+        services.post_turn_queue.submit(PostTurnJob(
+            send=turn.send_json,
+            user_id=user_id,
+            session_id=session_id,
+            title=title,
+            Type="Ressures"
+        ))
+    else:
+        services.post_turn_queue.touch(session_id)
 
 
 @router.websocket('/ws')
 async def ws_endpoint(websocket: WebSocket):
+    global active_connections
     await websocket.accept()
+    active_connections += 1
     logger.info(f"✅ Client connected: {websocket.client}")
+    voice_session = services.voice_pipeline.create_session()
+    voice_upload = None
+    # All writes go through one bounded, coalescing sender per connection
+    outbound = OutboundSender(websocket)
+    # Each turn runs as its own task so the socket keeps reading (barge-in / cancel)
+    turns = TurnManager()
     
     try:
         while True:
-            data = await websocket.receive_json()
-            message_type = data.get("type")
-            logger.info(f"📥 Received message type: {message_type}")
+            message = await websocket.receive()
+            received = time.perf_counter()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            
+            if message.get("bytes") is not None:
+                # Binary frames carry audio for the active voice_start upload
+                if voice_upload is None:
+                    await outbound.send_json({
+                        "type": "error",
+                        "message": "Binary audio received without voice_start"
+                    })
+                    continue
+                if voice_upload["rejected"]:
+                    continue
+                try:
+                    voice_upload["buffer"].append(message["bytes"])
+                except ValueError as ve:
+                    # Drop the rest of this upload; voice_end just clears it
+                    logger.error(f"❌ Validation error: {ve}")
+                    voice_upload["rejected"] = True
+                    await outbound.send_json({
+                        "type": "error",
+                        "message": str(ve),
+                        "request_id": voice_upload["request_id"]
+                    })
+                continue
             
             is_new_session = False
             session_id = None
-            title = None  # FIXED: Initialize title
+            message_type = None
+            request_id = None
             
             try: 
+                data = json.loads(message.get("text") or "{}")
+                message_type = data.get("type")
+                request_id = data.get("request_id") or str(uuid.uuid4())
+                logger.info(f"📥 Received message type: {message_type}")
+                
                 if message_type == "text":
                     text_input = data.get("payload")
                     user_id = data.get("user_id", )
@@ -47,49 +287,18 @@ async def ws_endpoint(websocket: WebSocket):
                     if not text_input:
                         raise ValueError("Text payload is required")
                     
-                    logger.info(f"💬 Processing text: {text_input[:50]}...")
-                    
-                    async for text_chunk in roami_reassures_instance.get_response(
+                    turn = TurnContext(outbound, request_id, start_trace("text", request_id, received))
+                    record_span("ws.decode", received)
+                    await turns.start(turn, _run_text_turn(
+                        turn,
+                        text_input=text_input,
+                        user_id=user_id,
                         session_id=session_id,
-                        user_input=text_input,
-                        user_id=user_id
-                    ):
-                        await websocket.send_json({
-                            "type": "agent_text",
-                            "text": text_chunk
-                        })
-                    
-                    await websocket.send_json({"type": "complete"})
-                    logger.info("✅ Text response complete")
-                    
-                    if is_new_session:
-                        try:
-                            title = await roami_reassures_instance.generate_session_title(text_input)
-                            await websocket.send_json({
-                                "type": "title",
-                                "title": title,
-                                "session_id": session_id
-                            })
-                            logger.info(f"📝 Generated title: {title}")
-                        except Exception as e:
-                            logger.error(f"Title generation error: {e}")
-                            title = "New Chat" 
-                            await websocket.send_json({
-                                "type": "error",
-                                "message": f"Title generation error: {str(e)}"
-                            })
-                        
-                        try:
-                            await mongodb_init.create_session(user_id, session_id, title,Type="Ressures")
-                            logger.info(f"💾 Session created: {session_id}")
-                        except Exception as e:
-                            logger.error(f"MongoDB error: {e}")
-                            await websocket.send_json({
-                                "type": "error",
-                                "message": f"MongoDB error: {str(e)}"
-                            })
+                        is_new_session=is_new_session
+                    ))
                     
                 elif message_type == "voice":
+                    # Legacy single-message upload: whole clip as base64 JSON
                     audio_data = data.get("payload")
                     user_id = data.get("user_id")
                     session_id = data.get("session_id")
@@ -100,62 +309,122 @@ async def ws_endpoint(websocket: WebSocket):
                     
                     if not audio_data:
                         raise ValueError("Audio payload is required")
-                    
+
+                    # Same cap as the streamed upload, checked before decoding
+                    if len(audio_data) * 3 // 4 > Settings.VOICE_MAX_UPLOAD_BYTES:
+                        raise ValueError(
+                            f"Audio exceeds maximum upload size of {Settings.VOICE_MAX_UPLOAD_BYTES} bytes"
+                        )
+
                     logger.info("🎤 Processing voice message...")
                     
                     try:
-                        audio_bytes = base64.b64decode(audio_data)
+                        audio_bytes = await asyncio.to_thread(base64.b64decode, audio_data)
                         logger.info(f"🔊 Audio size: {len(audio_bytes)} bytes")
                     except Exception as e:
                         raise ValueError(f"Invalid base64 audio data: {str(e)}")
                     
-                    async for event in voice_pipeline_instance.pipeline(
-                        audio_data=audio_bytes,
-                        response_function=roami_reassures_instance.get_response,
+                    turn = TurnContext(outbound, request_id, start_trace("voice", request_id, received))
+                    record_span("ws.decode", received, bytes=len(audio_bytes))
+                    await turns.start(turn, _run_voice_turn(
+                        turn,
+                        voice_session,
+                        audio_bytes=audio_bytes,
+                        user_id=user_id,
                         session_id=session_id,
-                        user_id=user_id
-                    ):
-                        await websocket.send_json(event)
+                        is_new_session=is_new_session,
+                        # Clients opt in to raw binary audio frames; JSON+base64 stays the default
+                        audio_transport=data.get("audio_transport", "json"),
+                        stt_format=data.get("format", "webm")
+                    ))
+                
+                elif message_type == "voice_start":
+                    # The user started speaking: stop the reply that is still playing
+                    await turns.cancel(reason="barge_in")
                     
-                    await websocket.send_json({"type": "complete"})
-                    logger.info("✅ Voice response complete")
+                    # Streamed upload: binary audio frames follow until voice_end
+                    voice_upload = {
+                        "buffer": AudioIngestBuffer(
+                            max_bytes=Settings.VOICE_MAX_UPLOAD_BYTES,
+                            format=data.get("format", "webm")
+                        ),
+                        "request_id": request_id,
+                        "user_id": data.get("user_id"),
+                        "session_id": data.get("session_id"),
+                        "audio_transport": data.get("audio_transport", "json"),
+                        "rejected": False,
+                    }
+                    logger.info("🎙️ Voice upload started")
+                
+                elif message_type == "voice_end":
+                    if voice_upload is None:
+                        raise ValueError("voice_end received without voice_start")
+                    
+                    upload, voice_upload = voice_upload, None
+                    if upload["rejected"]:
+                        continue
+                    audio_bytes = upload["buffer"].finish()
+                    if not audio_bytes:
+                        raise ValueError("Audio payload is required")
+                    
+                    user_id = upload["user_id"]
+                    session_id = upload["session_id"]
+                    if not session_id:
+                        session_id = str(uuid.uuid4())
+                        is_new_session = True
                     
-                    title = "Voice Chat"
+                    logger.info(
+                        f"🔊 Audio size: {len(audio_bytes)} bytes in {upload['buffer'].frames} frames"
+                    )
                     
-                    if is_new_session:
-                        await websocket.send_json({
-                            "type": "title",
-                            "title": title,
-                            "session_id": session_id
+                    # Latency is measured from the end of speech (voice_end)
+                    turn = TurnContext(
+                        outbound,
+                        upload["request_id"],
+                        start_trace("voice", upload["request_id"], received)
+                    )
+                    record_span("ws.decode", received, bytes=len(audio_bytes))
+                    await turns.start(turn, _run_voice_turn(
+                        turn,
+                        voice_session,
+                        audio_bytes=audio_bytes,
+                        user_id=user_id,
+                        session_id=session_id,
+                        is_new_session=is_new_session,
+                        audio_transport=upload["audio_transport"],
+                        stt_format=upload["buffer"].format
+                    ))
+                
+                elif message_type == "cancel":
+                    # Without a request_id, whatever is in flight is cancelled
+                    saved = await turns.cancel(request_id=data.get("request_id"))
+                    if saved is None:
+                        await outbound.send_json({
+                            "type": "cancelled",
+                            "request_id": data.get("request_id"),
+                            "reason": "not_running",
+                            "saved": None
                         })
-                        
-                        try:
-                            await mongodb_init.create_session(user_id, session_id, title,Type="Ressures")
-                            logger.info(f"💾 Session created: {session_id}")
-                        except Exception as e:
-                            logger.error(f"MongoDB error: {e}")
-                            await websocket.send_json({
-                                "type": "error",
-                                "message": f"MongoDB error: {str(e)}"
-                            })
                     
                 else:
-                    await websocket.send_json({
+                    await outbound.send_json({
                         "type": "error",
                         "message": f"Unknown message type: {message_type}"
                     })
                     
             except ValueError as ve:
                 logger.error(f"❌ Validation error: {ve}")
-                await websocket.send_json({
+                await outbound.send_json({
                     "type": "error",
-                    "message": str(ve)
+                    "message": str(ve),
+                    "request_id": request_id
                 })
             except Exception as msg_error:
                 logger.error(f"❌ Processing error: {msg_error}")
-                await websocket.send_json({
+                await outbound.send_json({
                     "type": "error",
-                    "message": f"Processing error: {str(msg_error)}"
+                    "message": f"Processing error: {str(msg_error)}",
+                    "request_id": request_id
                 })
                 
     except WebSocketDisconnect:
@@ -163,13 +432,17 @@ async def ws_endpoint(websocket: WebSocket):
     except Exception as e:
         logger.error(f"❌ WebSocket error: {e}")
     finally:
+        await turns.close()
+        await outbound.close()
+        voice_session.close()
+        active_connections -= 1
         logger.info("👋 Closing connection")
 
 
 
 @router.post("/reassurances/")
 async def roami_reassures_endpoint(
-    request: RoamiReassuresRequestSchema,
+    request: FirecommChatRequestSchema,
     audio: Annotated[Optional[UploadFile], File()] = None
 ):
     """Non-streaming endpoint"""
@@ -183,7 +456,7 @@ async def roami_reassures_endpoint(
         
         # Collect all chunks
         response_text = ""
-        async for chunk in roami_reassures_instance.get_response(
+        async for chunk in _agent_response()(
             session_id=session_id,
             user_input=user_input,
             user_id=user_id
@@ -192,6 +465,9 @@ async def roami_reassures_endpoint(
         
         return {"response": response_text}
     
+    except (HTTPException, AdmissionRejected):
+        # AdmissionRejected becomes a 503 with Retry-After (see main.py)
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -212,12 +488,25 @@ async def roami_reassures_stream_endpoint(
         if not session_id:
             session_id = str(uuid.uuid4())
         
+        stream = _agent_response()(
+            session_id=session_id,
+            user_input=user_prompt,
+            user_id=user_id
+        )
+        # Wait for the slot and the first chunk here, so a rejection is
+        # still a 503 rather than an error in the middle of a 200 body
+        try:
+            first_chunk = await stream.__anext__()
+        except StopAsyncIteration:
+            first_chunk = ""
+
+        async def body():
+            yield first_chunk
+            async for chunk in stream:
+                yield chunk
+
         return StreamingResponse(
-            roami_reassures_instance.get_response(
-                session_id=session_id,
-                user_input=user_prompt,
-                user_id=user_id
-            ),
+            body(),
             media_type="text/plain",
             headers={
                 "Cache-Control": "no-cache",
@@ -226,47 +515,81 @@ async def roami_reassures_stream_endpoint(
             }
         )
 
+    except (HTTPException, AdmissionRejected):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.post('/reassurances/chat_history')
-async def roami_reassures_chat_history(session_id: str, user_id: str):
-    """Get chat history for a session"""
+async def roami_reassures_chat_history(
+    session_id: str,
+    user_id: str,
+    before: Optional[str] = None,
+    page_size: int = 50
+):
+    """Get one page of chat history for a session, newest page first"""
     try:
         if not session_id:
             raise HTTPException(status_code=400, detail="session_id is required")
+        if not 1 <= page_size <= 200:
+            raise HTTPException(status_code=400, detail="page_size must be between 1 and 200")
+        if before and not ObjectId.is_valid(before):
+            raise HTTPException(status_code=400, detail="before must be a message id")
 
-        history = mongodb_init.get_session_message(session_id)
-        messages = [{
-            "type": msg.type,      
-            "content": msg.content 
-        } for msg in history.messages]
+        messages, next_before = await services.mongodb.get_messages_page(
+            session_id,
+            before=before,
+            page_size=page_size
+        )
 
         return {
             "session_id": session_id,
             "chat_history": messages,
-            "message_count": len(messages)
+            "message_count": len(messages),
+            "next_before": next_before,
+            "has_more": next_before is not None
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get('/reassurances/sessions')
-async def roami_reassures_chat_session(user_id: str,Type:str):
-    """Get all sessions for a user"""
+async def roami_reassures_chat_session(
+    user_id: str,
+    Type: str,
+    cursor: Optional[str] = None,
+    limit: int = 50
+):
+    """Get one page of sessions for a user, most recently updated first"""
     try:
         if not user_id:
             raise HTTPException(status_code=400, detail="user_id is required")
+        if not 1 <= limit <= 200:
+            raise HTTPException(status_code=400, detail="limit must be between 1 and 200")
         
-        sessions = await mongodb_init.get_session(user_id,Type)
+        try:
+            sessions, next_cursor = await services.mongodb.get_session(
+                user_id,
+                Type,
+                cursor=cursor,
+                limit=limit
+            )
+        except ValueError as ve:
+            # Malformed cursor
+            raise HTTPException(status_code=400, detail=str(ve))
         return {
             "user_id": user_id,
             "sessions": sessions,
-            "count": len(sessions)
+            "count": len(sessions),
+            "next_cursor": next_cursor
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
@@ -274,12 +597,67 @@ async def roami_reassures_chat_session(user_id: str,Type:str):
 @router.delete('/ressures/sessions')
 async def delete_session(session_id: str, user_id: str):
     try:
-        result = await mongodb_init.delete_session(session_id.user_id)
-        if result:
-            return {
-                "message":"Session deleted successfully",
-                **result
-            }
+        result = await services.mongodb.delete_session(session_id, user_id)
+        if not result:
+            raise HTTPException(status_code=404, detail="Session not found")
+        services.summarizer.clear(session_id)
+        return {
+            "message":"Session deleted successfully",
+            **result
+        }
 
+    except HTTPException:
+        raise
     except Exception as e :
-        raise HTTPException(status_code=500,detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500,detail=str(e))
+
+
+@router.get('/voice/tts_stats')
+async def voice_tts_stats():
+    """Shared TTS admission gate queue depth and wait time"""
+    return services.voice_pipeline.tts_stats()
+
+
+@router.get('/admission/stats')
+async def admission_stats():
+    """Per-upstream (llm/stt/tts) queue depth, wait times and rejections"""
+    return admission.stats()
+
+
+@router.get('/voice/stt_stats')
+async def voice_stt_stats():
+    """Audio preprocessing bytes in/out and time per clip"""
+    return services.voice_pipeline.stt_stats()
+
+
+@router.get('/chat/semantic_cache_stats')
+async def semantic_cache_stats():
+    """Semantic response cache hit rate and eviction counters"""
+    if not Settings.SEMANTIC_CACHE_ENABLED:
+        return {"enabled": False}
+    if not services.is_built("semantic_cache"):
+        raise HTTPException(status_code=503, detail="Semantic cache is still warming up")
+    return {"enabled": True, **services.semantic_cache.stats()}
+
+
+@router.get('/chat/retrieval_stats')
+async def retrieval_stats():
+    """Knowledge base retrieval latency percentiles and query cache counters"""
+    if not services.is_built("vector_store"):
+        raise HTTPException(status_code=503, detail="Vector store is still warming up")
+    return services.vector_store.retrieval_stats()
+
+
+@router.get('/chat/post_turn_stats')
+async def post_turn_stats():
+    """Background title/persistence queue depth and fallback counters"""
+    return services.post_turn_queue.stats()
+
+
+@router.get('/metrics/slow_traces')
+async def slow_turn_traces():
+    """Per-stage spans of the slowest recent turns (over TRACE_SLOW_TURN_SECONDS)"""
+    return {
+        "threshold_seconds": Settings.TRACE_SLOW_TURN_SECONDS,
+        "traces": sorted(slow_traces, key=lambda trace: trace["duration"], reverse=True)
+    }
\ No newline at end of file
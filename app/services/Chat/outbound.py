@@ -0,0 +1,233 @@
+import time
+import asyncio
+import logging
+from typing import Any, Dict, Optional, Tuple
+from fastapi import WebSocket
+from ...core.config import Settings
+from ...core.metrics import metrics
+
+
+logger = logging.getLogger(__name__)
+
+_CLOSE = object()
+
+ws_send_latency = metrics.histogram(
+    "firecomm_ws_send_seconds", "Time to write one websocket frame, by frame kind"
+)
+ws_slow_clients = metrics.counter(
+    "firecomm_ws_slow_client_disconnects_total", "Connections closed for not draining their socket"
+)
+
+
+class SlowClientError(ConnectionError):
+    """The client stopped draining its websocket fast enough"""
+
+
+class OutboundSender:
+    """
+    Single writer for one websocket with a bounded queue
+
+    Producers enqueue events instead of writing to the socket. The writer
+    merges consecutive `agent_text` deltas of the same request into one
+    frame (up to `coalesce_window` seconds / `coalesce_max_chars`) and
+    keeps JSON and binary frames in order. The first delta of a request
+    is sent immediately so time-to-first-text is unchanged.
+
+    Frames are tagged with the request that produced them, so a
+    cancelled turn's queued frames can be dropped with `purge()`.
+
+    When the queue stays full (or one write blocks) for longer than
+    `send_timeout`, the client is considered too slow: the socket is
+    closed and further sends raise SlowClientError, so memory per
+    connection stays bounded.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        max_queue: int = Settings.WS_SEND_QUEUE_SIZE,
+        send_timeout: float = Settings.WS_SEND_TIMEOUT,
+        coalesce_window: float = Settings.WS_COALESCE_WINDOW,
+        coalesce_max_chars: int = Settings.WS_COALESCE_MAX_CHARS,
+    ):
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.send_timeout = send_timeout
+        self.coalesce_window = coalesce_window
+        self.coalesce_max_chars = coalesce_max_chars
+        self.closed = False
+        self._writer: Optional[asyncio.Task] = None
+        self._held: Optional[Tuple[str, Any, Optional[str]]] = None
+        self._text_started: set = set()
+
+        self.events_enqueued = 0
+        self.frames_sent = 0
+        self.text_deltas_coalesced = 0
+        self.frames_purged = 0
+        self.slow_client_disconnects = 0
+
+    def start(self):
+        if self._writer is None:
+            self._writer = asyncio.create_task(self._run())
+
+    async def send_json(self, event: Dict[str, Any]):
+        await self._put(("json", event, event.get("request_id")))
+
+    async def send_bytes(self, data: bytes, request_id: Optional[str] = None):
+        await self._put(("bytes", data, request_id))
+
+    def purge(self, request_id: str) -> int:
+        """
+        Drop queued frames of a request that was cancelled
+
+        Frames already handed to the socket are not recalled.
+
+        Returns:
+            Number of frames dropped
+        """
+        kept = []
+        dropped = 0
+        if self._held is not None and self._held is not _CLOSE and self._held[2] == request_id:
+            self._held = None
+            dropped += 1
+        # No awaits below, so blocked producers cannot interleave
+        while not self.queue.empty():
+            item = self.queue.get_nowait()
+            if item is not _CLOSE and item[2] == request_id:
+                dropped += 1
+            else:
+                kept.append(item)
+        for item in kept:
+            self.queue.put_nowait(item)
+
+        self._text_started.discard(request_id)
+        self.frames_purged += dropped
+        return dropped
+
+    async def _put(self, item: Tuple[str, Any, Optional[str]]):
+        if self.closed:
+            raise SlowClientError("websocket sender is closed")
+        self.start()
+        # asyncio.timeout, not wait_for: on 3.11 wait_for can swallow the
+        # turn's cancellation when the put completes at the same moment
+        try:
+            async with asyncio.timeout(self.send_timeout):
+                await self.queue.put(item)
+        except asyncio.TimeoutError:
+            await self._disconnect_slow_client()
+            raise SlowClientError("client is not reading; disconnected")
+        self.events_enqueued += 1
+
+    async def _next(self, timeout: Optional[float] = None) -> Any:
+        if self._held is not None:
+            item, self._held = self._held, None
+            return item
+        if timeout is None:
+            return await self.queue.get()
+        async with asyncio.timeout(timeout):
+            return await self.queue.get()
+
+    async def _coalesce(self, event: Dict[str, Any]) -> Dict[str, Any]:
+        """Merge following agent_text deltas of the same request into `event`"""
+        request_id = event.get("request_id")
+        if request_id not in self._text_started:
+            # First delta of a request goes out right away
+            self._text_started.add(request_id)
+            return event
+
+        parts = [event.get("text") or ""]
+        size = len(parts[0])
+        deadline = asyncio.get_running_loop().time() + self.coalesce_window
+        while size < self.coalesce_max_chars:
+            remaining = deadline - asyncio.get_running_loop().time()
+            try:
+                if self.queue.empty() and self._held is None:
+                    if remaining <= 0:
+                        break
+                    item = await self._next(remaining)
+                else:
+                    item = await self._next()
+            except asyncio.TimeoutError:
+                break
+            kind, payload, _ = item if item is not _CLOSE else (None, None, None)
+            if (
+                kind != "json"
+                or payload.get("type") != "agent_text"
+                or payload.get("request_id") != request_id
+            ):
+                self._held = item
+                break
+            parts.append(payload.get("text") or "")
+            size += len(parts[-1])
+            self.text_deltas_coalesced += 1
+
+        return {**event, "text": "".join(parts)}
+
+    async def _run(self):
+        try:
+            while True:
+                item = await self._next()
+                if item is _CLOSE:
+                    return
+                kind, payload, _ = item
+                if kind == "json" and payload.get("type") == "agent_text":
+                    payload = await self._coalesce(payload)
+                elif kind == "json" and payload.get("type") in ("complete", "cancelled", "error"):
+                    self._text_started.discard(payload.get("request_id"))
+
+                if kind == "json":
+                    write = self.websocket.send_json(payload)
+                else:
+                    write = self.websocket.send_bytes(payload)
+                start = time.perf_counter()
+                try:
+                    async with asyncio.timeout(self.send_timeout):
+                        await write
+                except asyncio.TimeoutError:
+                    await self._disconnect_slow_client()
+                    return
+                ws_send_latency.observe(time.perf_counter() - start, kind=kind)
+                self.frames_sent += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Socket already closed by the client
+            logger.info(f"Outbound writer stopped: {e}")
+            self.closed = True
+
+    async def _disconnect_slow_client(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.slow_client_disconnects += 1
+        ws_slow_clients.inc()
+        logger.warning("🐢 Slow websocket client; closing connection")
+        try:
+            await self.websocket.close(code=1013)
+        except Exception:
+            pass
+
+    async def close(self, timeout: float = 1.0):
+        """Flush what is queued (briefly), then stop the writer"""
+        if self._writer is None:
+            self.closed = True
+            return
+        if not self.closed:
+            try:
+                self.queue.put_nowait(_CLOSE)
+                await asyncio.wait_for(asyncio.shield(self._writer), timeout)
+            except (asyncio.QueueFull, asyncio.TimeoutError):
+                pass
+        self.closed = True
+        self._writer.cancel()
+        await asyncio.gather(self._writer, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": self.queue.qsize(),
+            "events_enqueued": self.events_enqueued,
+            "frames_sent": self.frames_sent,
+            "text_deltas_coalesced": self.text_deltas_coalesced,
+            "frames_purged": self.frames_purged,
+            "slow_client_disconnects": self.slow_client_disconnects,
+        }
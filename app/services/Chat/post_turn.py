@@ -0,0 +1,261 @@
+import re
+import random
+import asyncio
+import hashlib
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from ...core.admission import Priority, admission, set_request_priority
+from ...core.singleflight import SingleFlight
+
+
+logger = logging.getLogger(__name__)
+
+SendFunction = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+def heuristic_title(first_message: str, max_words: int = 6) -> str:
+    """Cheap title from the first message, used when the LLM path is unavailable"""
+    words = re.sub(r"\s+", " ", first_message).strip().split(" ")
+    title = " ".join(words[:max_words]).strip(" .,!?;:")
+    if not title:
+        return "New Chat"
+    return title[0].upper() + title[1:] + ("..." if len(words) > max_words else "")
+
+
+def title_key(first_message: str) -> str:
+    """First messages that differ only in case or spacing get the same title"""
+    normalized = " ".join(first_message.lower().split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class PostTurnJob:
+    """Session bookkeeping for one completed first turn"""
+
+    def __init__(
+        self,
+        send: SendFunction,
+        user_id: str,
+        session_id: str,
+        first_message: Optional[str] = None,
+        title: Optional[str] = None,
+        Type: str = "Ressures",
+    ):
+        self.send = send
+        self.user_id = user_id
+        self.session_id = session_id
+        self.first_message = first_message
+        self.title = title
+        self.Type = Type
+
+
+class PostTurnQueue:
+    """
+    Bounded background queue for title generation and session persistence
+
+    Keeps the LLM title round trip and Mongo writes off the response
+    critical path. Workers batch pending title requests across sessions
+    into one LLM call, retry with backoff, and push the `title` event to
+    the client when ready. When the queue is full the job is completed
+    with a heuristic title instead of waiting. Later turns only bump the
+    session's `updated_at` (see `touch`).
+    """
+
+    def __init__(
+        self,
+        session_manager,
+        title_generator: Optional[Callable[[str], Awaitable[str]]] = None,
+        batch_title_generator: Optional[Callable[[List[str]], Awaitable[List[str]]]] = None,
+        max_size: int = 1000,
+        workers: int = 2,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        batch_size: int = 8,
+        batch_wait: float = 0.05,
+    ):
+        self.session_manager = session_manager
+        self.title_generator = title_generator
+        self.batch_title_generator = batch_title_generator
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_size)
+        self.num_workers = workers
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self._workers: List[asyncio.Task] = []
+        self._background: set = set()
+        # Workers asking for the same title at once share one LLM call
+        self.title_flight = SingleFlight("title")
+
+        self.completed = 0
+        self.saturated = 0
+        self.title_fallbacks = 0
+        self.persist_failures = 0
+        self.titles_deduplicated = 0
+
+    def start(self):
+        if not self._workers:
+            self._workers = [
+                asyncio.create_task(self._worker(i)) for i in range(self.num_workers)
+            ]
+
+    def submit(self, job: PostTurnJob):
+        """Enqueue without waiting; saturated queues fall back to a heuristic title"""
+        self.start()
+        try:
+            self.queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.saturated += 1
+            if job.title is None:
+                job.title = heuristic_title(job.first_message or "")
+                self.title_fallbacks += 1
+            self._spawn(self._finish(job))
+
+    def touch(self, session_id: str):
+        """Bump a session's updated_at after a later turn, without waiting"""
+        self._spawn(self._touch(session_id))
+
+    def _spawn(self, coroutine: Awaitable[None]):
+        task = asyncio.create_task(coroutine)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def drain(self, timeout: float = 10.0):
+        """Finish queued work on shutdown, then stop the workers"""
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Post-turn queue drain timed out with {self.queue.qsize()} jobs left")
+        if self._background:
+            await asyncio.gather(*self._background, return_exceptions=True)
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def _worker(self, index: int):
+        set_request_priority(Priority.BACKGROUND)
+        while True:
+            batch = [await self.queue.get()]
+            # Collect more jobs briefly so titles share one LLM call
+            deadline = asyncio.get_running_loop().time() + self.batch_wait
+            while len(batch) < self.batch_size:
+                remaining = deadline - asyncio.get_running_loop().time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                await self._generate_titles([job for job in batch if job.title is None])
+                await asyncio.gather(*(self._finish(job) for job in batch))
+            except Exception as e:
+                logger.error(f"Post-turn worker {index} error: {e}")
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    async def _generate_titles(self, jobs: List[PostTurnJob]):
+        if not jobs:
+            return
+
+        messages = [job.first_message or "" for job in jobs]
+        # Identical first messages in one batch are only titled once
+        unique: Dict[str, str] = {}
+        for message in messages:
+            unique.setdefault(title_key(message), message)
+        self.titles_deduplicated += len(messages) - len(unique)
+        titles: Optional[Dict[str, str]] = None
+
+        if self.batch_title_generator and len(unique) > 1:
+            generated = await self._with_retries(
+                lambda: self._admitted(self.batch_title_generator, list(unique.values()))
+            )
+            if (
+                isinstance(generated, list)
+                and len(generated) == len(unique)
+                and all(isinstance(title, str) for title in generated)
+            ):
+                titles = dict(zip(unique, generated))
+
+        if titles is None and self.title_generator:
+            titles = {}
+            for key, message in unique.items():
+                titles[key] = await self._with_retries(
+                    lambda k=key, m=message: self.title_flight.do(
+                        k, lambda: self._admitted(self.title_generator, m)
+                    )
+                )
+
+        for job, message in zip(jobs, messages):
+            title = titles.get(title_key(message)) if titles else None
+            if not title:
+                title = heuristic_title(job.first_message or "")
+                self.title_fallbacks += 1
+            job.title = title
+
+    @staticmethod
+    async def _admitted(generate: Callable[[Any], Awaitable[Any]], arg: Any) -> Any:
+        """Title LLM calls queue behind interactive traffic"""
+        async with admission.slot("llm", Priority.BACKGROUND):
+            return await generate(arg)
+
+    async def _with_retries(self, call: Callable[[], Awaitable[Any]]) -> Any:
+        for attempt in range(self.max_retries):
+            try:
+                return await call()
+            except Exception as e:
+                delay = random.uniform(0, self.backoff_base * 2 ** attempt)
+                logger.warning(f"Post-turn attempt {attempt + 1} failed ({e}); retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+        return None
+
+    async def _finish(self, job: PostTurnJob):
+        try:
+            await job.send({
+                "type": "title",
+                "title": job.title,
+                "session_id": job.session_id
+            })
+            logger.info(f"📝 Generated title: {job.title}")
+        except Exception:
+            # Client already gone; the session is still persisted
+            pass
+
+        result = await self._with_retries(
+            lambda: self.session_manager.create_session(
+                job.user_id, job.session_id, job.title, Type=job.Type
+            )
+        )
+        if result is None:
+            self.persist_failures += 1
+            logger.error(f"MongoDB error: could not create session {job.session_id}")
+            try:
+                await job.send({
+                    "type": "error",
+                    "message": f"MongoDB error: could not save session {job.session_id}"
+                })
+            except Exception:
+                pass
+        else:
+            logger.info(f"💾 Session created: {job.session_id}")
+        self.completed += 1
+
+    async def _touch(self, session_id: str):
+        result = await self._with_retries(lambda: self.session_manager.touch_session(session_id))
+        if result is None:
+            self.persist_failures += 1
+            logger.error(f"MongoDB error: could not update session {session_id}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": self.queue.qsize(),
+            "max_size": self.queue.maxsize,
+            "completed": self.completed,
+            "saturated": self.saturated,
+            "title_fallbacks": self.title_fallbacks,
+            "persist_failures": self.persist_failures,
+            "titles_deduplicated": self.titles_deduplicated,
+            "title_singleflight": self.title_flight.stats(),
+        }
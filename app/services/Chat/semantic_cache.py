@@ -0,0 +1,263 @@
+import re
+import time
+import uuid
+import asyncio
+import logging
+from typing import TYPE_CHECKING, Any, AsyncGenerator, Callable, Dict, List, Optional, Set, Tuple
+from langchain_core.messages import AIMessage, HumanMessage
+from ...DB.VectorDB.VectorDB import VectorStore
+from ...DB.VectorDB.embeddings import OpenAIEmbedder
+from ...core.config import Settings
+
+if TYPE_CHECKING:
+    from ...DB.MongoDB.mongobd import MongoDBSessionManager
+
+
+logger = logging.getLogger(__name__)
+
+
+# Follow-ups that only make sense against earlier turns ("yes", "tell me more")
+_FOLLOW_UP_OPENERS = re.compile(
+    r"^(yes|yeah|yep|no|nope|ok|okay|sure|thanks|and|also|but|so|then|"
+    r"why|how so|what about|tell me more|more|again|same)\b"
+)
+_ANAPHORA = frozenset({
+    "it", "its", "it's", "that", "this", "these", "those", "them", "they",
+    "he", "she", "him", "her", "above", "previous", "earlier",
+})
+
+
+class SemanticCache:
+    """
+    Semantic response cache in front of the chat response generator
+
+    Incoming user text is embedded and matched against prior questions in
+    a dedicated Chroma collection. A match above `threshold` cosine
+    similarity (same scope, not expired) is streamed back without calling
+    the LLM; misses are answered normally and stored afterwards. A hit
+    is still written to the session's message history, like an answer
+    from the LLM would be, so follow-up turns and /chat_history see it.
+
+    Only context-free turns go through the cache: the first message of a
+    new session, long enough to stand on its own and without references
+    to earlier turns. Entries are scoped server-side (per user, or per
+    configured tenant), never by anything the client sends.
+    """
+
+    COLLECTION_NAME = "semantic_response_cache"
+
+    def __init__(
+        self,
+        vector_store: VectorStore,
+        embedder: OpenAIEmbedder,
+        threshold: float = Settings.SEMANTIC_CACHE_THRESHOLD,
+        ttl_seconds: int = Settings.SEMANTIC_CACHE_TTL,
+        max_entries: int = Settings.SEMANTIC_CACHE_MAX_ENTRIES,
+        min_words: int = Settings.SEMANTIC_CACHE_MIN_WORDS,
+        session_manager: Optional["MongoDBSessionManager"] = None,
+    ):
+        self.collection = vector_store.get_collection(self.COLLECTION_NAME)
+        self.embedder = embedder
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.min_words = min_words
+        self.session_manager = session_manager
+        self._stores: Set[asyncio.Task] = set()
+
+        self.skipped = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.history_failures = 0
+        self.total_lookup_time = 0.0
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        return re.sub(r"\s+", " ", text).strip().lower()
+
+    @staticmethod
+    def scope_for(user_id: Optional[str]) -> Optional[str]:
+        """Cache partition for a request; None disables caching for it"""
+        if Settings.SEMANTIC_CACHE_SCOPE == "tenant" and Settings.SEMANTIC_CACHE_TENANT:
+            return f"tenant:{Settings.SEMANTIC_CACHE_TENANT}"
+        return f"user:{user_id}" if user_id else None
+
+    def is_cacheable(self, user_input: str) -> bool:
+        """Whether a question stands on its own (not short, not a follow-up)"""
+        text = self.normalize(user_input)
+        words = re.findall(r"[a-z0-9']+", text)
+        if len(words) < self.min_words:
+            return False
+        if _FOLLOW_UP_OPENERS.match(text):
+            return False
+        return not any(word in _ANAPHORA for word in words)
+
+    async def lookup(self, user_input: str, scope: str) -> Tuple[Optional[str], List[float]]:
+        """
+        Find a cached answer for a near-duplicate question
+
+        Returns:
+            (answer or None, query embedding for reuse when storing)
+        """
+        start = time.perf_counter()
+        embedding = await self.embedder.embed_query(self.normalize(user_input))
+        result = await asyncio.to_thread(
+            self.collection.query,
+            query_embeddings=[embedding],
+            n_results=1,
+            where={"scope": scope},
+            include=["metadatas", "distances"],
+        )
+        self.total_lookup_time += time.perf_counter() - start
+
+        ids = result["ids"][0] if result.get("ids") else []
+        if ids:
+            metadata = result["metadatas"][0][0]
+            similarity = 1.0 - result["distances"][0][0]
+            if metadata["expires_at"] < time.time():
+                await asyncio.to_thread(self.collection.delete, ids=[ids[0]])
+                self.evictions += 1
+            elif similarity >= self.threshold:
+                self.hits += 1
+                logger.info(f"🎯 Semantic cache hit ({similarity:.3f})")
+                return metadata["answer"], embedding
+
+        self.misses += 1
+        return None, embedding
+
+    async def store(self, user_input: str, answer: str, scope: str, embedding: List[float]):
+        now = time.time()
+        await asyncio.to_thread(
+            self.collection.add,
+            ids=[str(uuid.uuid4())],
+            embeddings=[embedding],
+            documents=[self.normalize(user_input)],
+            metadatas=[{
+                "scope": scope,
+                "answer": answer,
+                "created_at": now,
+                "expires_at": now + self.ttl_seconds,
+            }],
+        )
+        self.stores += 1
+        if self.stores % 100 == 0:
+            await asyncio.to_thread(self.evict)
+
+    def evict(self):
+        """Drop expired entries, then the oldest ones beyond max_entries"""
+        now = time.time()
+        expired = self.collection.get(where={"expires_at": {"$lt": now}}, include=[])
+        if expired["ids"]:
+            self.collection.delete(ids=expired["ids"])
+            self.evictions += len(expired["ids"])
+
+        overflow = self.collection.count() - self.max_entries
+        if overflow > 0:
+            entries = self.collection.get(include=["metadatas"])
+            oldest = sorted(
+                zip(entries["ids"], entries["metadatas"]),
+                key=lambda item: item[1]["created_at"]
+            )[:overflow]
+            self.collection.delete(ids=[entry_id for entry_id, _ in oldest])
+            self.evictions += len(oldest)
+
+    def cached(
+        self,
+        response_function: Callable[..., AsyncGenerator[str, None]],
+        scope: str,
+    ) -> Callable[..., AsyncGenerator[str, None]]:
+        """
+        Wrap a response generator so cache hits skip the LLM call
+
+        Args:
+            response_function: Chat response generator for this turn
+            scope: Partition from `scope_for()`; only use this wrapper for
+                turns without history (first message of a new session)
+
+        On a miss, `response_function` also receives the lookup's
+        `query_embedding`.
+        """
+
+        async def cached_response(session_id: str, user_input: str, user_id: str):
+            if not self.is_cacheable(user_input):
+                self.skipped += 1
+                async for chunk in response_function(
+                    session_id=session_id,
+                    user_input=user_input,
+                    user_id=user_id
+                ):
+                    yield chunk
+                return
+
+            try:
+                answer, embedding = await self.lookup(user_input, scope)
+            except Exception as e:
+                logger.warning(f"Semantic cache lookup error: {e}")
+                answer, embedding = None, None
+
+            if answer is not None:
+                # Replay word by word so downstream sentence batching behaves
+                for word in re.findall(r"\S+\s*", answer):
+                    yield word
+                await self._record_turn(session_id, user_input, answer)
+                return
+
+            # Retrieval reuses the lookup's embedding instead of embedding the query again
+            context = {"query_embedding": embedding} if embedding is not None else {}
+            parts: List[str] = []
+            async for chunk in response_function(
+                session_id=session_id,
+                user_input=user_input,
+                user_id=user_id,
+                **context
+            ):
+                parts.append(chunk)
+                yield chunk
+
+            if embedding is not None and parts:
+                task = asyncio.create_task(
+                    self._store_safely(user_input, "".join(parts), scope, embedding)
+                )
+                self._stores.add(task)
+                task.add_done_callback(self._stores.discard)
+
+        return cached_response
+
+    async def _record_turn(self, session_id: str, user_input: str, answer: str):
+        """Add a replayed question/answer pair to the session's message history"""
+        if self.session_manager is None:
+            return
+        try:
+            await self.session_manager.add_messages(
+                session_id,
+                [HumanMessage(content=user_input), AIMessage(content=answer)]
+            )
+        except Exception as e:
+            self.history_failures += 1
+            logger.error(f"Semantic cache history write error: {e}")
+
+    async def drain(self):
+        """Wait for background stores (used on shutdown)"""
+        if self._stores:
+            await asyncio.gather(*self._stores, return_exceptions=True)
+
+    async def _store_safely(self, user_input: str, answer: str, scope: str, embedding: List[float]):
+        try:
+            await self.store(user_input, answer, scope, embedding)
+        except Exception as e:
+            logger.error(f"Semantic cache store error: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "skipped": self.skipped,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "history_failures": self.history_failures,
+            "avg_lookup_time": self.total_lookup_time / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,236 @@
+import time
+import asyncio
+import logging
+import importlib
+from functools import cached_property
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from ...core.config import Settings
+
+
+logger = logging.getLogger(__name__)
+
+# Heavy third-party modules the services import on first use
+HEAVY_MODULES = (
+    "openai",
+    "chromadb",
+    "langchain_core.messages",
+    "langchain_openai",
+    "langchain_mongodb",
+    "langchain_text_splitters",
+    "motor.motor_asyncio",
+)
+
+
+def preload_modules(modules=HEAVY_MODULES) -> Dict[str, float]:
+    """
+    Import the heavy dependencies up front
+
+    Called by a preloading master (see gunicorn.conf.py) so forked workers
+    share the imported modules instead of each paying for them.
+
+    Returns:
+        Seconds spent per module (missing optional modules are skipped)
+    """
+    timings: Dict[str, float] = {}
+    for name in modules:
+        start = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except ImportError as e:
+            logger.warning(f"Preload skipped {name}: {e}")
+            continue
+        timings[name] = time.perf_counter() - start
+    return timings
+
+
+class Readiness:
+    """Warm-up state of each startup component, for the /health probe"""
+
+    def __init__(self):
+        self.components: Dict[str, Dict[str, Any]] = {}
+        self.started_at = time.time()
+
+    def pending(self, name: str):
+        self.components[name] = {"status": "pending"}
+
+    def ready(self, name: str, started: float):
+        self.components[name] = {"status": "ready", "seconds": time.perf_counter() - started}
+
+    def failed(self, name: str, error: Exception):
+        self.components[name] = {"status": "failed", "error": str(error)}
+
+    @property
+    def is_ready(self) -> bool:
+        return bool(self.components) and all(
+            component["status"] == "ready" for component in self.components.values()
+        )
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "status": "ready" if self.is_ready else "starting",
+            "uptime": time.time() - self.started_at,
+            "components": self.components,
+        }
+
+
+class ChatServices:
+    """
+    Process-wide chat services, built on first use
+
+    Nothing is constructed at import time, so importing the app stays
+    cheap and a preloading master process never creates clients, pools
+    or tasks that its forked workers would then share. `startup()` builds
+    and warms everything from the app lifespan; `readiness` reports which
+    parts are warm. Any service can be replaced by plain assignment
+    before first use (e.g. fakes in benchmarks).
+    """
+
+    def __init__(
+        self,
+        title_generator: Optional[Callable[[str], Awaitable[str]]] = None,
+        batch_title_generator: Optional[Callable[[List[str]], Awaitable[List[str]]]] = None,
+    ):
+        self.title_generator = title_generator
+        self.batch_title_generator = batch_title_generator
+        self.readiness = Readiness()
+        self._warmups: List[asyncio.Task] = []
+
+    def is_built(self, name: str) -> bool:
+        return name in self.__dict__
+
+    def build(self, *names: str):
+        """Construct the named services now instead of on first use"""
+        for name in names:
+            getattr(self, name)
+
+    @cached_property
+    def mongodb(self):
+        from ...DB.MongoDB.mongobd import MongoDBSessionManager
+        return MongoDBSessionManager()
+
+    @cached_property
+    def summarizer(self):
+        from .summarizer import ConversationSummarizer
+        return ConversationSummarizer(self.mongodb)
+
+    @cached_property
+    def post_turn_queue(self):
+        from .post_turn import PostTurnQueue
+        return PostTurnQueue(
+            self.mongodb,
+            title_generator=self.title_generator,
+            batch_title_generator=self.batch_title_generator,
+            max_size=Settings.POST_TURN_QUEUE_SIZE,
+            workers=Settings.POST_TURN_WORKERS
+        )
+
+    @cached_property
+    def tts_cache(self):
+        from ...module.text_to_speech.tts_model import create_tts_cache
+        return create_tts_cache()
+
+    @cached_property
+    def voice_pipeline(self):
+        from ...module.text_to_speech.tts_model import TTSservice
+        from ...module.voicePipeline.VoicePipeline import VoicePipeline
+        return VoicePipeline(tts_service=TTSservice(cache=self.tts_cache))
+
+    @cached_property
+    def embedder(self):
+        from ...DB.VectorDB.embeddings import OpenAIEmbedder
+        return OpenAIEmbedder()
+
+    @cached_property
+    def vector_store(self):
+        from ...DB.VectorDB.VectorDB import VectorStore
+        return VectorStore(Settings.CHROMA_PERSIST_DIR, embedder=self.embedder)
+
+    @cached_property
+    def semantic_cache(self):
+        if not Settings.SEMANTIC_CACHE_ENABLED:
+            return None
+        from .semantic_cache import SemanticCache
+        return SemanticCache(self.vector_store, self.embedder, session_manager=self.mongodb)
+
+    async def _warm(self, name: str, warmup: Callable[[], Awaitable[Any]]):
+        """Run one warm-up, retrying with backoff until it succeeds (missing modules fail at once)"""
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                await warmup()
+            except ImportError as e:
+                # A missing package will not appear by retrying
+                logger.error(f"❌ Warm-up of {name} failed for good: {e}")
+                self.readiness.failed(name, e)
+                return
+            except Exception as e:
+                attempt += 1
+                delay = min(Settings.WARMUP_MAX_BACKOFF, 2 ** attempt)
+                logger.warning(f"❌ Warm-up of {name} failed ({e}); retrying in {delay}s")
+                self.readiness.failed(name, e)
+                await asyncio.sleep(delay)
+                continue
+            self.readiness.ready(name, start)
+            logger.info(f"🔥 {name} ready in {time.perf_counter() - start:.2f}s")
+            return
+
+    def _start_warmup(self, name: str, warmup: Callable[[], Awaitable[Any]]):
+        self.readiness.pending(name)
+        self._warmups.append(asyncio.create_task(self._warm(name, warmup)))
+
+    async def startup(self):
+        """
+        Build the services and warm pools and caches in the background
+
+        Returns right away so the worker starts accepting connections;
+        /health reports ready once every warm-up has finished.
+        """
+        self._start_warmup("mongodb", self._warm_mongodb)
+        self._start_warmup("voice_pipeline", self._warm_voice_pipeline)
+        self._start_warmup("retrieval_index", self._warm_retrieval_index)
+        if Settings.TTS_CACHE_PREWARM_FILE:
+            self._start_warmup("tts_cache", self._warm_tts_cache)
+
+    async def _warm_mongodb(self):
+        # Creating the indexes also opens the connection pool
+        await self.mongodb.ensure_indexes()
+        self.post_turn_queue.start()
+        self.build("summarizer")
+
+    async def _warm_voice_pipeline(self):
+        pipeline = self.voice_pipeline
+        preprocessor = pipeline.stt_service.preprocessor
+        if preprocessor is not None:
+            await preprocessor.warm()
+
+    async def _warm_retrieval_index(self):
+        # The semantic cache records hits through the Mongo client; create
+        # that on the loop, not in the worker thread below
+        self.build("mongodb")
+        # Opening the persistent Chroma client touches disk; keep it off the loop
+        await asyncio.to_thread(self.build, "vector_store", "semantic_cache")
+        await asyncio.to_thread(self.vector_store.build_lexical_index)
+
+    async def _warm_tts_cache(self):
+        with open(Settings.TTS_CACHE_PREWARM_FILE, encoding="utf-8") as f:
+            phrases = f.read().splitlines()
+        await self.voice_pipeline.tts_service.prewarm(phrases)
+
+    async def shutdown(self):
+        """Finish pending titles, session writes and summaries, then close what was built"""
+        for task in self._warmups:
+            task.cancel()
+        await asyncio.gather(*self._warmups, return_exceptions=True)
+        self._warmups = []
+
+        if self.is_built("post_turn_queue"):
+            await self.post_turn_queue.drain()
+        if self.is_built("summarizer"):
+            await self.summarizer.drain()
+        if self.is_built("semantic_cache") and self.semantic_cache:
+            await self.semantic_cache.drain()
+        if self.is_built("mongodb"):
+            self.mongodb.close()
+        if self.is_built("voice_pipeline"):
+            await self.voice_pipeline.stt_service.aclose()
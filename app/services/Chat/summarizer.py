@@ -0,0 +1,190 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+from langchain_openai import ChatOpenAI
+from ...DB.MongoDB.mongobd import MongoDBSessionManager
+from ...core.config import Settings
+from ...core.admission import Priority, admission, set_request_priority
+
+
+logger = logging.getLogger(__name__)
+
+
+SUMMARY_PROMPT = (
+    "You maintain a running summary of a customer support conversation.\n"
+    "Existing summary:\n{summary}\n\n"
+    "New messages:\n{transcript}\n\n"
+    "Write an updated summary in under 200 words. Keep names, products, "
+    "order numbers, problems reported and anything already promised. "
+    "Return only the summary."
+)
+
+
+class ConversationSummarizer:
+    """
+    Rolling summarization that caps prompt size per turn
+
+    Once the messages after the last summary exceed `token_budget`, the
+    oldest of them are folded into a stored summary until what is left
+    fits in `low_water` tokens (and at most `keep_recent` messages). The
+    gap between the two marks means a settled session is summarized once
+    every ~budget/2 tokens, not on every turn. A longer backlog is read
+    and folded `max_fetch` messages at a time. This runs in the background
+    after a turn completes; per-turn context is the cached summary plus
+    the messages it does not cover yet.
+    """
+
+    def __init__(
+        self,
+        session_manager: MongoDBSessionManager,
+        llm: Optional[ChatOpenAI] = None,
+        token_budget: int = Settings.SUMMARY_TOKEN_BUDGET,
+        low_water: Optional[int] = None,
+        keep_recent: int = Settings.CHAT_HISTORY_WINDOW,
+        cache_size: int = Settings.SUMMARY_CACHE_SIZE,
+        max_fetch: int = Settings.SUMMARY_MAX_FETCH,
+    ):
+        self.session_manager = session_manager
+        self.llm = llm or ChatOpenAI(model=Settings.SUMMARY_MODEL, temperature=0)
+        self.token_budget = token_budget
+        self.low_water = token_budget // 2 if low_water is None else low_water
+        self.keep_recent = keep_recent
+        self.cache_size = cache_size
+        self.max_fetch = max_fetch
+
+        self._cache: "OrderedDict[str, Dict[str, str]]" = OrderedDict()
+        self._running: Dict[str, asyncio.Task] = {}
+        self._rerun: Set[str] = set()
+
+        self.summaries_written = 0
+        self.failures = 0
+
+    def schedule(self, session_id: str):
+        """Queue a background summarization check for a session (deduplicated)"""
+        if session_id in self._running:
+            self._rerun.add(session_id)
+            return
+        task = asyncio.create_task(self._run(session_id))
+        self._running[session_id] = task
+
+    async def _run(self, session_id: str):
+        # Scheduled from a turn's task; must not inherit its priority
+        set_request_priority(Priority.BACKGROUND)
+        try:
+            while True:
+                self._rerun.discard(session_id)
+                try:
+                    await self.maybe_summarize(session_id)
+                except Exception as e:
+                    self.failures += 1
+                    logger.error(f"Error summarizing session {session_id}: {e}")
+                if session_id not in self._rerun:
+                    break
+        finally:
+            self._running.pop(session_id, None)
+
+    async def drain(self, timeout: float = Settings.SUMMARY_DRAIN_TIMEOUT):
+        """Wait for in-flight summaries (used on shutdown); cancel what is left after `timeout`"""
+        if not self._running:
+            return
+        running = len(self._running)
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*self._running.values(), return_exceptions=True),
+                timeout
+            )
+        except asyncio.TimeoutError:
+            logger.warning(f"Summarizer drain timed out; cancelled {running} summaries")
+
+    async def _get_summary(self, session_id: str) -> Optional[Dict[str, str]]:
+        cached = self._cache.get(session_id)
+        if cached is not None:
+            self._cache.move_to_end(session_id)
+            return cached
+        stored = await self.session_manager.get_summary(session_id)
+        if stored:
+            self._remember(session_id, stored)
+        return stored
+
+    def _remember(self, session_id: str, summary: Dict[str, str]):
+        self._cache[session_id] = summary
+        self._cache.move_to_end(session_id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    async def maybe_summarize(self, session_id: str) -> bool:
+        """Compact older turns into the stored summary if over budget"""
+        stored = await self._get_summary(session_id)
+        covered_until = stored["covered_until"] if stored else None
+        pending: List[Tuple[str, BaseMessage]] = await self.session_manager.get_messages_after(
+            session_id, covered_until, limit=self.max_fetch + 1
+        )
+
+        if len(pending) > self.max_fetch:
+            # A backlog longer than one page: fold the page whole, then
+            # run again for the rest
+            to_fold = pending[:self.max_fetch]
+            self._rerun.add(session_id)
+        else:
+            sizes = [self.session_manager.estimate_tokens(m) for _, m in pending]
+            if sum(sizes) <= self.token_budget:
+                return False
+
+            # Keep the newest messages that fit under the low-water mark (at
+            # least the last one) and fold everything older
+            kept, kept_tokens = 1, sizes[-1]
+            while (
+                kept < min(len(pending), self.keep_recent)
+                and kept_tokens + sizes[-kept - 1] <= self.low_water
+            ):
+                kept += 1
+                kept_tokens += sizes[-kept]
+            to_fold = pending[:-kept]
+        if not to_fold:
+            return False
+        transcript = "\n".join(f"{m.type}: {m.content}" for _, m in to_fold)
+        prompt = SUMMARY_PROMPT.format(
+            summary=stored["summary"] if stored else "(none)",
+            transcript=transcript,
+        )
+        async with admission.slot("llm"):
+            response = await self.llm.ainvoke([HumanMessage(content=prompt)])
+
+        summary = {"summary": response.content.strip(), "covered_until": to_fold[-1][0]}
+        await self.session_manager.save_summary(
+            session_id,
+            summary["summary"],
+            summary["covered_until"],
+        )
+        self._remember(session_id, summary)
+        self.summaries_written += 1
+        logger.info(f"🧾 Summarized {len(to_fold)} messages for session {session_id}")
+        return True
+
+    async def build_context(self, session_id: str) -> List[BaseMessage]:
+        """
+        Prompt history for the next turn: stored summary + recent window
+
+        The window only holds messages the summary does not cover, capped
+        at `keep_recent` messages and `token_budget` tokens. Never calls
+        the LLM, so turn latency stays flat as sessions grow.
+        """
+        stored = await self._get_summary(session_id)
+        recent = await self.session_manager.get_recent_messages(
+            session_id,
+            self.keep_recent,
+            max_tokens=self.token_budget,
+            after=stored["covered_until"] if stored else None,
+        )
+        if not stored:
+            return recent
+
+        context: List[BaseMessage] = [
+            SystemMessage(content=f"Summary of the earlier conversation: {stored['summary']}")
+        ]
+        return context + recent
+
+    def clear(self, session_id: str):
+        self._cache.pop(session_id, None)
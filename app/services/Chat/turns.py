@@ -0,0 +1,170 @@
+import time
+import asyncio
+import logging
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, List, Optional
+from ...core.admission import AdmissionRejected
+from ...core.metrics import Trace, detach_trace, finish_trace, record_span
+from .outbound import OutboundSender
+
+
+logger = logging.getLogger(__name__)
+
+
+class TurnContext:
+    """
+    One request/response turn on a websocket
+
+    Tags every outgoing event with the turn's request_id and counts the
+    work done so a cancellation can report what it saved.
+    """
+
+    def __init__(self, sender: OutboundSender, request_id: str, trace: Optional[Trace] = None):
+        self.sender = sender
+        self.request_id = request_id
+        self.trace = trace
+        self.started_at = time.time()
+        self.llm_chunks = 0
+        self.llm_chars = 0
+        self._reporters: List[Callable[[], Dict[str, Any]]] = []
+
+    async def send_json(self, event: Dict[str, Any]):
+        await self.sender.send_json({**event, "request_id": self.request_id})
+
+    async def send_bytes(self, data: bytes):
+        await self.sender.send_bytes(data, request_id=self.request_id)
+
+    def track_response(
+        self,
+        response_function: Callable[..., AsyncGenerator[str, None]]
+    ) -> Callable[..., AsyncGenerator[str, None]]:
+        """Wrap the LLM stream so produced chunks are counted and timed"""
+
+        async def tracked(**kwargs):
+            start = time.perf_counter()
+            async for chunk in response_function(**kwargs):
+                if chunk:
+                    if not self.llm_chunks:
+                        record_span("llm.first_token", start)
+                    self.llm_chunks += 1
+                    self.llm_chars += len(chunk)
+                yield chunk
+            record_span("llm.complete", start, chunks=self.llm_chunks, chars=self.llm_chars)
+
+        return tracked
+
+    def add_reporter(self, reporter: Callable[[], Dict[str, Any]]):
+        """Register a callable describing pending work (e.g. queued TTS)"""
+        self._reporters.append(reporter)
+
+    def report(self) -> Dict[str, Any]:
+        report: Dict[str, Any] = {
+            "elapsed": time.time() - self.started_at,
+            "llm_chunks_received": self.llm_chunks,
+            "llm_chars_received": self.llm_chars,
+        }
+        for reporter in self._reporters:
+            try:
+                report.update(reporter())
+            except Exception as e:
+                logger.error(f"Cancel reporter error: {e}")
+        return report
+
+
+class TurnManager:
+    """
+    Runs each websocket turn as its own task
+
+    Starting a new turn (barge-in) or an explicit cancel stops the
+    in-flight turn immediately: its LLM stream, queued/in-flight TTS and
+    speculative requests are cancelled and their cleanup has finished
+    before the next turn starts.
+    """
+
+    def __init__(self):
+        self.current: Optional[TurnContext] = None
+        self._task: Optional[asyncio.Task] = None
+        self.cancelled_turns = 0
+
+    async def start(self, turn: TurnContext, work: Awaitable[None]):
+        await self.cancel(reason="superseded")
+        self.current = turn
+        self._task = asyncio.create_task(self._run(turn, work))
+        # The trace goes with the turn task; the receive loop's later spans
+        # must not land in it (or be dropped once it is finished)
+        detach_trace()
+
+    async def cancel(
+        self,
+        request_id: Optional[str] = None,
+        reason: str = "cancelled",
+        notify: bool = True,
+    ) -> Optional[Dict[str, Any]]:
+        """Cancel the in-flight turn (optionally only if it matches request_id)"""
+        turn, task = self.current, self._task
+        if turn is None or task is None or task.done():
+            return None
+        if request_id is not None and request_id != turn.request_id:
+            return None
+
+        # Measure pending work before cancellation tears it down
+        saved = turn.report()
+        task.cancel()
+        await asyncio.wait({task})
+        self.cancelled_turns += 1
+        # Its text and audio still queued must not play after `cancelled`
+        saved["frames_dropped"] = turn.sender.purge(turn.request_id)
+        logger.info(f"🛑 Turn {turn.request_id} {reason}; saved {saved}")
+
+        if notify:
+            try:
+                await turn.send_json({"type": "cancelled", "reason": reason, "saved": saved})
+            except Exception:
+                pass
+        return saved
+
+    async def _run(self, turn: TurnContext, work: Awaitable[None]):
+        outcome = "ok"
+        try:
+            await work
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            # Cancelled before the turn ever ran; avoid a never-awaited warning
+            if asyncio.iscoroutine(work):
+                work.close()
+            raise
+        except AdmissionRejected as ar:
+            outcome = "rejected"
+            logger.warning(f"🚦 Turn {turn.request_id} rejected: {ar}")
+            try:
+                await turn.send_json({
+                    "type": "error",
+                    "code": "overloaded",
+                    "message": str(ar),
+                    "retry_after": ar.retry_after
+                })
+            except Exception:
+                pass
+        except ValueError as ve:
+            outcome = "invalid"
+            logger.error(f"❌ Validation error: {ve}")
+            await self._send_error(turn, str(ve))
+        except Exception as msg_error:
+            outcome = "error"
+            logger.error(f"❌ Processing error: {msg_error}")
+            await self._send_error(turn, f"Processing error: {str(msg_error)}")
+        finally:
+            if turn.trace is not None:
+                finish_trace(turn.trace, outcome)
+            if self.current is turn:
+                self.current = None
+                self._task = None
+
+    @staticmethod
+    async def _send_error(turn: TurnContext, message: str):
+        try:
+            await turn.send_json({"type": "error", "message": message})
+        except Exception:
+            pass
+
+    async def close(self):
+        await self.cancel(reason="disconnected", notify=False)
@@ -0,0 +1,207 @@
+"""
+Offline latency benchmark for VoicePipeline.pipeline
+
+Runs full voice turns against the deterministic fakes in
+benchmarks/fakes.py for a grid of reply lengths and LLM chunk sizes, and
+writes per-scenario percentiles as JSON:
+
+    python -m benchmarks.bench_pipeline --output pipeline.json
+    python -m benchmarks.bench_pipeline --baseline pipeline.json --tolerance 0.2
+
+With --baseline, exits non-zero when a tracked metric regressed by more
+than --tolerance.
+"""
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import statistics
+import tracemalloc
+from typing import Any, Dict, List
+from app.module.voicePipeline.VoicePipeline import VoicePipeline
+from benchmarks.fakes import FakeLLM, FakeTTSService, LatencyModel, fake_stt_service, make_reply
+
+
+REPLY_LENGTHS = {"short": 1, "medium": 4, "long": 12}
+CHUNK_CHARS = (4, 16, 64)
+
+# Lower is better for all of these
+TRACKED_METRICS = (
+    "time_to_first_text",
+    "time_to_first_audio",
+    "total_time",
+    "tts_calls",
+    "wasted_speculative_calls",
+)
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_turn(args, sentences: int, chunk_chars: int, transport: str, seed: int) -> Dict[str, Any]:
+    tts = FakeTTSService(
+        first_byte=LatencyModel(args.tts_latency, args.jitter, seed=seed),
+        bytes_per_second=args.tts_bytes_per_second,
+    )
+    pipeline = VoicePipeline(
+        stt_service=fake_stt_service(
+            "What does the blinking light mean?",
+            LatencyModel(args.stt_latency, args.jitter, seed=seed + 1),
+        ),
+        tts_service=tts,
+    )
+    llm = FakeLLM(
+        make_reply(sentences, seed),
+        first_token=LatencyModel(args.llm_first_token, args.jitter, seed=seed + 2),
+        inter_chunk=LatencyModel(args.llm_inter_chunk * chunk_chars / 4, args.jitter, seed=seed + 3),
+        chunk_chars=chunk_chars,
+    )
+    session = pipeline.create_session()
+
+    start = time.perf_counter()
+    first_text = first_audio = None
+    async for event in session.pipeline(
+        audio_data=b"\0" * 16000,
+        response_function=llm,
+        session_id="bench",
+        user_id="bench",
+        audio_transport=transport,
+    ):
+        now = time.perf_counter() - start
+        if event["type"] == "agent_text" and first_text is None:
+            first_text = now
+        elif event["type"] in ("tts_audio", "tts_audio_chunk") and first_audio is None:
+            if event.get("audio") or event.get("data"):
+                first_audio = now
+    total = time.perf_counter() - start
+    session.close()
+
+    speculation = session.speculation.stats()
+    return {
+        "time_to_first_text": first_text,
+        "time_to_first_audio": first_audio,
+        "total_time": total,
+        "tts_calls": tts.calls,
+        "tts_chars": tts.chars,
+        "speculative_calls": speculation["started"],
+        "wasted_speculative_calls": speculation["misses"],
+        "wasted_speculative_chars": speculation["wasted_chars"],
+    }
+
+
+async def run_scenario(args, name: str, sentences: int, chunk_chars: int, transport: str) -> Dict[str, Any]:
+    runs = [
+        await run_turn(args, sentences, chunk_chars, transport, seed)
+        for seed in range(args.runs)
+    ]
+
+    # Separate pass for memory: tracemalloc would distort the timings
+    tracemalloc.start()
+    await run_turn(args, sentences, chunk_chars, transport, 0)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    summary: Dict[str, Any] = {
+        "scenario": name,
+        "sentences": sentences,
+        "chunk_chars": chunk_chars,
+        "transport": transport,
+        "runs": args.runs,
+        "peak_memory_bytes": peak,
+    }
+    for metric in runs[0]:
+        values = [run[metric] for run in runs if run[metric] is not None]
+        if not values:
+            summary[metric] = None
+            continue
+        summary[metric] = {
+            "p50": statistics.median(values),
+            "p95": percentile(values, 0.95),
+            "max": max(values),
+        }
+    return summary
+
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Tracked p50 metrics that got worse than the baseline by more than `tolerance`"""
+    previous = {s["scenario"]: s for s in baseline["scenarios"]}
+    regressions = []
+    for scenario in results:
+        before = previous.get(scenario["scenario"])
+        if not before:
+            continue
+        for metric in TRACKED_METRICS:
+            old = (before.get(metric) or {}).get("p50")
+            new = (scenario.get(metric) or {}).get("p50")
+            if old is None or new is None:
+                continue
+            # Small absolute slack so near-zero values do not flap
+            if new > old * (1 + tolerance) and new - old > 0.005:
+                regressions.append(
+                    f"{scenario['scenario']}: {metric} p50 {old:.4f} -> {new:.4f}"
+                )
+    return regressions
+
+
+async def main_async(args) -> Dict[str, Any]:
+    transports = ["json", "binary"] if args.transport == "both" else [args.transport]
+    scenarios = []
+    for length, sentences in REPLY_LENGTHS.items():
+        for chunk_chars in CHUNK_CHARS:
+            for transport in transports:
+                name = f"{length}-c{chunk_chars}-{transport}"
+                result = await run_scenario(args, name, sentences, chunk_chars, transport)
+                print(
+                    f"{name}: first audio p50 "
+                    f"{(result['time_to_first_audio'] or {}).get('p50')}, "
+                    f"tts calls p50 {result['tts_calls']['p50']}",
+                    file=sys.stderr,
+                )
+                scenarios.append(result)
+    return {
+        "python": platform.python_version(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "baseline")},
+        "scenarios": scenarios,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline VoicePipeline latency benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--transport", choices=["json", "binary", "both"], default="both")
+    parser.add_argument("--stt-latency", type=float, default=0.3)
+    parser.add_argument("--llm-first-token", type=float, default=0.4)
+    parser.add_argument("--llm-inter-chunk", type=float, default=0.015,
+                        help="seconds between 4-character chunks (scaled with chunk size)")
+    parser.add_argument("--tts-latency", type=float, default=0.25, help="TTS time to first byte")
+    parser.add_argument("--tts-bytes-per-second", type=float, default=2_000_000)
+    parser.add_argument("--jitter", type=float, default=0.3)
+    parser.add_argument("--output", help="write JSON results here (default: stdout)")
+    parser.add_argument("--baseline", help="previous JSON results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    results = asyncio.run(main_async(args))
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results["scenarios"], json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
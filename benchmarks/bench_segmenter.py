@@ -0,0 +1,125 @@
+"""
+Microbenchmark: incremental SentenceSegmenter vs. re-splitting the buffer
+
+Streams synthetic replies in small chunks (like LLM deltas) through both
+approaches and reports time per reply and per chunk.
+
+    python -m benchmarks.bench_segmenter --sentence-words 40 --replies 200
+    python -m benchmarks.bench_segmenter --sentence-words 40 --max-words 12
+    python -m benchmarks.bench_segmenter --tricky
+"""
+import time
+import json
+import random
+import argparse
+from app.module.voicePipeline.segmenter import SentenceSegmenter
+
+
+WORDS = (
+    "the alarm panel shows a fault on zone three please check the wiring "
+    "and reset the controller before the technician arrives on site"
+).split()
+
+# Tokens the old rules cut on by mistake
+TRICKY_WORDS = ["Dr. Smith", "3.5", "e.g.", "1,200", "J. Doe"]
+
+
+def make_reply(sentences: int, sentence_words: int, seed: int, tricky: bool = False) -> str:
+    rng = random.Random(seed)
+    vocabulary = WORDS + TRICKY_WORDS if tricky else WORDS
+    parts = []
+    for _ in range(sentences):
+        words = [rng.choice(vocabulary) for _ in range(sentence_words)]
+        parts.append(" ".join(words) + rng.choice([".", "!", "?"]))
+    return " ".join(parts)
+
+
+def chunk(text: str, size: int):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def legacy_segments(chunks, max_words: int):
+    """The previous rules: split() over the whole buffer on every chunk"""
+    buffer = ""
+    out = []
+    for piece in chunks:
+        buffer += piece
+        len(buffer.split())  # pre-emptive check
+        stripped = buffer.rstrip()
+        if (
+            stripped.endswith((".", "!", "?"))
+            or (stripped.endswith(",") and len(buffer.split()) >= 8)
+            or len(buffer.split()) >= max_words
+        ):
+            out.append(buffer.strip())
+            buffer = ""
+    if buffer.strip():
+        out.append(buffer.strip())
+    return out
+
+
+def incremental_segments(chunks, max_words: int):
+    segmenter = SentenceSegmenter(max_words=max_words, first_max_words=max_words)
+    out = []
+    for piece in chunks:
+        out.extend(segmenter.feed(piece))
+        segmenter.should_speculate()
+    remainder = segmenter.flush()
+    if remainder:
+        out.append(remainder)
+    return out
+
+
+def bench(fn, replies, *args):
+    segments = 0
+    start = time.perf_counter()
+    for chunks in replies:
+        segments += len(fn(chunks, *args))
+    return time.perf_counter() - start, segments
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--replies", type=int, default=200)
+    parser.add_argument("--sentences", type=int, default=8)
+    parser.add_argument("--sentence-words", type=int, default=40)
+    parser.add_argument("--chunk-chars", type=int, default=4)
+    parser.add_argument(
+        "--tricky", action="store_true",
+        help="mix in abbreviations, initials and numbers"
+    )
+    parser.add_argument(
+        "--max-words", type=int, default=0,
+        help="word cap for both approaches (default: 4x sentence length, "
+             "so segments end on sentence boundaries)"
+    )
+    args = parser.parse_args()
+
+    replies = [
+        chunk(
+            make_reply(args.sentences, args.sentence_words, seed, args.tricky),
+            args.chunk_chars
+        )
+        for seed in range(args.replies)
+    ]
+    total_chunks = sum(len(r) for r in replies)
+    max_words = args.max_words or args.sentence_words * 4
+
+    legacy, legacy_segments_count = bench(legacy_segments, replies, max_words)
+    incremental, incremental_segments_count = bench(incremental_segments, replies, max_words)
+    print(json.dumps({
+        "replies": args.replies,
+        "chunks": total_chunks,
+        "sentence_words": args.sentence_words,
+        "max_words": max_words,
+        "expected_segments": args.replies * args.sentences,
+        "legacy_segments": legacy_segments_count,
+        "incremental_segments": incremental_segments_count,
+        "legacy_us_per_chunk": legacy / total_chunks * 1e6,
+        "incremental_us_per_chunk": incremental / total_chunks * 1e6,
+        "speedup": legacy / incremental if incremental else None,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
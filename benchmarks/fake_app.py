@@ -0,0 +1,103 @@
+"""
+The real FastAPI app with every upstream replaced by a local fake
+
+Used by benchmarks/load_ws.py to measure how many conversations one
+worker sustains without calling OpenAI or MongoDB:
+
+    python -m benchmarks.fake_app --port 8765
+
+Adds GET /bench/loop_lag, which reports event-loop lag percentiles
+since the previous call.
+
+The in-memory MongoDB stand-in needs the dev requirements:
+
+    pip install -r requirements-dev.txt
+"""
+import os
+import sys
+
+# Must be set before the app (and its Settings) are imported
+os.environ.setdefault("OPENAI_API_KEY", "sk-fake")
+os.environ.setdefault("MONGODB_URL", "mongomock://localhost")
+os.environ.setdefault("SEMANTIC_CACHE_ENABLED", "false")
+os.environ.setdefault("TTS_CACHE_ENABLED", "false")
+os.environ.setdefault("STT_PREPROCESS_ENABLED", "false")
+os.environ.setdefault("CHROMA_PERSIST_DIR", "./bench_chroma")
+# Finer than the production default so short stages get enough samples
+os.environ.setdefault("LOOP_LAG_INTERVAL", "0.05")
+
+import argparse
+import importlib.util
+import uvicorn
+from benchmarks.fakes import (
+    FakeChatAgent, FakeLLM, FakeTTSService, LatencyModel, fake_stt_service, make_reply
+)
+from app.services.Chat import Chat_router
+from app.module.voicePipeline.VoicePipeline import VoicePipeline
+from app.core.metrics import loop_lag_monitor
+from main import app
+
+
+@app.get("/bench/loop_lag", tags=["Benchmark"])
+async def loop_lag():
+    # The app lifespan runs the monitor; load_ws resets the window before each stage
+    samples = sorted(loop_lag_monitor.take_samples())
+    if not samples:
+        return {"samples": 0}
+    pick = lambda q: samples[min(len(samples) - 1, int(q * len(samples)))]
+    return {
+        "samples": len(samples),
+        "p50": pick(0.5),
+        "p95": pick(0.95),
+        "p99": pick(0.99),
+        "max": samples[-1],
+    }
+
+
+def install_fakes(args):
+    """Swap the router's upstream clients for fakes before the services are built"""
+    Chat_router.services.voice_pipeline = VoicePipeline(
+        stt_service=fake_stt_service(
+            "What does the blinking light mean?",
+            LatencyModel(args.stt_latency, args.jitter, seed=1),
+        ),
+        tts_service=FakeTTSService(
+            first_byte=LatencyModel(args.tts_latency, args.jitter, seed=2)
+        ),
+    )
+    Chat_router.roami_reassures_instance = FakeChatAgent(FakeLLM(
+        make_reply(args.sentences),
+        first_token=LatencyModel(args.llm_first_token, args.jitter, seed=3),
+        inter_chunk=LatencyModel(args.llm_inter_chunk, args.jitter, seed=4),
+        chunk_chars=args.chunk_chars,
+    ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the app against fake upstreams")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--sentences", type=int, default=3)
+    parser.add_argument("--chunk-chars", type=int, default=4)
+    parser.add_argument("--stt-latency", type=float, default=0.3)
+    parser.add_argument("--llm-first-token", type=float, default=0.4)
+    parser.add_argument("--llm-inter-chunk", type=float, default=0.015)
+    parser.add_argument("--tts-latency", type=float, default=0.25)
+    parser.add_argument("--jitter", type=float, default=0.3)
+    args = parser.parse_args()
+
+    if os.environ["MONGODB_URL"].startswith("mongomock://") and not importlib.util.find_spec("mongomock_motor"):
+        print(
+            "benchmarks.fake_app needs mongomock-motor for its in-memory MongoDB: "
+            "pip install -r requirements-dev.txt (or set MONGODB_URL to a real server)",
+            file=sys.stderr,
+        )
+        sys.exit(2)
+
+    install_fakes(args)
+    # One worker: the report is a per-worker capacity number
+    uvicorn.run(app, host=args.host, port=args.port, workers=1, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
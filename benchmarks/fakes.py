@@ -0,0 +1,207 @@
+"""
+Deterministic stand-ins for the upstream services
+
+Used by the benchmarks so pipeline changes can be measured without
+calling OpenAI. Every fake draws its latencies from a seeded
+LatencyModel, so repeated runs see the same timings.
+"""
+import base64
+import random
+import asyncio
+from typing import AsyncIterator, Dict, Optional
+from app.module.speech_to_text.stt_model import FakeSTTBackend, STTservice
+
+
+class LatencyModel:
+    """
+    Seeded latency distribution
+
+    Args:
+        mean: Mean latency in seconds
+        jitter: Spread; stddev of the log for "lognormal", half-width
+            relative to the mean for "uniform", ignored for "fixed"
+        distribution: "fixed", "uniform" or "lognormal"
+    """
+
+    def __init__(self, mean: float, jitter: float = 0.0, distribution: str = "lognormal", seed: int = 0):
+        self.mean = mean
+        self.jitter = jitter
+        self.distribution = distribution
+        self.rng = random.Random(seed)
+
+    def sample(self) -> float:
+        if self.mean <= 0:
+            return 0.0
+        if self.distribution == "fixed" or not self.jitter:
+            return self.mean
+        if self.distribution == "uniform":
+            return self.rng.uniform(self.mean * (1 - self.jitter), self.mean * (1 + self.jitter))
+        # Lognormal with the requested mean: long tail like real upstreams
+        return self.mean * self.rng.lognormvariate(-self.jitter ** 2 / 2, self.jitter)
+
+    async def sleep(self):
+        delay = self.sample()
+        if delay:
+            await asyncio.sleep(delay)
+
+
+class BenchSTTBackend(FakeSTTBackend):
+    """FakeSTTBackend with sampled instead of fixed latency"""
+
+    name = "bench"
+
+    def __init__(self, transcript: str, latency: LatencyModel):
+        super().__init__(transcript=transcript)
+        self.latency_model = latency
+
+    async def transcribe(self, audio_data: bytes, filename: str) -> str:
+        self.calls += 1
+        await self.latency_model.sleep()
+        return self.transcript
+
+
+def fake_stt_service(transcript: str, latency: LatencyModel) -> STTservice:
+    service = STTservice(backend=BenchSTTBackend(transcript, latency))
+    # Audio preprocessing needs ffmpeg and is not what is measured here
+    service.preprocessor = None
+    return service
+
+
+class FakeTTSService:
+    """
+    Drop-in for TTSservice
+
+    Audio is `bytes_per_char` bytes per input character, delivered after
+    a sampled first-byte latency and then at `bytes_per_second`.
+    """
+
+    def __init__(
+        self,
+        first_byte: LatencyModel,
+        bytes_per_char: int = 400,
+        bytes_per_second: float = 2_000_000,
+        chunk_size: int = 4096,
+    ):
+        self.first_byte = first_byte
+        self.bytes_per_char = bytes_per_char
+        self.bytes_per_second = bytes_per_second
+        self.chunk_size = chunk_size
+        self.cache = None
+        self.model = "fake"
+
+        self.calls = 0
+        self.chars = 0
+        self.completed = 0
+        self.cancelled = 0
+
+    def _audio(self, text: str) -> bytes:
+        return b"\0" * (len(text) * self.bytes_per_char)
+
+    async def generate_speech_bytes(self, text: str, voice: str = "alloy", format: str = "mp3") -> bytes:
+        self.calls += 1
+        self.chars += len(text)
+        try:
+            await self.first_byte.sleep()
+            audio = self._audio(text)
+            await asyncio.sleep(len(audio) / self.bytes_per_second)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        self.completed += 1
+        return audio
+
+    async def generate_speech(self, text: str, voice: str = "alloy", format: str = "mp3") -> str:
+        audio = await self.generate_speech_bytes(text, voice, format)
+        return base64.b64encode(audio).decode("utf-8")
+
+    async def stream_speech(
+        self,
+        text: str,
+        voice: str = "alloy",
+        format: str = "mp3",
+        chunk_size: Optional[int] = None,
+    ) -> AsyncIterator[bytes]:
+        self.calls += 1
+        self.chars += len(text)
+        chunk_size = chunk_size or self.chunk_size
+        try:
+            await self.first_byte.sleep()
+            audio = self._audio(text)
+            for i in range(0, len(audio), chunk_size):
+                chunk = audio[i:i + chunk_size]
+                await asyncio.sleep(len(chunk) / self.bytes_per_second)
+                yield chunk
+        except (asyncio.CancelledError, GeneratorExit):
+            self.cancelled += 1
+            raise
+        self.completed += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "calls": self.calls,
+            "chars": self.chars,
+            "completed": self.completed,
+            "cancelled": self.cancelled,
+        }
+
+
+class FakeLLM:
+    """
+    Streaming response function with configurable pacing
+
+    Yields `reply` in `chunk_chars` pieces: the first after a sampled
+    time-to-first-token, the rest every sampled inter-chunk delay.
+    """
+
+    def __init__(
+        self,
+        reply: str,
+        first_token: LatencyModel,
+        inter_chunk: LatencyModel,
+        chunk_chars: int = 4,
+    ):
+        self.reply = reply
+        self.first_token = first_token
+        self.inter_chunk = inter_chunk
+        self.chunk_chars = chunk_chars
+        self.calls = 0
+
+    async def __call__(self, session_id: str, user_input: str, user_id: str):
+        self.calls += 1
+        await self.first_token.sleep()
+        for i in range(0, len(self.reply), self.chunk_chars):
+            if i:
+                await self.inter_chunk.sleep()
+            yield self.reply[i:i + self.chunk_chars]
+
+
+SENTENCES = [
+    "Thanks for reaching out about your alarm panel.",
+    "Please check that the battery is seated correctly, and that the green light is on.",
+    "If the fault light keeps blinking, reset the controller by holding the button for five seconds.",
+    "Dr. Smith from our support team can visit on site if the problem continues.",
+    "The replacement sensor costs 3.5 dollars, e.g. for the standard model.",
+    "Is there anything else I can help you with today?",
+]
+
+
+def make_reply(sentences: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    return " ".join(rng.choice(SENTENCES) for _ in range(sentences))
+
+
+class FakeChatAgent:
+    """Stands in for the chat agent used by the router (replies + titles)"""
+
+    def __init__(self, llm: FakeLLM):
+        self.llm = llm
+
+    def get_response(self, session_id: str, user_input: str, user_id: str, **context):
+        # Grounding (knowledge, history) is accepted and ignored
+        return self.llm(session_id=session_id, user_input=user_input, user_id=user_id)
+
+    async def generate_session_title(self, first_message: str) -> str:
+        return first_message[:50]
+
+    async def generate_session_titles(self, first_messages):
+        return [message[:50] for message in first_messages]
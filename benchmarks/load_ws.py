@@ -0,0 +1,328 @@
+"""
+WebSocket load generator and per-worker capacity report for /ws
+
+Opens many concurrent /ws connections and replays a mix of `text` and
+`voice` turns using the real message protocol, in stages of increasing
+concurrency. Each stage reports throughput, p50/p95/p99 latency per
+event, error rate and event-loop lag; the first stage that breaks an SLO
+marks the saturation point, and the stage before it is the capacity of
+one worker.
+
+    # app wired to fake upstreams, started by the tool itself
+    python -m benchmarks.load_ws --spawn-server --stages 50,100,200,500,1000
+
+    # or against a running `python -m benchmarks.fake_app --port 8765`
+    python -m benchmarks.load_ws --url ws://127.0.0.1:8765/ws --audio sample.webm
+
+Thousands of connections need a raised file-descriptor limit
+(`ulimit -n 65536`) on both ends. Run the generator on a different core
+or host than the server so it is not the bottleneck; its own loop lag is
+reported as `client_loop_lag` for that reason.
+
+The spawned app runs with the normal admission limits, so the report
+reflects them (e.g. text turns shed with `overloaded` once the llm gate
+is full); export LLM_MAX_CONCURRENCY etc. to measure other settings.
+
+Synthetic clips get random bytes per turn so the server's STT
+singleflight does not merge them; a replayed `--audio` file is identical
+on every turn, and overlapping turns will share one transcription.
+"""
+import sys
+import json
+import base64
+import time
+import uuid
+import random
+import asyncio
+import argparse
+import subprocess
+import urllib.request
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+import websockets
+
+
+TEXT_PROMPTS = [
+    "My alarm panel is beeping, what should I do?",
+    "How do I reset the controller?",
+    "What does the blinking green light mean?",
+    "Can someone come on site tomorrow?",
+]
+
+
+def percentiles(values: List[float]) -> Optional[Dict[str, float]]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {"count": len(ordered), "p50": pick(0.5), "p95": pick(0.95), "p99": pick(0.99), "max": ordered[-1]}
+
+
+class StageRecorder:
+    """Latency samples and counters for one concurrency stage"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.turns = defaultdict(int)
+        self.errors = defaultdict(int)
+        self.connect_failures = 0
+
+    def record(self, metric: str, value: float):
+        self.latencies[metric].append(value)
+
+
+async def run_turn(ws, args, rng, recorder: StageRecorder, kind: str, session: Dict[str, Any], audio: bytes):
+    request_id = str(uuid.uuid4())
+    base = {"user_id": session["user_id"], "request_id": request_id}
+    if session.get("session_id"):
+        base["session_id"] = session["session_id"]
+
+    if kind == "voice" and not args.audio:
+        audio = rng.randbytes(len(audio))
+
+    start = time.perf_counter()
+    if kind == "text":
+        await ws.send(json.dumps({**base, "type": "text", "payload": rng.choice(TEXT_PROMPTS)}))
+    elif args.voice_mode == "streamed":
+        await ws.send(json.dumps({
+            **base, "type": "voice_start", "format": args.audio_format,
+            "audio_transport": args.audio_transport,
+        }))
+        for i in range(0, len(audio), args.frame_bytes):
+            await ws.send(audio[i:i + args.frame_bytes])
+        await ws.send(json.dumps({"type": "voice_end"}))
+    else:
+        await ws.send(json.dumps({
+            **base, "type": "voice", "format": args.audio_format,
+            "audio_transport": args.audio_transport,
+            "payload": base64.b64encode(audio).decode(),
+        }))
+
+    seen = set()
+    deadline = start + args.turn_timeout
+    while True:
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            recorder.errors[f"{kind}_timeout"] += 1
+            return
+        message = await asyncio.wait_for(ws.recv(), remaining)
+        now = time.perf_counter() - start
+
+        if isinstance(message, bytes):
+            # Binary tts_audio_chunk frame (only the current turn sends them)
+            if "first_audio" not in seen:
+                seen.add("first_audio")
+                recorder.record(f"{kind}_first_audio", now)
+            continue
+
+        event = json.loads(message)
+        event_type = event.get("type")
+        if event_type == "title":
+            session["session_id"] = event.get("session_id")
+            continue
+        if event.get("request_id") not in (None, request_id):
+            continue
+
+        if event_type == "agent_text" and "first_text" not in seen:
+            seen.add("first_text")
+            recorder.record(f"{kind}_first_text", now)
+        elif event_type == "stt_output":
+            recorder.record("voice_stt", now)
+        elif event_type == "tts_audio" and "first_audio" not in seen:
+            seen.add("first_audio")
+            recorder.record(f"{kind}_first_audio", now)
+        elif event_type == "complete":
+            recorder.record(f"{kind}_complete", now)
+            recorder.turns[kind] += 1
+            return
+        elif event_type in ("error", "cancelled"):
+            recorder.errors[f"{kind}_{event.get('code') or event_type}"] += 1
+            return
+
+
+async def virtual_user(index: int, args, recorder: StageRecorder, stop_at: float, audio: bytes):
+    rng = random.Random(args.seed + index)
+    # Stagger connects so the ramp itself is not a thundering herd
+    await asyncio.sleep(rng.uniform(0, args.ramp))
+    session: Dict[str, Any] = {"user_id": f"load-{index}"}
+    try:
+        async with websockets.connect(args.url, max_size=None, open_timeout=args.turn_timeout) as ws:
+            while time.perf_counter() < stop_at:
+                kind = "voice" if rng.random() < args.voice_ratio else "text"
+                try:
+                    await run_turn(ws, args, rng, recorder, kind, session, audio)
+                except asyncio.TimeoutError:
+                    recorder.errors[f"{kind}_timeout"] += 1
+                    return
+                await asyncio.sleep(rng.expovariate(1 / args.think_time) if args.think_time else 0)
+    except (OSError, asyncio.TimeoutError, websockets.exceptions.InvalidHandshake):
+        recorder.connect_failures += 1
+    except websockets.exceptions.ConnectionClosed:
+        recorder.errors["connection_closed"] += 1
+
+
+async def sample_client_lag(samples: List[float], stop: asyncio.Event, interval: float = 0.05):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(time.perf_counter() - start - interval)
+
+
+def fetch_server_lag(http_base: str) -> Optional[Dict[str, Any]]:
+    try:
+        with urllib.request.urlopen(f"{http_base}/bench/loop_lag", timeout=5) as response:
+            return json.loads(response.read())
+    except Exception:
+        return None
+
+
+async def run_stage(args, concurrency: int, audio: bytes, http_base: str) -> Dict[str, Any]:
+    recorder = StageRecorder()
+    await asyncio.to_thread(fetch_server_lag, http_base)  # reset the server window
+
+    client_lag: List[float] = []
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(sample_client_lag(client_lag, stop))
+
+    started = time.perf_counter()
+    stop_at = started + args.ramp + args.duration
+    await asyncio.gather(*(
+        virtual_user(i, args, recorder, stop_at, audio) for i in range(concurrency)
+    ))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await lag_task
+
+    turns = sum(recorder.turns.values())
+    failures = sum(recorder.errors.values()) + recorder.connect_failures
+    return {
+        "concurrency": concurrency,
+        "elapsed": elapsed,
+        "turns": dict(recorder.turns),
+        "throughput_turns_per_second": turns / elapsed if elapsed else 0.0,
+        "errors": dict(recorder.errors),
+        "connect_failures": recorder.connect_failures,
+        "error_rate": failures / (turns + failures) if turns + failures else 0.0,
+        "latency": {metric: percentiles(values) for metric, values in sorted(recorder.latencies.items())},
+        "server_loop_lag": await asyncio.to_thread(fetch_server_lag, http_base),
+        "client_loop_lag": percentiles(client_lag),
+    }
+
+
+def saturation_reasons(stage: Dict[str, Any], args) -> List[str]:
+    """SLOs this stage broke; empty when the worker kept up"""
+    reasons = []
+    if stage["error_rate"] > args.max_error_rate:
+        reasons.append(f"error rate {stage['error_rate']:.3f}")
+    slos = {"text_first_text": args.slo_text_first_text, "voice_first_audio": args.slo_voice_first_audio}
+    for metric, limit in slos.items():
+        summary = stage["latency"].get(metric)
+        if summary and summary["p95"] > limit:
+            reasons.append(f"{metric} p95 {summary['p95']:.3f}s > {limit}s")
+    lag = stage.get("server_loop_lag") or {}
+    if lag.get("p99") is not None and lag["p99"] > args.max_loop_lag:
+        reasons.append(f"server loop lag p99 {lag['p99']:.3f}s")
+    return reasons
+
+
+def spawn_server(args) -> subprocess.Popen:
+    port = args.url.rsplit(":", 1)[1].split("/", 1)[0]
+    process = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.fake_app", "--port", port],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    http_base = args.url.replace("ws://", "http://").rsplit("/ws", 1)[0]
+    for _ in range(100):
+        if process.poll() is not None:
+            raise RuntimeError(
+                f"fake app exited with code {process.returncode}; "
+                "run `python -m benchmarks.fake_app` to see why"
+            )
+        try:
+            urllib.request.urlopen(f"{http_base}/health", timeout=1)
+            return process
+        except Exception:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("fake app did not become healthy")
+
+
+async def main_async(args) -> Dict[str, Any]:
+    audio = b""
+    if args.audio:
+        with open(args.audio, "rb") as f:
+            audio = f.read()
+    else:
+        audio = bytes(args.synthetic_audio_bytes)
+
+    http_base = args.url.replace("ws://", "http://").rsplit("/ws", 1)[0]
+    stages = []
+    capacity = None
+    saturated_at = None
+    for concurrency in (int(c) for c in args.stages.split(",")):
+        stage = await run_stage(args, concurrency, audio, http_base)
+        stage["saturated"] = saturation_reasons(stage, args)
+        stages.append(stage)
+        print(
+            f"{concurrency:>6} conns: {stage['throughput_turns_per_second']:.1f} turns/s, "
+            f"error rate {stage['error_rate']:.3f}, "
+            f"{'SATURATED: ' + '; '.join(stage['saturated']) if stage['saturated'] else 'ok'}",
+            file=sys.stderr,
+        )
+        if stage["saturated"]:
+            saturated_at = concurrency
+            break
+        capacity = concurrency
+
+    return {
+        "url": args.url,
+        "config": {k: v for k, v in vars(args).items() if k not in ("output",)},
+        "capacity_connections_per_worker": capacity,
+        "saturated_at": saturated_at,
+        "stages": stages,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the /ws endpoint")
+    parser.add_argument("--url", default="ws://127.0.0.1:8765/ws")
+    parser.add_argument("--spawn-server", action="store_true", help="start benchmarks.fake_app first")
+    parser.add_argument("--stages", default="50,100,200,500,1000,2000", help="concurrent connections per stage")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds per stage after ramp-up")
+    parser.add_argument("--ramp", type=float, default=5.0, help="seconds over which connections open")
+    parser.add_argument("--voice-ratio", type=float, default=0.3)
+    parser.add_argument("--voice-mode", choices=["streamed", "base64"], default="streamed")
+    parser.add_argument("--audio", help="recorded audio file replayed for voice turns")
+    parser.add_argument("--audio-format", default="webm")
+    parser.add_argument("--audio-transport", choices=["json", "binary"], default="binary")
+    parser.add_argument("--synthetic-audio-bytes", type=int, default=32_000)
+    parser.add_argument("--frame-bytes", type=int, default=8192)
+    parser.add_argument("--think-time", type=float, default=2.0, help="mean seconds between turns")
+    parser.add_argument("--turn-timeout", type=float, default=30.0)
+    parser.add_argument("--slo-text-first-text", type=float, default=1.5)
+    parser.add_argument("--slo-voice-first-audio", type=float, default=3.0)
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--max-loop-lag", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report here (default: stdout)")
+    args = parser.parse_args()
+
+    server = spawn_server(args) if args.spawn_server else None
+    try:
+        report = asyncio.run(main_async(args))
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
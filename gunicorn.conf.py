@@ -0,0 +1,39 @@
+"""
+Production launcher: N uvicorn workers behind one gunicorn master
+
+    gunicorn -c gunicorn.conf.py main:app
+
+The app is imported once in the master (preload_app) together with its
+heavy dependencies, then forked, so workers share those pages and boot in
+a fraction of the time. Services (Mongo/OpenAI clients, process pools,
+caches) are only built inside each worker's lifespan; nothing that owns a
+socket, thread or event loop is created before the fork.
+
+Each worker answers /health with 503 until its own warm-up finishes, so
+a load balancer keeps cold workers out of rotation. Metrics are per
+worker; scrape each one or aggregate by pid.
+"""
+import os
+import multiprocessing
+
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+
+# Websocket turns and the post-turn queue drain within this window on restart
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+keepalive = 5
+
+accesslog = "-"
+errorlog = "-"
+
+
+def on_starting(server):
+    # Imported before the fork so every worker shares them copy-on-write
+    from app.services.Chat.services import preload_modules
+
+    timings = preload_modules()
+    server.log.info(f"Preloaded {len(timings)} modules in {sum(timings.values()):.2f}s")
@@ -1,10 +1,25 @@
 import uvicorn
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from app.services.Chat.Chat_router import router as chatRouter
+from app.services.Chat.Chat_router import router as chatRouter, services
+from app.core.config import Settings
+from app.core.admission import AdmissionRejected
+from app.core.metrics import metrics, loop_lag_monitor
 
 
-app = FastAPI(title="Firecomm AI API", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Build and warm services per worker; drain background work on shutdown"""
+    loop_lag_monitor.start()
+    await services.startup()
+    yield
+    await services.shutdown()
+    await loop_lag_monitor.stop()
+
+
+app = FastAPI(title="Firecomm AI API", version="1.0.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -18,6 +33,16 @@ app.add_middleware(
 app.include_router(chatRouter ,tags=['Chat'])
 
 
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(request: Request, exc: AdmissionRejected):
+    """Shed load fast with a retry hint instead of waiting on a saturated upstream"""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc), "retry_after": exc.retry_after},
+        headers={"Retry-After": str(max(1, round(exc.retry_after)))},
+    )
+
+
 @app.get("/",tags = ["health"])
 async def root():
     return """
@@ -26,20 +51,34 @@ async def root():
         "version": "1.0.0"
 """
 
+@app.get("/metrics", tags=["Health"], response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Per-stage latency histograms and counters in Prometheus text format"""
+    return PlainTextResponse(
+        metrics.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
 @app.get("/health", tags=["Health"])
 async def health_check():
-    """Health check endpoint for Docker/monitoring"""
-    return {
-        "status": "healthy",
-        "service": "firecomme AI"
-    }
+    """Readiness probe: 200 once pools and caches are warm, 503 until then"""
+    report = {**services.readiness.report(), "service": "firecomme AI"}
+    return JSONResponse(status_code=200 if services.readiness.is_ready else 503, content=report)
+
+
+@app.get("/health/live", tags=["Health"])
+async def liveness_check():
+    """Liveness probe: the worker's event loop is serving requests"""
+    return {"status": "alive", "loop_lag": loop_lag_monitor.last_lag}
 
 
 
 if __name__ == "__main__":
+    # Development server; production runs `gunicorn -c gunicorn.conf.py main:app`
     uvicorn.run(
         "main:app", 
-        host="0.0.0.0", 
-        port=8000, 
-        reload=True
+        host=Settings.HOST, 
+        port=Settings.PORT, 
+        reload=Settings.APP_RELOAD
     )
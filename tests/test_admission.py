@@ -0,0 +1,174 @@
+import asyncio
+import pytest
+from app.core.admission import AdmissionRejected, Priority, TokenBucket, UpstreamGate
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+async def hold(gate, priority, order, name, release):
+    async with gate.slot(priority, deadline=5.0):
+        order.append(name)
+        await release.wait()
+
+
+def test_waiters_are_served_by_priority_then_arrival():
+    async def run():
+        gate = UpstreamGate("test", max_concurrency=1)
+        order = []
+        release = asyncio.Event()
+        tasks = [asyncio.create_task(hold(gate, Priority.TEXT, order, "first", release))]
+        await settle()
+        for priority, name in [
+            (Priority.BACKGROUND, "background"),
+            (Priority.TEXT, "text1"),
+            (Priority.VOICE, "voice"),
+            (Priority.TEXT, "text2"),
+        ]:
+            tasks.append(asyncio.create_task(hold(gate, priority, order, name, release)))
+        await settle()
+        assert gate.queue_depth == 4
+
+        release.set()
+        await asyncio.gather(*tasks)
+        assert order == ["first", "voice", "text1", "text2", "background"]
+        assert gate.in_flight == 0 and gate.queue_depth == 0
+
+    asyncio.run(run())
+
+
+def test_token_bucket_allows_burst_then_paces():
+    bucket = TokenBucket(rate=10, burst=2)
+    assert bucket.try_take() == 0
+    assert bucket.try_take() == 0
+    assert bucket.try_take() == pytest.approx(0.1, abs=0.01)
+    assert bucket.wait_time(2) == pytest.approx(0.2, abs=0.01)
+
+
+def test_token_bucket_rate_zero_is_unlimited():
+    bucket = TokenBucket(rate=0, burst=1)
+    assert all(bucket.try_take() == 0 for _ in range(100))
+
+
+def test_rate_limited_waiter_is_dispatched_when_a_token_accrues():
+    async def run():
+        gate = UpstreamGate("test", max_concurrency=5, rate=50, burst=1)
+        await gate.acquire(Priority.TEXT, deadline=1.0)
+        wait_time = await gate.acquire(Priority.TEXT, deadline=1.0)
+        assert 0.01 < wait_time < 0.2
+        assert gate.in_flight == 2
+
+    asyncio.run(run())
+
+
+def test_full_queue_sheds_the_newest_lower_priority_waiter():
+    async def run():
+        gate = UpstreamGate("test", max_concurrency=1, max_queue=2)
+        await gate.acquire(Priority.TEXT, deadline=5.0)
+        old = asyncio.create_task(gate.acquire(Priority.BACKGROUND, deadline=5.0))
+        new = asyncio.create_task(gate.acquire(Priority.BACKGROUND, deadline=5.0))
+        await settle()
+
+        voice = asyncio.create_task(gate.acquire(Priority.VOICE, deadline=5.0))
+        await settle()
+        with pytest.raises(AdmissionRejected) as rejected:
+            await new
+        assert rejected.value.reason == "shed"
+        assert not old.done()
+
+        gate.release(0.1)
+        await voice
+        assert not old.done()
+        assert gate.rejected["shed"] == 1
+
+        gate.release(0.1)
+        await old
+        assert gate.in_flight == 1
+
+    asyncio.run(run())
+
+
+def test_full_queue_rejects_when_nothing_lower_can_be_shed():
+    async def run():
+        gate = UpstreamGate("test", max_concurrency=1, max_queue=1)
+        await gate.acquire(Priority.TEXT, deadline=5.0)
+        queued = asyncio.create_task(gate.acquire(Priority.VOICE, deadline=5.0))
+        await settle()
+
+        with pytest.raises(AdmissionRejected) as rejected:
+            await gate.acquire(Priority.TEXT, deadline=5.0)
+        assert rejected.value.reason == "queue_full"
+        assert rejected.value.retry_after > 0
+        queued.cancel()
+
+    asyncio.run(run())
+
+
+def test_rejects_when_the_estimated_wait_exceeds_the_deadline():
+    async def run():
+        gate = UpstreamGate("test", max_concurrency=1)
+        gate.avg_hold_time = 2.0
+        await gate.acquire(Priority.TEXT, deadline=5.0)
+
+        with pytest.raises(AdmissionRejected) as rejected:
+            await gate.acquire(Priority.VOICE, deadline=1.0)
+        assert rejected.value.reason == "deadline"
+        assert gate.queue_depth == 0
+
+    asyncio.run(run())
+
+
+def test_queued_request_times_out_at_its_deadline():
+    async def run():
+        gate = UpstreamGate("test", max_concurrency=1)
+        await gate.acquire(Priority.TEXT, deadline=5.0)
+
+        with pytest.raises(AdmissionRejected) as rejected:
+            await gate.acquire(Priority.TEXT, deadline=0.02)
+        assert rejected.value.reason == "timeout"
+        assert gate.queue_depth == 0
+
+        # The expired waiter must not take the freed slot
+        gate.release(0.1)
+        assert gate.in_flight == 0
+
+    asyncio.run(run())
+
+
+def test_cancelled_shed_waiter_does_not_release_a_slot():
+    async def run():
+        gate = UpstreamGate("test", max_concurrency=1, max_queue=1)
+        await gate.acquire(Priority.TEXT, deadline=5.0)
+        background = asyncio.create_task(gate.acquire(Priority.BACKGROUND, deadline=5.0))
+        await settle()
+
+        voice = asyncio.create_task(gate.acquire(Priority.VOICE, deadline=5.0))
+        # Shed by the voice request, then cancelled before it sees the rejection
+        asyncio.get_running_loop().call_soon(background.cancel)
+        await asyncio.gather(background, return_exceptions=True)
+
+        assert gate.in_flight == 1
+        gate.release(0.1)
+        await voice
+        assert gate.in_flight == 1
+
+    asyncio.run(run())
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def run():
+        gate = UpstreamGate("test", max_concurrency=1)
+        await gate.acquire(Priority.TEXT, deadline=5.0)
+        waiter = asyncio.create_task(gate.acquire(Priority.TEXT, deadline=5.0))
+        await settle()
+
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert gate.queue_depth == 0
+
+        gate.release(0.1)
+        assert gate.in_flight == 0
+
+    asyncio.run(run())
@@ -0,0 +1,33 @@
+from app.DB.VectorDB.bm25 import BM25Index
+
+
+def build_index(max_df_ratio=0.3, min_df_cutoff_docs=10):
+    index = BM25Index(max_df_ratio=max_df_ratio, min_df_cutoff_docs=min_df_cutoff_docs)
+    ids = [f"doc{i}" for i in range(20)]
+    texts = [f"fire alarm panel manual section {i}" for i in range(20)]
+    texts[3] += " model FX-2000 reset procedure"
+    index.add(ids, texts, [{"product": "fx" if i == 3 else "other"} for i in range(20)])
+    return index
+
+
+def test_stopwords_are_not_indexed():
+    index = build_index()
+    assert index.search("the of and", 5) == []
+
+
+def test_high_document_frequency_terms_are_skipped():
+    index = build_index()
+    # "fire" and "alarm" are in every chunk; only "reset" ranks anything
+    assert [doc_id for doc_id, _ in index.search("fire alarm reset", 5)] == ["doc3"]
+    assert index.search("fire alarm", 5) == []
+
+
+def test_small_corpus_scores_every_term():
+    index = build_index(min_df_cutoff_docs=100)
+    assert len(index.search("fire alarm", 5)) == 5
+
+
+def test_where_filter():
+    index = build_index()
+    assert index.search("fx 2000", 5, where={"product": "other"}) == []
+    assert index.search("fx 2000", 5, where={"product": "fx"})[0][0] == "doc3"
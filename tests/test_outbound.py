@@ -0,0 +1,284 @@
+import asyncio
+from app.services.Chat.outbound import OutboundSender
+from app.core.metrics import current_trace, record_span, start_trace
+from app.services.Chat.turns import TurnContext, TurnManager
+from app.module.voicePipeline.tts_scheduler import OrderedTTSScheduler
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+        self.closed_with = None
+        self.unblock = asyncio.Event()
+        self.unblock.set()
+
+    async def send_json(self, event):
+        await self.unblock.wait()
+        self.sent.append(event)
+
+    async def send_bytes(self, data):
+        await self.unblock.wait()
+        self.sent.append(data)
+
+    async def close(self, code=1000):
+        self.closed_with = code
+
+
+def test_purge_drops_only_the_cancelled_request():
+    async def run():
+        websocket = FakeWebSocket()
+        sender = OutboundSender(websocket, coalesce_window=0)
+        websocket.unblock.clear()
+        await sender.send_json({"type": "status", "request_id": "other"})
+        await sender.send_json({"type": "agent_text", "text": "old", "request_id": "a"})
+        await sender.send_bytes(b"audio", request_id="a")
+        await sender.send_json({"type": "agent_text", "text": "new", "request_id": "b"})
+        await asyncio.sleep(0)
+
+        assert sender.purge("a") == 2
+        websocket.unblock.set()
+        await sender.close()
+
+        assert websocket.sent == [
+            {"type": "status", "request_id": "other"},
+            {"type": "agent_text", "text": "new", "request_id": "b"},
+        ]
+
+    asyncio.run(run())
+
+
+def test_cancelled_turn_frames_do_not_follow_the_cancelled_event():
+    async def run():
+        websocket = FakeWebSocket()
+        sender = OutboundSender(websocket, coalesce_window=0)
+        turns = TurnManager()
+        turn = TurnContext(sender, "r1")
+        websocket.unblock.clear()
+
+        async def work():
+            await turn.send_json({"type": "agent_text", "text": "first"})
+            await turn.send_bytes(b"frame")
+            await turn.send_json({"type": "agent_text", "text": "second"})
+            await asyncio.Event().wait()
+
+        await turns.start(turn, work())
+        await asyncio.sleep(0.01)
+        saved = await turns.cancel(reason="barge_in")
+        websocket.unblock.set()
+        await sender.close()
+
+        # "first" was already with the socket when the turn was cancelled
+        assert saved["frames_dropped"] == 2
+        assert [frame.get("type") for frame in websocket.sent] == ["agent_text", "cancelled"]
+        assert websocket.sent[0]["text"] == "first"
+
+    asyncio.run(run())
+
+
+def test_new_turn_cancels_the_running_one_and_its_later_frames():
+    async def run():
+        websocket = FakeWebSocket()
+        sender = OutboundSender(websocket, coalesce_window=0)
+        turns = TurnManager()
+        old = TurnContext(sender, "old")
+        schedulers = []
+
+        async def synthesize(text):
+            await asyncio.sleep(0.001)
+            return b"old-audio"
+
+        async def old_turn():
+            # Streams TTS audio until it is cancelled, like a long voice reply
+            output = asyncio.Queue()
+            scheduler = OrderedTTSScheduler(synthesize, output)
+            schedulers.append(scheduler)
+            try:
+                await old.send_json({"type": "agent_text", "text": "old"})
+                for i in range(1000):
+                    scheduler.submit(str(i))
+                while True:
+                    await old.send_bytes((await output.get())["audio"])
+            finally:
+                scheduler.cancel()
+
+        async def new_turn(turn):
+            await turn.send_json({"type": "agent_text", "text": "new"})
+            await turn.send_json({"type": "complete"})
+
+        await turns.start(old, old_turn())
+        await asyncio.sleep(0.05)
+        # The user barges in, then the new turn starts
+        await turns.cancel(reason="barge_in")
+        new = TurnContext(sender, "new")
+        await turns.start(new, new_turn(new))
+        await asyncio.sleep(0.05)
+        await sender.close()
+
+        cancelled = [
+            i for i, frame in enumerate(websocket.sent)
+            if isinstance(frame, dict) and frame["type"] == "cancelled"
+        ]
+        assert len(cancelled) == 1
+        assert websocket.sent[cancelled[0]]["request_id"] == "old"
+        assert websocket.sent[cancelled[0]]["reason"] == "barge_in"
+        assert b"old-audio" in websocket.sent[:cancelled[0]]
+        assert websocket.sent[cancelled[0] + 1:] == [
+            {"type": "agent_text", "text": "new", "request_id": "new"},
+            {"type": "complete", "request_id": "new"},
+        ]
+        assert turns.cancelled_turns == 1
+        # The old turn's TTS emitter does not outlive the cancellation
+        assert schedulers[0]._emitter.done()
+
+    asyncio.run(run())
+
+
+def test_starting_a_turn_supersedes_the_running_one():
+    async def run():
+        websocket = FakeWebSocket()
+        sender = OutboundSender(websocket, coalesce_window=0)
+        turns = TurnManager()
+
+        async def endless(turn):
+            while True:
+                await turn.send_json({"type": "agent_text", "text": "old"})
+                await asyncio.sleep(0.001)
+
+        async def reply(turn):
+            await turn.send_json({"type": "complete"})
+
+        first = TurnContext(sender, "first")
+        await turns.start(first, endless(first))
+        await asyncio.sleep(0.02)
+        second = TurnContext(sender, "second")
+        await turns.start(second, reply(second))
+        await asyncio.sleep(0.02)
+        await sender.close()
+
+        types = [(frame["type"], frame["request_id"]) for frame in websocket.sent]
+        index = types.index(("cancelled", "first"))
+        assert websocket.sent[index]["reason"] == "superseded"
+        assert types[index + 1:] == [("complete", "second")]
+
+    asyncio.run(run())
+
+
+def test_trace_follows_the_turn_task_not_the_receive_loop():
+    async def run():
+        sender = OutboundSender(FakeWebSocket(), coalesce_window=0)
+        turns = TurnManager()
+        seen = []
+
+        async def work():
+            seen.append(current_trace())
+            record_span("turn.work", 0.0)
+
+        trace = start_trace("text", "r1")
+        record_span("ws.decode", 0.0)
+        await turns.start(TurnContext(sender, "r1", trace), work())
+        assert current_trace() is None
+        await asyncio.sleep(0.01)
+        await sender.close()
+
+        assert seen == [trace]
+        assert trace.duration is not None
+        assert [name for name, *_ in trace.spans] == ["ws.decode", "turn.work"]
+
+        # The next turn's trace is not stuck behind the finished one
+        second = start_trace("text", "r2")
+        record_span("ws.decode", 0.0)
+        assert [name for name, *_ in second.spans] == ["ws.decode"]
+
+    asyncio.run(run())
+
+
+def text(chunk, request_id="r"):
+    return {"type": "agent_text", "text": chunk, "request_id": request_id}
+
+
+def test_first_delta_is_sent_alone_and_the_rest_coalesce():
+    async def run():
+        websocket = FakeWebSocket()
+        sender = OutboundSender(websocket, coalesce_window=0.05)
+        for chunk in ("He", "llo", " wor", "ld"):
+            await sender.send_json(text(chunk))
+        await sender.send_json({"type": "complete", "request_id": "r"})
+        await sender.close()
+
+        assert [frame.get("text") for frame in websocket.sent] == ["He", "llo world", None]
+        assert sender.text_deltas_coalesced == 2
+
+    asyncio.run(run())
+
+
+def test_coalescing_keeps_order_across_requests_and_binary_frames():
+    async def run():
+        websocket = FakeWebSocket()
+        sender = OutboundSender(websocket, coalesce_window=0.05)
+        websocket.unblock.clear()
+        await sender.send_json(text("a1"))
+        await sender.send_json(text("a2"))
+        await sender.send_bytes(b"audio", request_id="r")
+        await sender.send_json(text("a3"))
+        await sender.send_json(text("b1", "other"))
+        await sender.send_json(text("a4"))
+        websocket.unblock.set()
+        await sender.close()
+
+        assert websocket.sent == [
+            text("a1"), text("a2"), b"audio", text("a3"), text("b1", "other"), text("a4")
+        ]
+
+    asyncio.run(run())
+
+
+def test_coalesced_frame_is_capped_by_max_chars():
+    async def run():
+        websocket = FakeWebSocket()
+        sender = OutboundSender(websocket, coalesce_window=0.05, coalesce_max_chars=4)
+        websocket.unblock.clear()
+        for chunk in ("x", "ab", "cd", "ef", "gh"):
+            await sender.send_json(text(chunk))
+        websocket.unblock.set()
+        await sender.close()
+
+        assert [frame["text"] for frame in websocket.sent] == ["x", "abcd", "efgh"]
+
+    asyncio.run(run())
+
+
+def test_full_queue_disconnects_a_slow_client():
+    async def run():
+        websocket = FakeWebSocket()
+        websocket.unblock.clear()
+        sender = OutboundSender(websocket, max_queue=2, send_timeout=0.05)
+        raised = None
+        try:
+            for i in range(10):
+                await sender.send_bytes(b"x", request_id=str(i))
+        except ConnectionError as e:
+            raised = e
+
+        assert raised is not None
+        assert websocket.closed_with == 1013
+        assert sender.closed and sender.slow_client_disconnects == 1
+        # Bounded: the writer holds one frame, the queue at most max_queue
+        assert sender.events_enqueued == 3
+        await sender.close()
+
+    asyncio.run(run())
+
+
+def test_blocked_write_disconnects_a_slow_client():
+    async def run():
+        websocket = FakeWebSocket()
+        websocket.unblock.clear()
+        sender = OutboundSender(websocket, send_timeout=0.05)
+        await sender.send_json({"type": "status"})
+        await asyncio.sleep(0.1)
+
+        assert websocket.closed_with == 1013
+        assert sender.closed
+        await sender.close()
+
+    asyncio.run(run())
@@ -0,0 +1,162 @@
+import asyncio
+from app.services.Chat.Chat import generate_session_titles
+from app.services.Chat.post_turn import PostTurnJob, PostTurnQueue
+
+
+class FakeSessions:
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.calls = 0
+        self.created = {}
+
+    async def create_session(self, user_id, session_id, title, Type):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise ConnectionError("mongo down")
+        self.created[session_id] = title
+        return {"session_id": session_id, "title": title}
+
+
+def job(events, session_id, first_message):
+    async def send(event):
+        events.append(event)
+
+    return PostTurnJob(send=send, user_id="u", session_id=session_id, first_message=first_message)
+
+
+def test_concurrent_jobs_share_one_batch_call_and_dedupe_messages():
+    async def run():
+        batches = []
+
+        async def batch_titles(messages):
+            batches.append(messages)
+            return [f"T:{message}" for message in messages]
+
+        sessions = FakeSessions()
+        queue = PostTurnQueue(sessions, batch_title_generator=batch_titles, workers=1, backoff_base=0)
+        events = []
+        queue.submit(job(events, "s1", "Hello there"))
+        queue.submit(job(events, "s2", "hello   THERE"))
+        queue.submit(job(events, "s3", "Fire alarm beeps"))
+        await queue.drain()
+
+        assert batches == [["Hello there", "Fire alarm beeps"]]
+        assert sessions.created == {
+            "s1": "T:Hello there",
+            "s2": "T:Hello there",
+            "s3": "T:Fire alarm beeps",
+        }
+        assert sorted(event["session_id"] for event in events if event["type"] == "title") == ["s1", "s2", "s3"]
+        assert queue.titles_deduplicated == 1
+
+    asyncio.run(run())
+
+
+def test_title_and_persistence_are_retried():
+    async def run():
+        attempts = 0
+
+        async def title(message):
+            nonlocal attempts
+            attempts += 1
+            if attempts == 1:
+                raise TimeoutError("llm timeout")
+            return "Retried title"
+
+        sessions = FakeSessions(failures=2)
+        queue = PostTurnQueue(sessions, title_generator=title, backoff_base=0)
+        events = []
+        queue.submit(job(events, "s1", "Why does my alarm chirp"))
+        await queue.drain()
+
+        assert attempts == 2
+        assert sessions.calls == 3
+        assert sessions.created == {"s1": "Retried title"}
+        assert events == [{"type": "title", "title": "Retried title", "session_id": "s1"}]
+        assert queue.persist_failures == 0
+
+    asyncio.run(run())
+
+
+def test_malformed_batch_falls_back_to_per_session_titles():
+    async def run():
+        async def batch_titles(messages):
+            return [1, 2]
+
+        async def title(message):
+            return f"One:{message}"
+
+        sessions = FakeSessions()
+        queue = PostTurnQueue(
+            sessions, title_generator=title, batch_title_generator=batch_titles, workers=1, backoff_base=0
+        )
+        events = []
+        queue.submit(job(events, "s1", "first question"))
+        queue.submit(job(events, "s2", "second question"))
+        await queue.drain()
+
+        assert sessions.created == {"s1": "One:first question", "s2": "One:second question"}
+        assert queue.title_fallbacks == 0
+
+    asyncio.run(run())
+
+
+def test_failures_fall_back_to_heuristic_title_and_report_persist_error():
+    async def run():
+        async def title(message):
+            raise ConnectionError("llm down")
+
+        sessions = FakeSessions(failures=10)
+        queue = PostTurnQueue(sessions, title_generator=title, max_retries=2, backoff_base=0)
+        events = []
+        queue.submit(job(events, "s1", "my smoke detector keeps beeping at night"))
+        await queue.drain()
+
+        assert events[0] == {"type": "title", "title": "My smoke detector keeps beeping at...", "session_id": "s1"}
+        assert events[1]["type"] == "error"
+        assert queue.title_fallbacks == 1
+        assert queue.persist_failures == 1
+        assert queue.completed == 1
+
+    asyncio.run(run())
+
+
+def test_full_queue_completes_with_heuristic_title():
+    async def run():
+        async def title(message):
+            raise AssertionError("saturated jobs must not call the LLM")
+
+        sessions = FakeSessions()
+        queue = PostTurnQueue(sessions, title_generator=title, max_size=1, workers=0, backoff_base=0)
+        events = []
+        queue.queue.put_nowait(job([], "queued", "already waiting"))
+        queue.submit(job(events, "s1", "second message"))
+        await asyncio.sleep(0.01)
+
+        assert queue.saturated == 1
+        assert sessions.created == {"s1": "Second message"}
+        assert events == [{"type": "title", "title": "Second message", "session_id": "s1"}]
+
+    asyncio.run(run())
+
+
+class FakeLLM:
+    def __init__(self, replies):
+        self.replies = list(replies)
+
+    async def ainvoke(self, messages):
+        class Response:
+            content = self.replies.pop(0)
+        return Response()
+
+
+def test_generate_session_titles_validates_the_reply():
+    async def run():
+        llm = FakeLLM(['```json\n["Alarm chirping", "Battery swap"]\n```'])
+        assert await generate_session_titles(llm, ["a", "b"]) == ["Alarm chirping", "Battery swap"]
+
+        # Not a list of strings: each session is titled on its own
+        llm = FakeLLM(['{"titles": 2}', "First", "Second"])
+        assert await generate_session_titles(llm, ["a", "b"]) == ["First", "Second"]
+
+    asyncio.run(run())
@@ -0,0 +1,114 @@
+import pytest
+from app.module.voicePipeline.segmenter import SentenceSegmenter
+
+
+def make_segmenter(max_words=40, comma_min_words=40):
+    # Same limits for the first segment so only the sentence rules apply
+    return SentenceSegmenter(
+        max_words=max_words,
+        comma_min_words=comma_min_words,
+        first_max_words=max_words,
+        first_comma_min_words=comma_min_words,
+    )
+
+
+def segment(chunks, **limits):
+    segmenter = make_segmenter(**limits)
+    segments = []
+    for chunk in chunks:
+        segments.extend(segmenter.feed(chunk))
+    remainder = segmenter.flush()
+    if remainder:
+        segments.append(remainder)
+    return segments
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Call Dr. Smith today. He is in.", ["Call Dr. Smith today.", "He is in."]),
+    ("Use e.g. a dry cloth. Then stop.", ["Use e.g. a dry cloth.", "Then stop."]),
+    ("Ask Mrs. Jones. She knows.", ["Ask Mrs. Jones.", "She knows."]),
+])
+def test_abbreviations_do_not_end_sentences(text, expected):
+    assert segment([text]) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Set it to 3.5 bar. Done.", ["Set it to 3.5 bar.", "Done."]),
+    ("It costs 1,000 dollars. Okay.", ["It costs 1,000 dollars.", "Okay."]),
+    ("The limit is 12. Stay below it.", ["The limit is 12.", "Stay below it."]),
+])
+def test_decimals(text, expected):
+    assert segment([text], comma_min_words=1) == expected
+
+
+def test_initials_do_not_end_sentences():
+    assert segment(["Ask J. R. Smith. He installed it."]) == [
+        "Ask J. R. Smith.",
+        "He installed it.",
+    ]
+
+
+def test_no_followed_by_number_is_an_abbreviation():
+    assert segment(["Replace valve No. 5 first. Then test."]) == [
+        "Replace valve No. 5 first.",
+        "Then test.",
+    ]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Is it armed? No. The panel is off.", ["Is it armed?", "No.", "The panel is off."]),
+    ("It was not me. It was I. Sorry.", ["It was not me.", "It was I.", "Sorry."]),
+])
+def test_no_and_i_end_sentences(text, expected):
+    assert segment([text]) == expected
+
+
+@pytest.mark.parametrize("chunks, expected", [
+    (["Set it to 3.", "5 bar. Done."], ["Set it to 3.5 bar.", "Done."]),
+    (["Use e.", "g. a cloth. End."], ["Use e.g. a cloth.", "End."]),
+    (["Valve No.", " 5 now. No.", " It is off."], ["Valve No. 5 now.", "No.", "It is off."]),
+    (["It was I.", " Then we left."], ["It was I.", "Then we left."]),
+    (["The ala", "rm is on. Leave", " now."], ["The alarm is on.", "Leave now."]),
+])
+def test_chunk_boundary_splits(chunks, expected):
+    assert segment(chunks) == expected
+
+
+@pytest.mark.parametrize("chunks, expected", [
+    (["Wait.", "..", " what happened?"], ["Wait...", "what happened?"]),
+    (["Really?", "!", " Yes."], ["Really?!", "Yes."]),
+    (["Wait", ".", ".", "."], ["Wait..."]),
+    (["Is it on?", "\"", " Yes."], ["Is it on?\"", "Yes."]),
+    (["Stop. ..", " Now."], ["Stop. ..", "Now."]),
+    (["Done. ", "..."], ["Done. ..."]),
+    (["Done.", " ", "..", " Next."], ["Done. ..", "Next."]),
+])
+def test_split_terminator_runs_stay_with_their_sentence(chunks, expected):
+    assert segment(chunks) == expected
+
+
+def test_character_stream_matches_whole_text():
+    text = (
+        "Call Dr. Smith at 3.5 p.m. about valve No. 7. No. It was I. "
+        "J. Smith said it costs 1,200 dollars, roughly. Is that right? Yes! "
+        "Wait... really?! \"Okay.\" Fine."
+    )
+    assert segment(list(text), comma_min_words=4) == segment([text], comma_min_words=4)
+
+
+def test_speculation_waits_for_a_complete_word():
+    segmenter = make_segmenter(max_words=10)
+    segmenter.feed("one two three four five The alar")
+    assert not segmenter.should_speculate()
+
+    segmenter.feed("m ")
+    assert segmenter.should_speculate()
+
+
+def test_speculation_on_trailing_comma():
+    segmenter = make_segmenter(max_words=40, comma_min_words=6)
+    segmenter.feed("First, turn it")
+    assert not segmenter.should_speculate()
+
+    segmenter.feed(" off,")
+    assert segmenter.should_speculate()
@@ -0,0 +1,131 @@
+import asyncio
+from app.core.singleflight import SingleFlight
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_concurrent_identical_calls_share_one_upstream_call():
+    async def run():
+        flight = SingleFlight("test")
+        calls = 0
+        release = asyncio.Event()
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return "audio"
+
+        waiters = [asyncio.create_task(flight.do("key", fetch)) for _ in range(5)]
+        await settle()
+        release.set()
+
+        assert await asyncio.gather(*waiters) == ["audio"] * 5
+        assert calls == 1
+        assert flight.stats()["upstream_calls"] == 1
+        assert flight.stats()["coalesced_calls"] == 4
+        assert not flight.in_flight("key")
+
+    asyncio.run(run())
+
+
+def test_different_keys_and_later_calls_are_not_merged():
+    async def run():
+        flight = SingleFlight("test")
+        calls = []
+
+        async def fetch(key):
+            calls.append(key)
+            await asyncio.sleep(0)
+            return key
+
+        assert await asyncio.gather(
+            flight.do("a", lambda: fetch("a")),
+            flight.do("b", lambda: fetch("b")),
+        ) == ["a", "b"]
+        # Nothing is cached once the call has finished
+        assert await flight.do("a", lambda: fetch("a")) == "a"
+        assert calls == ["a", "b", "a"]
+
+    asyncio.run(run())
+
+
+def test_exception_reaches_every_caller():
+    async def run():
+        flight = SingleFlight("test")
+
+        async def fail():
+            await asyncio.sleep(0)
+            raise RuntimeError("upstream error")
+
+        results = await asyncio.gather(
+            flight.do("key", fail),
+            flight.do("key", fail),
+            return_exceptions=True,
+        )
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert flight.stats()["upstream_calls"] == 1
+
+    asyncio.run(run())
+
+
+def test_cancelled_leader_hands_the_call_to_followers():
+    async def run():
+        flight = SingleFlight("test")
+        release = asyncio.Event()
+        upstream = []
+
+        async def fetch():
+            upstream.append(asyncio.current_task())
+            await release.wait()
+            return "text"
+
+        leader = asyncio.create_task(flight.do("key", fetch))
+        await settle()
+        follower = asyncio.create_task(flight.do("key", fetch))
+        await settle()
+
+        leader.cancel()
+        await asyncio.gather(leader, return_exceptions=True)
+        assert leader.cancelled()
+        assert not upstream[0].cancelled()
+
+        release.set()
+        assert await follower == "text"
+        assert len(upstream) == 1
+        assert flight.stats()["abandoned_calls"] == 0
+
+    asyncio.run(run())
+
+
+def test_call_is_cancelled_once_every_caller_gives_up():
+    async def run():
+        flight = SingleFlight("test")
+        upstream = []
+
+        async def fetch():
+            upstream.append(asyncio.current_task())
+            await asyncio.Event().wait()
+
+        callers = [asyncio.create_task(flight.do("key", fetch)) for _ in range(2)]
+        await settle()
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await settle()
+
+        assert upstream[0].cancelled()
+        assert not flight.in_flight("key")
+        assert flight.stats()["abandoned_calls"] == 1
+
+        # A later caller starts a fresh call
+        async def fresh():
+            return "again"
+
+        assert await flight.do("key", fresh) == "again"
+
+    asyncio.run(run())
+
@@ -0,0 +1,41 @@
+from app.module.voicePipeline.speculation import SpeculationBudget
+
+
+def make_budget(parent=None):
+    return SpeculationBudget(min_hit_rate=0.5, window=10, min_samples=4, probe_every=3, parent=parent)
+
+
+def test_allows_until_enough_samples_without_parent():
+    budget = make_budget()
+    for _ in range(3):
+        budget.record_miss(10)
+    assert budget.allow()
+
+
+def test_throttles_below_min_hit_rate_with_probes():
+    budget = make_budget()
+    for _ in range(4):
+        budget.record_miss(10)
+    assert [budget.allow() for _ in range(6)] == [False, False, True, False, False, True]
+    assert budget.throttled == 4
+
+
+def test_new_session_follows_parent_hit_rate():
+    process = make_budget()
+    for _ in range(4):
+        make_budget(parent=process).record_miss(10)
+
+    session = make_budget(parent=process)
+    assert not session.allow()
+    assert process.throttled == 1
+
+
+def test_session_uses_own_rate_once_it_has_samples():
+    process = make_budget()
+    for _ in range(4):
+        process.record_miss(10)
+
+    session = make_budget(parent=process)
+    for _ in range(4):
+        session.record_hit(10)
+    assert session.allow()
@@ -0,0 +1,69 @@
+import os
+import asyncio
+from app.module.text_to_speech.tts_cache import TTSCache
+
+
+def test_memory_tier_evicts_least_recently_used_over_the_byte_cap():
+    async def run():
+        cache = TTSCache(max_memory_bytes=10)
+        await cache.put("a", b"aaaa")
+        await cache.put("b", b"bbbb")
+        # Touch "a" so "b" becomes the oldest entry
+        assert await cache.get("a") == b"aaaa"
+        await cache.put("c", b"cccc")
+
+        assert await cache.get("b") is None
+        assert await cache.get("a") == b"aaaa"
+        assert await cache.get("c") == b"cccc"
+        stats = cache.stats()
+        assert stats["evictions"] == 1
+        assert stats["memory_bytes"] == 8
+        assert stats["memory_entries"] == 2
+
+    asyncio.run(run())
+
+
+def test_oversized_entries_are_not_cached():
+    async def run():
+        cache = TTSCache(max_entry_bytes=4)
+        await cache.put("big", b"12345")
+
+        assert await cache.get("big") is None
+        assert cache.stats()["memory_entries"] == 0
+
+    asyncio.run(run())
+
+
+def test_disk_hit_is_promoted_to_memory(tmp_path):
+    async def run():
+        disk_dir = str(tmp_path / "tts")
+        await TTSCache(disk_dir=disk_dir).put("k", b"audio")
+
+        # A fresh cache (another worker, or after a restart) shares the directory
+        cache = TTSCache(disk_dir=disk_dir)
+        assert await cache.get("k") == b"audio"
+        assert cache.disk_hits == 1
+
+        os.remove(cache._path("k"))
+        assert await cache.get("k") == b"audio"
+        assert cache.disk_hits == 1
+        assert cache.hits == 2
+
+    asyncio.run(run())
+
+
+def test_prune_disk_removes_least_recently_used_files(tmp_path):
+    async def run():
+        cache = TTSCache(disk_dir=str(tmp_path), max_disk_bytes=8)
+        for i, key in enumerate(("old", "mid", "new")):
+            await cache.put(key, b"1234")
+            os.utime(cache._path(key), (1000 + i, 1000 + i))
+
+        cache.prune_disk()
+
+        assert not os.path.exists(cache._path("old"))
+        assert os.path.exists(cache._path("mid"))
+        assert os.path.exists(cache._path("new"))
+        assert cache.disk_evictions == 1
+
+    asyncio.run(run())
@@ -0,0 +1,187 @@
+import asyncio
+from app.module.voicePipeline.tts_scheduler import OrderedTTSScheduler, is_end
+
+
+async def drain(queue):
+    events = []
+    while True:
+        event = await queue.get()
+        if is_end(event):
+            return events
+        events.append(event)
+
+
+def test_emits_in_submission_order_as_the_head_completes():
+    async def run():
+        release = {text: asyncio.Event() for text in ("a", "b", "c")}
+
+        async def synthesize(text):
+            await release[text].wait()
+            return text.upper()
+
+        output = asyncio.Queue()
+        scheduler = OrderedTTSScheduler(synthesize, output, window=3)
+        for text in ("a", "b", "c"):
+            scheduler.submit(text)
+        await scheduler.close()
+
+        # Later sentences finish first; nothing may overtake the head
+        release["c"].set()
+        release["b"].set()
+        await asyncio.sleep(0.01)
+        assert output.empty()
+
+        release["a"].set()
+        events = await drain(output)
+        assert [event["audio"] for event in events] == ["A", "B", "C"]
+        assert [event["sequence"] for event in events] == [0, 1, 2]
+        assert "time_to_first_audio" in events[0]
+        assert all("time_to_first_audio" not in event for event in events[1:])
+
+    asyncio.run(run())
+
+
+def test_head_is_emitted_before_slower_followers_finish():
+    async def run():
+        release_b = asyncio.Event()
+
+        async def synthesize(text):
+            if text == "b":
+                await release_b.wait()
+            return text
+
+        output = asyncio.Queue()
+        scheduler = OrderedTTSScheduler(synthesize, output, window=2)
+        scheduler.submit("a")
+        scheduler.submit("b")
+
+        first = await asyncio.wait_for(output.get(), 1)
+        assert first["audio"] == "a"
+
+        release_b.set()
+        await scheduler.close()
+        assert [event["audio"] for event in await drain(output)] == ["b"]
+
+    asyncio.run(run())
+
+
+def test_window_caps_requests_in_flight():
+    async def run():
+        in_flight = 0
+        peak = 0
+
+        async def synthesize(text):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.005)
+            in_flight -= 1
+            return text
+
+        output = asyncio.Queue()
+        scheduler = OrderedTTSScheduler(synthesize, output, window=2)
+        for i in range(6):
+            scheduler.submit(str(i))
+        await scheduler.close()
+
+        assert len(await drain(output)) == 6
+        assert peak == 2
+
+    asyncio.run(run())
+
+
+def test_failed_sentence_is_skipped_without_blocking_the_rest():
+    async def run():
+        async def synthesize(text):
+            if text == "bad":
+                raise RuntimeError("upstream error")
+            return text
+
+        output = asyncio.Queue()
+        scheduler = OrderedTTSScheduler(synthesize, output)
+        for text in ("one", "bad", "two"):
+            scheduler.submit(text)
+        await scheduler.close()
+
+        assert [event["audio"] for event in await drain(output)] == ["one", "two"]
+        assert scheduler.failed == 1
+        assert scheduler.emitted == 2
+
+    asyncio.run(run())
+
+
+def test_streamed_chunks_of_later_sentences_wait_for_the_head():
+    async def run():
+        release_head = asyncio.Event()
+
+        async def stream(text):
+            if text == "head":
+                yield b"h1"
+                await release_head.wait()
+                yield b"h2"
+            else:
+                yield b"t1"
+                yield b"t2"
+
+        output = asyncio.Queue()
+        scheduler = OrderedTTSScheduler(None, output, stream=stream)
+        scheduler.submit("head")
+        scheduler.submit("tail")
+        await scheduler.close()
+
+        first = await asyncio.wait_for(output.get(), 1)
+        assert (first["sequence"], first["data"]) == (0, b"h1")
+        assert "time_to_first_audio" in first
+        await asyncio.sleep(0.01)
+        assert output.empty()
+
+        release_head.set()
+        frames = [(e["sequence"], e["chunk_index"], e["data"], e["last"]) for e in await drain(output)]
+        assert frames == [
+            (0, 1, b"h2", False),
+            (0, 2, b"", True),
+            (1, 0, b"t1", False),
+            (1, 1, b"t2", False),
+            (1, 2, b"", True),
+        ]
+
+    asyncio.run(run())
+
+
+def test_preemptive_task_is_reused():
+    async def run():
+        async def synthesize(text):
+            raise AssertionError("pre-emptive text must not be synthesized again")
+
+        async def preemptive():
+            return "early"
+
+        output = asyncio.Queue()
+        scheduler = OrderedTTSScheduler(synthesize, output)
+        scheduler.submit("hello", task=asyncio.create_task(preemptive()))
+        await scheduler.close()
+
+        [event] = await drain(output)
+        assert event["audio"] == "early"
+        assert event["preemptive"] is True
+
+    asyncio.run(run())
+
+
+def test_cancel_stops_the_emitter():
+    async def run():
+        async def synthesize(text):
+            await asyncio.Event().wait()
+
+        output = asyncio.Queue()
+        scheduler = OrderedTTSScheduler(synthesize, output)
+        scheduler.submit("one")
+        scheduler.submit("two")
+        await asyncio.sleep(0.01)
+
+        scheduler.cancel()
+        await asyncio.wait({scheduler._emitter}, timeout=1)
+        assert scheduler._emitter.done()
+        assert output.empty()
+
+    asyncio.run(run())